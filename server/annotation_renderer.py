@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.exceptions import HTTPException
+from fastapi.staticfiles import StaticFiles
+
+from vision_service import draw_bounding_boxes
+
+logger = logging.getLogger(__name__)
+
+ANNOTATED_SUFFIX = "_annotated.jpg"
+
+
+class _Job:
+    __slots__ = ("source_path", "predictions", "output_path", "claimed", "ok", "done")
+
+    def __init__(self, source_path: str, predictions: List[Dict[str, Any]], output_path: str):
+        self.source_path = source_path
+        self.predictions = predictions
+        self.output_path = output_path
+        self.claimed = False
+        self.ok = False
+        self.done = threading.Event()
+
+
+class AnnotationRenderer:
+    """
+    Renders annotated upload images (boxes drawn over the original photo)
+    off the request path.
+
+    schedule() only records the detections; the full-resolution JPEG is drawn
+    and encoded on the first GET of the annotated file (see
+    AnnotatedStaticFiles) and cached on disk, or right away on a background
+    thread when background=True. Jobs no longer in memory (restart, eviction)
+    are rebuilt through loader(filename) -> (source_path, predictions).
+    """
+
+    def __init__(self, output_dir: str, loader: Callable[[str], Optional[Tuple[str, List[dict]]]] = None,
+                 background: bool = False, max_pending: int = 1024):
+        self.output_dir = output_dir
+        self.loader = loader
+        self.background = background
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="annotate")
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._rendered_on_request = 0
+        self._rendered_in_background = 0
+        self._missing = 0
+
+    def schedule(self, source_path: str, predictions: List[Dict[str, Any]], output_filename: str):
+        job = _Job(source_path, predictions, os.path.join(self.output_dir, output_filename))
+        with self._lock:
+            self._pending[output_filename] = job
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        if self.background:
+            self.executor.submit(self._run, job, True)
+
+    def ensure(self, filename: str) -> bool:
+        """Make sure output_dir/filename exists, rendering it now if needed. False if it can't be."""
+        output_path = os.path.join(self.output_dir, filename)
+        if os.path.exists(output_path):
+            return True
+
+        with self._lock:
+            job = self._pending.get(filename)
+        if job is None and self.loader:
+            loaded = self.loader(filename)
+            if loaded:
+                job = _Job(loaded[0], loaded[1], output_path)
+        if job is None or not os.path.exists(job.source_path):
+            with self._lock:
+                self._missing += 1
+            return False
+        return self._run(job, False)
+
+    async def ensure_async(self, filename: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.ensure, filename)
+
+    def _run(self, job: _Job, background: bool) -> bool:
+        with self._lock:
+            claimed = not job.claimed
+            job.claimed = True
+        if not claimed:
+            # Another thread is rendering it; wait for that result
+            job.done.wait()
+            return job.ok
+
+        try:
+            if not os.path.exists(job.output_path):
+                # Render to a temp file so a concurrent GET never serves a partial JPEG
+                root, ext = os.path.splitext(job.output_path)
+                tmp_path = f"{root}.tmp{ext}"
+                try:
+                    job.ok = draw_bounding_boxes(job.source_path, job.predictions, tmp_path)
+                    if job.ok:
+                        os.replace(tmp_path, job.output_path)
+                finally:
+                    # A failed or partial render must not be left where the uploads are served from
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            else:
+                job.ok = True
+        except Exception as e:
+            logger.error(f"Annotation render failed for {job.output_path}: {e}")
+            job.ok = False
+        finally:
+            job.done.set()
+            with self._lock:
+                filename = os.path.basename(job.output_path)
+                if self._pending.get(filename) is job:
+                    del self._pending[filename]
+                if job.ok:
+                    if background:
+                        self._rendered_in_background += 1
+                    else:
+                        self._rendered_on_request += 1
+        return job.ok
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": "background" if self.background else "lazy",
+                "pending": len(self._pending),
+                "rendered_on_request": self._rendered_on_request,
+                "rendered_in_background": self._rendered_in_background,
+                "missing": self._missing,
+            }
+
+
+class AnnotatedStaticFiles(StaticFiles):
+    """StaticFiles that renders a missing uploads/*_annotated.jpg through the renderer on first GET."""
+
+    def __init__(self, *args, renderer: AnnotationRenderer, uploads_prefix: str = "uploads/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.renderer = renderer
+        self.uploads_prefix = uploads_prefix
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            filename = path[len(self.uploads_prefix):] if path.startswith(self.uploads_prefix) else ""
+            if exc.status_code != 404 or not filename.endswith(ANNOTATED_SUFFIX) or "/" in filename:
+                raise
+
+        if not await self.renderer.ensure_async(filename):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
@@ -0,0 +1,127 @@
+"""
+Benchmark YOLO postprocessing: legacy (transpose + cv2.dnn.NMSBoxes) vs the
+vectorized yolo_inference.postprocess path.
+
+Usage:
+    # 1. Record raw model outputs for some images (needs the ONNX model)
+    python benchmark_postprocess.py --record static/uploads/*.jpg --out-dir bench_outputs
+
+    # 2. Benchmark both postprocess paths on the recorded outputs
+    python benchmark_postprocess.py --out-dir bench_outputs
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from config import config
+from yolo_inference import postprocess
+
+
+# --- Legacy postprocess (copied from the previous YOLOv8Inference.infer) ---
+def legacy_postprocess(outputs, conf_thres, iou_thres):
+    predictions = np.transpose(outputs, (0, 2, 1))[0]
+
+    boxes = predictions[:, :4]
+    scores = predictions[:, 4:]
+
+    class_ids = np.argmax(scores, axis=1)
+    max_scores = np.max(scores, axis=1)
+
+    mask = max_scores > conf_thres
+    boxes = boxes[mask]
+    class_ids = class_ids[mask]
+    scores = max_scores[mask]
+
+    if len(boxes) == 0:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+
+    xyxy = np.zeros_like(boxes)
+    xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+    xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+    xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+    xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+    indices = cv2.dnn.NMSBoxes(xyxy.tolist(), scores.tolist(), conf_thres, iou_thres)
+    if len(indices) == 0:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+
+    indices = np.array(indices).flatten()
+    return xyxy[indices], scores[indices], class_ids[indices]
+
+
+def record_outputs(image_paths, out_dir):
+    from yolo_inference import YOLOv8Inference
+
+    model = YOLOv8Inference(
+        model_path=config.YOLO_MODEL_PATH,
+        class_names_path=config.YOLO_CLASS_NAMES_PATH,
+    )
+    os.makedirs(out_dir, exist_ok=True)
+
+    for path in image_paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"Skipping unreadable image: {path}")
+            continue
+        input_tensor, _, _ = model.preprocess(frame)
+        outputs = model.backend.run(input_tensor)
+        name = os.path.splitext(os.path.basename(path))[0]
+        np.save(os.path.join(out_dir, f"{name}.npy"), outputs)
+        print(f"Recorded {path} -> {name}.npy {outputs.shape}")
+
+
+def time_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples), statistics.median(samples)
+
+
+def benchmark(out_dir, repeat, conf_thres, iou_thres):
+    files = sorted(glob.glob(os.path.join(out_dir, "*.npy")))
+    if not files:
+        print(f"No recorded outputs in {out_dir}. Run with --record first.")
+        return
+
+    print(f"{'file':<40} {'legacy ms':>12} {'vector ms':>12} {'speedup':>8} {'n_legacy':>9} {'n_vector':>9}")
+    total_legacy = total_vector = 0.0
+    for path in files:
+        outputs = np.load(path)
+        legacy_mean, _ = time_ms(lambda: legacy_postprocess(outputs, conf_thres, iou_thres), repeat)
+        vector_mean, _ = time_ms(lambda: postprocess(outputs, conf_thres, iou_thres), repeat)
+        n_legacy = len(legacy_postprocess(outputs, conf_thres, iou_thres)[0])
+        n_vector = len(postprocess(outputs, conf_thres, iou_thres))
+
+        total_legacy += legacy_mean
+        total_vector += vector_mean
+        print(f"{os.path.basename(path):<40} {legacy_mean:>12.3f} {vector_mean:>12.3f} "
+              f"{legacy_mean / vector_mean:>7.1f}x {n_legacy:>9} {n_vector:>9}")
+
+    print("-" * 96)
+    print(f"{'mean':<40} {total_legacy / len(files):>12.3f} {total_vector / len(files):>12.3f} "
+          f"{total_legacy / total_vector:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", nargs="*", help="Images to run through the model and record raw outputs for")
+    parser.add_argument("--out-dir", default="bench_outputs", help="Directory of recorded .npy model outputs")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--conf", type=float, default=config.YOLO_CONF_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=config.YOLO_IOU_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.record:
+        record_outputs(args.record, args.out_dir)
+    benchmark(args.out_dir, args.repeat, args.conf, args.iou)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,8 @@ def main():
             model_path=config.YOLO_MODEL_PATH,
             class_names_path=config.YOLO_CLASS_NAMES_PATH,
             confidence_threshold=config.YOLO_CONF_THRESHOLD,
-            iou_threshold=config.YOLO_IOU_THRESHOLD
+            iou_threshold=config.YOLO_IOU_THRESHOLD,
+            session_options=config.YOLO_SESSION_OPTIONS
         )
     except Exception as e:
         print(f"Error initializing model: {e}")
@@ -54,22 +55,29 @@ def main():
                 # Run local inference
                 detections = model.infer(frame)
 
+                # The annotators take supervision's own Detections type
+                sv_detections = sv.Detections(
+                    xyxy=detections.xyxy,
+                    confidence=detections.confidence,
+                    class_id=detections.class_id.astype(int)
+                )
+
                 # Draw annotations
                 annotated_frame = box_annotator.annotate(
                     scene=frame.copy(),
-                    detections=detections
+                    detections=sv_detections
                 )
                 
                 # Prepare labels with confidence
                 labels = [
                     f"{class_name} {confidence:.2f}"
                     for class_name, confidence
-                    in zip(detections['class_name'], detections.confidence)
+                    in zip(detections.class_name, detections.confidence)
                 ]
                 
                 annotated_frame = label_annotator.annotate(
                     scene=annotated_frame,
-                    detections=detections,
+                    detections=sv_detections,
                     labels=labels
                 )
 
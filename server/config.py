@@ -18,9 +18,115 @@ class Config:
     # Local YOLO Model Configuration
     YOLO_MODEL_PATH = os.path.join(BASE_DIR, "models/yolo/weights.onnx")
     YOLO_CLASS_NAMES_PATH = os.path.join(BASE_DIR, "models/yolo/class_names.txt")
+    # INT8 model produced by tools/quantize_yolo.py and promoted by tools/evaluate_quantized_yolo.py
+    YOLO_INT8_MODEL_PATH = os.path.join(BASE_DIR, "models/yolo/weights.int8.onnx")
+    YOLO_MODEL_VARIANT = os.getenv("YOLO_MODEL_VARIANT", "fp32")  # fp32 / int8
     YOLO_CONF_THRESHOLD = float(os.getenv("YOLO_CONF_THRESHOLD", 0.54))
     YOLO_IOU_THRESHOLD = float(os.getenv("YOLO_IOU_THRESHOLD", 0.85))
 
+    # Dynamic inference resolution (only for models exported with dynamic spatial axes)
+    YOLO_DYNAMIC_RESOLUTION = os.getenv("YOLO_DYNAMIC_RESOLUTION", "true").lower() == "true"
+    YOLO_RESOLUTIONS = [int(r) for r in os.getenv("YOLO_RESOLUTIONS", "320,480,640").split(",")]
+    YOLO_MIN_TILE_PX = float(os.getenv("YOLO_MIN_TILE_PX", 32))  # min tile height at inference resolution
+
+    # Live-mode ROI cropping around the previous frame's tiles; opt-in
+    YOLO_ROI_ENABLED = os.getenv("YOLO_ROI_ENABLED", "false").lower() == "true"
+    YOLO_ROI_MARGIN = float(os.getenv("YOLO_ROI_MARGIN", 0.15))  # fraction of the tile band size
+    YOLO_ROI_REFRESH_INTERVAL = int(os.getenv("YOLO_ROI_REFRESH_INTERVAL", 10))  # full frame every N frames
+
+    # Skip inference for near-identical live frames (perceptual hash, Hamming distance in bits out of 64);
+    # opt-in because such frames get the previous frame's results
+    FRAME_DEDUP_ENABLED = os.getenv("FRAME_DEDUP_ENABLED", "false").lower() == "true"
+    FRAME_DEDUP_MAX_DISTANCE = int(os.getenv("FRAME_DEDUP_MAX_DISTANCE", 4))
+    FRAME_DEDUP_MAX_SKIPS = int(os.getenv("FRAME_DEDUP_MAX_SKIPS", 30))  # force inference after N cached frames
+
+    # Temporal smoothing of live detections across frames (/api/detect-tiles with session_id); opt-in
+    # because it changes what clients get back (smoothed boxes, voted labels) from per-frame results
+    TEMPORAL_FUSION_ENABLED = os.getenv("TEMPORAL_FUSION_ENABLED", "false").lower() == "true"
+    TEMPORAL_MATCH_IOU = float(os.getenv("TEMPORAL_MATCH_IOU", 0.3))
+    TEMPORAL_MIN_HITS = int(os.getenv("TEMPORAL_MIN_HITS", 3))  # frames before a tile is confirmed
+    TEMPORAL_MAX_MISSES = int(os.getenv("TEMPORAL_MAX_MISSES", 2))  # frames a tile may drop out before removal
+    TEMPORAL_STABLE_FRAMES = int(os.getenv("TEMPORAL_STABLE_FRAMES", 3))
+    TEMPORAL_VOTE_DECAY = float(os.getenv("TEMPORAL_VOTE_DECAY", 0.8))
+
+    # SQLite history DB: long-lived per-thread connections
+    DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+    DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))  # wait this long on a locked DB before failing
+    DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", 128))  # prepared statements kept per connection
+    # Storage of interaction steps/responses: "none" (JSON text) or "zlib" (compressed blobs, see payload_codec)
+    DB_PAYLOAD_COMPRESSION = os.getenv("DB_PAYLOAD_COMPRESSION", "none").lower()
+
+    # Background interaction log writer: one transaction per batch
+    LOG_WRITER_BATCH_SIZE = int(os.getenv("LOG_WRITER_BATCH_SIZE", 100))  # write once this many rows are queued
+    LOG_WRITER_FLUSH_MS = float(os.getenv("LOG_WRITER_FLUSH_MS", 50))  # or this long after the first queued row
+    LOG_WRITER_QUEUE_SIZE = int(os.getenv("LOG_WRITER_QUEUE_SIZE", 10000))  # entries beyond this are dropped
+
+    # Retention: ended sessions older than RETENTION_DAYS are moved into per-session
+    # .tar.gz bundles (rows + uploads) under RETENTION_ARCHIVE_DIR; 0 disables the job
+    RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", 0))
+    RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", 24))
+    RETENTION_ARCHIVE_DIR = os.path.join(BASE_DIR, os.getenv("RETENTION_ARCHIVE_DIR", "archive"))
+    RETENTION_DRY_RUN = os.getenv("RETENTION_DRY_RUN", "false").lower() == "true"  # only report what would go
+    RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", 256))  # pages freed per incremental step
+
+    # Largest page the cursor-paginated history endpoints return
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 500))
+
+    # Dashboard push updates (/api/history/stream, Server-Sent Events)
+    EVENT_STREAM_KEEPALIVE_SECONDS = float(os.getenv("EVENT_STREAM_KEEPALIVE_SECONDS", 15))
+    EVENT_STREAM_QUEUE_SIZE = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", 256))  # per client, oldest dropped when full
+
+    # Live detection over WebSocket (/ws/detect)
+    WS_DETECT_MAX_FRAME_BYTES = int(os.getenv("WS_DETECT_MAX_FRAME_BYTES", 4 * 1024 * 1024))
+
+    # Sliced inference for high-resolution photos (selectable per request in /api/debug/yolo)
+    YOLO_SLICE_OPTIONS = {
+        "slice_size": int(os.getenv("YOLO_SLICE_SIZE", 1280)),  # slice edge in original image pixels
+        "overlap": float(os.getenv("YOLO_SLICE_OVERLAP", 0.2)),
+        "merge_threshold": float(os.getenv("YOLO_SLICE_MERGE_THRESHOLD", 0.6)),  # intersection over smaller box
+    }
+
+    # Inference backend: onnxruntime, opencv (cv2.dnn) or auto (benchmark both at startup, keep the faster)
+    YOLO_BACKEND = os.getenv("YOLO_BACKEND", "onnxruntime").lower()
+    YOLO_BACKEND_BENCHMARK_RUNS = int(os.getenv("YOLO_BACKEND_BENCHMARK_RUNS", 5))
+
+    # Inference session pool (each session gets cpu_count / pool size intra-op threads by default)
+    YOLO_POOL_SIZE = int(os.getenv("YOLO_POOL_SIZE", 1))
+    YOLO_POOL_PIN_THREADS = os.getenv("YOLO_POOL_PIN_THREADS", "false").lower() == "true"
+
+    # Thread pools for blocking work in the async endpoints, per stage
+    # (model inference uses its own pool, sized by YOLO_POOL_SIZE)
+    EXECUTOR_WORKERS = {
+        "io": int(os.getenv("EXECUTOR_IO_WORKERS", 8)),  # upload saves, image crops, temp file cleanup
+        "db": int(os.getenv("EXECUTOR_DB_WORKERS", 2)),  # SQLite reads and writes
+        "compute": int(os.getenv("EXECUTOR_COMPUTE_WORKERS", 2)),  # efficiency engine
+        "external": int(os.getenv("EXECUTOR_EXTERNAL_WORKERS", 4)),  # STT and LLM API calls
+    }
+
+    # Startup warmup (synthetic frames through every session before /api/ready reports ready)
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_PASSES = int(os.getenv("WARMUP_PASSES", 2))
+    WARMUP_FRAME_WIDTH = int(os.getenv("WARMUP_FRAME_WIDTH", 1280))
+    WARMUP_FRAME_HEIGHT = int(os.getenv("WARMUP_FRAME_HEIGHT", 720))
+
+    # ONNX Runtime Session Options (0 threads = let ORT decide)
+    YOLO_SESSION_OPTIONS = {
+        "intra_op_threads": int(os.getenv("YOLO_INTRA_OP_THREADS", 0)),
+        "inter_op_threads": int(os.getenv("YOLO_INTER_OP_THREADS", 0)),
+        "graph_optimization": os.getenv("YOLO_GRAPH_OPTIMIZATION", "all"),  # disable / basic / extended / all
+        "execution_mode": os.getenv("YOLO_EXECUTION_MODE", "sequential"),  # sequential / parallel
+        "enable_mem_arena": os.getenv("YOLO_ENABLE_MEM_ARENA", "true").lower() == "true",
+        "enable_mem_pattern": os.getenv("YOLO_ENABLE_MEM_PATTERN", "true").lower() == "true",
+        # Cache the optimized graph as .ort for faster startup (empty = disabled)
+        "optimized_model_path": (
+            os.path.join(BASE_DIR, os.getenv("YOLO_OPTIMIZED_MODEL_PATH")) if os.getenv("YOLO_OPTIMIZED_MODEL_PATH") else ""
+        ),
+    }
+
+    # Annotated result images: "lazy" renders on first GET, "background" right after the response
+    ANNOTATION_RENDER_MODE = os.getenv("ANNOTATION_RENDER_MODE", "lazy").lower()
+
     # Application Settings
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
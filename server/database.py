@@ -1,14 +1,108 @@
 import sqlite3
-import json
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+
+from config import config
+from payload_codec import decode_payload, encode_payload
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "history.db")
 
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Long-lived connections, one per (thread, DB_PATH). close_connections() bumps
+# the generation so every thread reopens on its next call.
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+# Called as listener(event, payload) after a change is committed:
+# "interaction" (the new row, as returned by get_session_details) and
+# "session" (session_id / status / timestamp of a created or closed session)
+_listeners: List[Callable[[str, Dict], None]] = []
+
+def add_listener(listener: Callable[[str, Dict], None]):
+    _listeners.append(listener)
+
+def remove_listener(listener: Callable[[str, Dict], None]):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def _notify(event: str, payload: Dict):
+    for listener in list(_listeners):
+        try:
+            listener(event, payload)
+        except Exception as e:
+            print(f"[DB] Listener error on {event}: {e}")
+
+def _connect(path: str) -> sqlite3.Connection:
+    journal_mode = config.DB_JOURNAL_MODE.upper()
+    synchronous = config.DB_SYNCHRONOUS.upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f"Unknown DB_JOURNAL_MODE: {config.DB_JOURNAL_MODE}")
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"Unknown DB_SYNCHRONOUS: {config.DB_SYNCHRONOUS}")
+
+    # check_same_thread=False only so close_connections() can close it at shutdown;
+    # each connection is otherwise used by the thread that opened it.
+    conn = sqlite3.connect(
+        path,
+        timeout=config.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=config.DB_CACHED_STATEMENTS,
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    # Lets the retention job return freed pages a few at a time. Only takes effect on a
+    # new (empty) database, so it must come first; existing ones need one full VACUUM
+    # (tools/archive_history.py --enable-incremental-vacuum)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    # WAL lets readers run alongside the writer; NORMAL only syncs at checkpoints in WAL mode
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    conn.execute(f"PRAGMA busy_timeout={int(config.DB_BUSY_TIMEOUT_MS)}")
+    return conn
+
+def get_db_connection() -> sqlite3.Connection:
+    """This thread's long-lived connection to DB_PATH, opened on first use. Don't close it."""
+    if getattr(_local, "generation", None) != _generation:
+        _local.connections = {}
+        _local.generation = _generation
+    conn = _local.connections.get(DB_PATH)
+    if conn is None:
+        conn = _local.connections[DB_PATH] = _connect(DB_PATH)
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Close every thread's connection (app shutdown, or after switching DB_PATH)."""
+    global _generation
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+        _generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except Exception as e:
+            print(f"[DB] Error closing connection: {e}")
+
+def connection_stats() -> Dict:
+    with _connections_lock:
+        open_connections = len(_connections)
+    return {
+        "open_connections": open_connections,
+        "journal_mode": config.DB_JOURNAL_MODE.upper(),
+        "synchronous": config.DB_SYNCHRONOUS.upper(),
+        "busy_timeout_ms": config.DB_BUSY_TIMEOUT_MS,
+    }
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db_connection()
     c = conn.cursor()
     
     # Create sessions table
@@ -34,84 +128,256 @@ def init_db():
             FOREIGN KEY(session_id) REFERENCES sessions(session_id)
         )
     ''')
-    
+
     conn.commit()
-    conn.close()
+    migrate(conn)
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def _epoch_ms(iso_time: str) -> int:
+    """Epoch milliseconds of a local-time ISO timestamp as stored in the text columns."""
+    return int(datetime.fromisoformat(iso_time).timestamp() * 1000)
+
+def _now():
+    """(ISO text, epoch ms) of the current local time."""
+    now = datetime.now()
+    return now.isoformat(), int(now.timestamp() * 1000)
+
+# SQL equivalent of _epoch_ms() for backfilling ('utc' treats the text as local time)
+_SQL_EPOCH_MS = "CAST(ROUND((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+
+def _migration_pagination_indexes(c):
+    # Cursor pagination: interactions by (session, id), sessions by recent activity
+    c.execute('CREATE INDEX IF NOT EXISTS idx_interactions_session_id ON interactions (session_id, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_activity ON sessions (last_activity_time, session_id)')
+
+def _migration_epoch_timestamps(c):
+    # Sortable integer copies of the ISO text timestamps; the text columns stay for display
+    c.execute('ALTER TABLE sessions ADD COLUMN last_activity_ms INTEGER')
+    c.execute('ALTER TABLE interactions ADD COLUMN timestamp_ms INTEGER')
+    c.execute(f"UPDATE sessions SET last_activity_ms = {_SQL_EPOCH_MS.format(column='last_activity_time')}")
+    c.execute(f"UPDATE interactions SET timestamp_ms = {_SQL_EPOCH_MS.format(column='timestamp')}")
+
+    c.execute('DROP INDEX IF EXISTS idx_sessions_activity')
+    c.execute('CREATE INDEX idx_sessions_activity_ms ON sessions (last_activity_ms, session_id)')
+    # Only active sessions are scanned by close_inactive_sessions()
+    c.execute("CREATE INDEX idx_sessions_active ON sessions (last_activity_ms) WHERE status = 'active'")
+    c.execute('CREATE INDEX idx_interactions_session_time ON interactions (session_id, timestamp_ms)')
+
+def _migration_annotated_image_column(c):
+    # Looked up by the annotation renderer; a column (rather than json_extract over
+    # response_json) keeps working once payloads are stored compressed
+    c.execute('ALTER TABLE interactions ADD COLUMN annotated_image_path TEXT')
+    c.execute('''
+        UPDATE interactions SET annotated_image_path = json_extract(response_json, '$.annotated_image_path')
+        WHERE typeof(response_json) = 'text' AND json_valid(response_json)
+    ''')
+    c.execute('CREATE INDEX idx_interactions_annotated ON interactions (annotated_image_path) '
+              'WHERE annotated_image_path IS NOT NULL')
+
+# Applied in order; PRAGMA user_version records how many have run. Append only.
+MIGRATIONS = [
+    _migration_pagination_indexes,
+    _migration_epoch_timestamps,
+    _migration_annotated_image_column,
+]
+
+def schema_version(conn: sqlite3.Connection = None) -> int:
+    conn = conn or get_db_connection()
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn: sqlite3.Connection = None):
+    """Bring the schema up to date, one transaction per migration."""
+    conn = conn or get_db_connection()
+    version = schema_version(conn)
+    # sqlite3 only opens a transaction implicitly before DML, so the ALTERs would
+    # commit on their own; manage BEGIN/COMMIT explicitly so DDL rolls back too
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            print(f"[DB] Applying migration {number}: {migration.__name__}")
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have applied it while we waited for the lock
+                if schema_version(conn) >= number:
+                    conn.execute('ROLLBACK')
+                    continue
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {number}')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+    finally:
+        conn.isolation_level = isolation_level
 
 def create_or_update_session(session_id: str):
     conn = get_db_connection()
-    c = conn.cursor()
-    now = datetime.now().isoformat()
+    now, now_ms = _now()
     
-    # Check if session exists
-    c.execute('SELECT * FROM sessions WHERE session_id = ?', (session_id,))
-    session = c.fetchone()
-    
-    if session is None:
-        c.execute('''
-            INSERT INTO sessions (session_id, start_time, status, last_activity_time)
-            VALUES (?, ?, ?, ?)
-        ''', (session_id, now, "active", now))
-    else:
-        c.execute('''
-            UPDATE sessions 
-            SET last_activity_time = ?, status = 'active'
-            WHERE session_id = ?
-        ''', (now, session_id))
+    with conn:
+        c = conn.cursor()
+        # Check if session exists
+        c.execute('SELECT * FROM sessions WHERE session_id = ?', (session_id,))
+        session = c.fetchone()
         
-    conn.commit()
-    conn.close()
+        if session is None:
+            c.execute('''
+                INSERT INTO sessions (session_id, start_time, status, last_activity_time, last_activity_ms)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (session_id, now, "active", now, now_ms))
+        else:
+            c.execute('''
+                UPDATE sessions 
+                SET last_activity_time = ?, last_activity_ms = ?, status = 'active'
+                WHERE session_id = ?
+            ''', (now, now_ms, session_id))
+
+    if session is None or session['status'] != 'active':
+        _notify("session", {"session_id": session_id, "status": "active", "last_activity_time": now})
 
 def end_session(session_id: str):
     conn = get_db_connection()
-    c = conn.cursor()
-    now = datetime.now().isoformat()
+    now, now_ms = _now()
     
-    c.execute('''
-        UPDATE sessions 
-        SET end_time = ?, status = 'ended', last_activity_time = ?
-        WHERE session_id = ?
-    ''', (now, now, session_id))
+    with conn:
+        conn.execute('''
+            UPDATE sessions 
+            SET end_time = ?, status = 'ended', last_activity_time = ?, last_activity_ms = ?
+            WHERE session_id = ?
+        ''', (now, now, now_ms, session_id))
     
-    conn.commit()
-    conn.close()
+    _notify("session", {"session_id": session_id, "status": "ended", "last_activity_time": now})
 
-def log_interaction(session_id: str, image_path: str, steps: List[str], response: Dict):
+def log_interaction(session_id: str, image_path: str, steps: List[str], response: Dict,
+                    timestamp: Optional[str] = None) -> int:
+    """Write one interaction right away. Returns its id."""
+    return log_interactions([{
+        "session_id": session_id,
+        "image_path": image_path,
+        "steps": steps,
+        "response": response,
+        "timestamp": timestamp,
+    }])[0]
+
+def log_interactions(entries: List[Dict]) -> List[int]:
+    """
+    Insert a batch of interactions (dicts with session_id, image_path, steps,
+    response and optionally timestamp) and bump each session's activity, all
+    in one transaction. Returns the new ids in order.
+    """
     conn = get_db_connection()
-    c = conn.cursor()
-    now = datetime.now().isoformat()
-    
-    steps_json = json.dumps(steps)
-    response_json = json.dumps(response)
-    
-    c.execute('''
-        INSERT INTO interactions (session_id, timestamp, image_path, steps_log, response_json)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (session_id, now, image_path, steps_json, response_json))
-    
-    # Also update session activity
-    c.execute('''
-        UPDATE sessions 
-        SET last_activity_time = ?
-        WHERE session_id = ?
-    ''', (now, session_id))
-    
-    conn.commit()
-    conn.close()
+    compression = config.DB_PAYLOAD_COMPRESSION
+    rows = []
+    for entry in entries:
+        timestamp = entry.get("timestamp") or datetime.now().isoformat()
+        response = entry["response"]
+        annotated_image_path = response.get("annotated_image_path") if isinstance(response, dict) else None
+        rows.append((entry["session_id"], timestamp, _epoch_ms(timestamp), entry.get("image_path"),
+                     encode_payload(entry["steps"], compression), encode_payload(response, compression),
+                     annotated_image_path))
+
+    # Latest activity per session, so each session is updated once per batch
+    activity = {}
+    for session_id, timestamp, timestamp_ms, *_ in rows:
+        activity[session_id] = max((timestamp_ms, timestamp), activity.get(session_id, (timestamp_ms, timestamp)))
+
+    interaction_ids = []
+    with conn:
+        c = conn.cursor()
+        for row in rows:
+            c.execute('''
+                INSERT INTO interactions (session_id, timestamp, timestamp_ms, image_path, steps_log, response_json,
+                                          annotated_image_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', row)
+            interaction_ids.append(c.lastrowid)
+        
+        # Also update session activity
+        c.executemany('''
+            UPDATE sessions 
+            SET last_activity_time = ?, last_activity_ms = ?
+            WHERE session_id = ?
+        ''', [(timestamp, timestamp_ms, session_id) for session_id, (timestamp_ms, timestamp) in activity.items()])
+
+    for interaction_id, row, entry in zip(interaction_ids, rows, entries):
+        _notify("interaction", {
+            "id": interaction_id,
+            "session_id": row[0],
+            "timestamp": row[1],
+            "image_path": row[3],
+            "steps_log": entry["steps"],
+            "response_json": entry["response"]
+        })
+    return interaction_ids
 
 def get_all_sessions():
     conn = get_db_connection()
     c = conn.cursor()
-    c.execute('SELECT * FROM sessions ORDER BY last_activity_time DESC')
+    c.execute('SELECT * FROM sessions ORDER BY last_activity_ms DESC')
     sessions = [dict(row) for row in c.fetchall()]
-    conn.close()
     return sessions
 
+def get_sessions_page(limit: int = 50, cursor: Optional[str] = None) -> Dict:
+    """
+    Sessions by most recent activity, limit at a time. cursor is the
+    next_cursor of the previous page ("<last_activity_ms>|<session_id>").
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    if cursor:
+        last_time, _, last_id = cursor.partition('|')
+        last_time = int(last_time)
+        c.execute('''
+            SELECT * FROM sessions
+            WHERE last_activity_ms < ? OR (last_activity_ms = ? AND session_id < ?)
+            ORDER BY last_activity_ms DESC, session_id DESC LIMIT ?
+        ''', (last_time, last_time, last_id, limit + 1))
+    else:
+        c.execute('SELECT * FROM sessions ORDER BY last_activity_ms DESC, session_id DESC LIMIT ?', (limit + 1,))
+    sessions = [dict(row) for row in c.fetchall()]
+
+    next_cursor = None
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        next_cursor = f"{sessions[-1]['last_activity_ms']}|{sessions[-1]['session_id']}"
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+def _parse_interaction(row) -> Dict:
+    item = dict(row)
+    # Parse JSON fields (plain text or compressed, see payload_codec)
+    if 'steps_log' in item:
+        try:
+            item['steps_log'] = decode_payload(item['steps_log'])
+        except:
+            item['steps_log'] = []
+        
+    try:
+        item['response_json'] = decode_payload(item['response_json'])
+    except:
+        item['response_json'] = {}
+    return item
+
+def get_interactions(session_id: str, after_id: int = 0, limit: Optional[int] = None,
+                     include_steps: bool = True) -> List[Dict]:
+    """Interactions of a session with id > after_id, oldest first; steps_log only if include_steps."""
+    conn = get_db_connection()
+    c = conn.cursor()
+    columns = "id, session_id, timestamp, image_path, response_json" + (", steps_log" if include_steps else "")
+    c.execute(f'''
+        SELECT {columns} FROM interactions
+        WHERE session_id = ? AND id > ?
+        ORDER BY id ASC LIMIT ?
+    ''', (session_id, after_id, -1 if limit is None else limit))
+    interactions = [_parse_interaction(row) for row in c.fetchall()]
+    return interactions
+
+def get_session(session_id: str) -> Optional[Dict]:
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('SELECT * FROM sessions WHERE session_id = ?', (session_id,))
+    row = c.fetchone()
+    return dict(row) if row else None
+
 def get_session_details(session_id: str):
     conn = get_db_connection()
     c = conn.cursor()
@@ -120,70 +386,122 @@ def get_session_details(session_id: str):
     c.execute('SELECT * FROM sessions WHERE session_id = ?', (session_id,))
     session_row = c.fetchone()
     if not session_row:
-        conn.close()
         return None
         
     session = dict(session_row)
     
     # Get interactions
-    c.execute('SELECT * FROM interactions WHERE session_id = ? ORDER BY timestamp ASC', (session_id,))
-    interactions = []
-    for row in c.fetchall():
-        item = dict(row)
-        # Parse JSON fields
-        try:
-            item['steps_log'] = json.loads(item['steps_log'])
-        except:
-            item['steps_log'] = []
-            
-        try:
-            item['response_json'] = json.loads(item['response_json'])
-        except:
-            item['response_json'] = {}
-            
-        interactions.append(item)
-        
-    session['interactions'] = interactions
-    conn.close()
+    c.execute('SELECT * FROM interactions WHERE session_id = ? ORDER BY timestamp_ms ASC, id ASC', (session_id,))
+    session['interactions'] = [_parse_interaction(row) for row in c.fetchall()]
     return session
 
+def get_interaction_detections(annotated_image_path: str) -> Optional[Dict]:
+    """Original image path and stored detections of the interaction with this annotated image."""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('''
+        SELECT image_path, response_json
+        FROM interactions
+        WHERE annotated_image_path = ?
+        ORDER BY id DESC LIMIT 1
+    ''', (annotated_image_path,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    detections = decode_payload(row['response_json']).get('detections')
+    if detections is None:
+        return None
+    return {"image_path": row['image_path'], "detections": detections}
+
 def close_inactive_sessions(timeout_seconds: int = 300) -> List[str]:
     """Close sessions that have been inactive for more than timeout_seconds. Returns list of closed session IDs."""
     conn = get_db_connection()
-    c = conn.cursor()
-    now = datetime.now()
-    now_str = now.isoformat()
+    now_str, now_ms = _now()
     
-    # Get all active sessions
-    c.execute("SELECT session_id, last_activity_time FROM sessions WHERE status = 'active'")
-    active_sessions = c.fetchall()
+    # One indexed UPDATE over the active sessions that are past the cutoff
+    with conn:
+        c = conn.execute('''
+            UPDATE sessions
+            SET status = 'ended', end_time = ?
+            WHERE status = 'active' AND last_activity_ms < ?
+            RETURNING session_id
+        ''', (now_str, now_ms - int(timeout_seconds * 1000)))
+        closed_sessions = [row['session_id'] for row in c.fetchall()]
     
-    closed_sessions = []
-    for row in active_sessions:
-        sid = row['session_id']
-        last_activity_str = row['last_activity_time']
-        try:
-            # Handle potential format differences or errors
-            if '.' in last_activity_str:
-                last_activity = datetime.fromisoformat(last_activity_str)
-            else:
-                # Fallback if seconds are missing fractions or whatever
-                last_activity = datetime.fromisoformat(last_activity_str)
-            
-            delta = (now - last_activity).total_seconds()
-            
-            if delta > timeout_seconds:
-                print(f"[Auto-Close] Closing session {sid}. Inactive for {delta:.1f}s")
-                c.execute('''
-                    UPDATE sessions 
-                    SET status = 'ended', end_time = ? 
-                    WHERE session_id = ?
-                ''', (now_str, sid))
-                closed_sessions.append(sid)
-        except Exception as e:
-            print(f"[Auto-Close] Error checking session {sid}: {e}")
-            
-    if closed_sessions:
-        conn.commit()
-    conn.close()
+    for sid in closed_sessions:
+        print(f"[Auto-Close] Closed session {sid}, inactive for more than {timeout_seconds}s")
+        _notify("session", {"session_id": sid, "status": "ended", "last_activity_time": now_str})
     return closed_sessions
+
+def get_archivable_sessions(cutoff_ms: int, limit: int = 100, after: Optional[Dict] = None) -> List[Dict]:
+    """
+    Ended sessions whose last activity is before cutoff_ms, oldest first.
+    after is the last session of the previous batch.
+    """
+    conn = get_db_connection()
+    c = conn.cursor()
+    after_ms, after_id = (after['last_activity_ms'], after['session_id']) if after else (-1, '')
+    c.execute('''
+        SELECT * FROM sessions
+        WHERE last_activity_ms < ? AND status != 'active'
+          AND (last_activity_ms > ? OR (last_activity_ms = ? AND session_id > ?))
+        ORDER BY last_activity_ms ASC, session_id ASC LIMIT ?
+    ''', (cutoff_ms, after_ms, after_ms, after_id, limit))
+    return [dict(row) for row in c.fetchall()]
+
+def delete_session(session_id: str, inactive_before_ms: Optional[int] = None) -> Optional[int]:
+    """
+    Delete a session and its interactions in one transaction. With
+    inactive_before_ms, only if it is still ended and inactive since then
+    (otherwise nothing is deleted and None is returned). Returns the number of
+    interactions deleted.
+    """
+    conn = get_db_connection()
+    with conn:
+        if inactive_before_ms is None:
+            c = conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        else:
+            c = conn.execute('''
+                DELETE FROM sessions
+                WHERE session_id = ? AND status != 'active' AND last_activity_ms < ?
+            ''', (session_id, inactive_before_ms))
+            if c.rowcount == 0:
+                return None
+        deleted = conn.execute('DELETE FROM interactions WHERE session_id = ?', (session_id,)).rowcount
+    _notify("session", {"session_id": session_id, "status": "archived", "last_activity_time": None})
+    return deleted
+
+def referenced_upload_paths() -> set:
+    """Every /static/uploads path still referenced by an interaction (image, annotation or audio)."""
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute('SELECT image_path, annotated_image_path, response_json FROM interactions')
+    paths = set()
+    for row in c.fetchall():
+        paths.update(p for p in (row['image_path'], row['annotated_image_path']) if p)
+        if row['image_path'] is None:
+            # Audio interactions keep their recording path in the response
+            try:
+                audio_path = decode_payload(row['response_json']).get('audio_path')
+            except Exception:
+                audio_path = None
+            if audio_path:
+                paths.add(audio_path)
+    return paths
+
+def vacuum_stats() -> Dict:
+    conn = get_db_connection()
+    return {
+        "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(conn.execute('PRAGMA auto_vacuum').fetchone()[0]),
+        "page_size": conn.execute('PRAGMA page_size').fetchone()[0],
+        "page_count": conn.execute('PRAGMA page_count').fetchone()[0],
+        "freelist_count": conn.execute('PRAGMA freelist_count').fetchone()[0],
+    }
+
+def incremental_vacuum(pages: int) -> int:
+    """Return up to pages free pages to the OS (needs auto_vacuum=INCREMENTAL). Returns the number freed."""
+    conn = get_db_connection()
+    before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    # execute() would only step the pragma once, freeing a single page
+    conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+    return before - conn.execute('PRAGMA freelist_count').fetchone()[0]
@@ -1,11 +1,26 @@
+import functools
+import threading
 from typing import List, Dict, Any, Tuple, Optional
 from mahjong.shanten import Shanten
 from mahjong.tile import TilesConverter
 from mahjong.meld import Meld
 
+def _synchronized(method):
+    """
+    Hold the engine lock for the call. The searches adjust visible_tiles in
+    place while they run, so concurrent calls (the server runs them on a
+    thread pool) must not interleave.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class EfficiencyEngine:
     def __init__(self):
         self.shanten_calculator = Shanten()
+        self._lock = threading.RLock()
         
         # Global visible tiles (seen on river, other players' melds, etc.)
         # This is maintained by external calls to update_tile_count
@@ -18,10 +33,28 @@ class EfficiencyEngine:
             for i in range(1, count + 1):
                 self.index_to_mpsz.append(f"{i}{s}")
 
+        self.warmed_up = False
+
+    @_synchronized
+    def warmup(self, passes: int = 1):
+        """
+        Run the discard and opportunity searches on a fixed hand so the first
+        real request doesn't pay for the mahjong library's lazy setup.
+        visible_tiles is left untouched (both searches restore it).
+        """
+        # 3467m 2356p 5578s 11z
+        hand_14 = TilesConverter.one_line_string_to_136_array("3467m2356p5578s11z")
+        for _ in range(passes):
+            self.calculate_best_discard(hand_14)
+            self.analyze_opportunities(hand_14[:13])
+        self.warmed_up = True
+
+    @_synchronized
     def reset_visible_tiles(self):
         """Reset the global visible tile counters to zero (for new round)."""
         self.visible_tiles = [0] * 34
 
+    @_synchronized
     def update_tile_count(self, tile_idx: int, delta: int):
         """
         Update the visible count for a specific tile index.
@@ -87,6 +120,7 @@ class EfficiencyEngine:
                 
         return ukeire_count, ukeire_tiles
 
+    @_synchronized
     def calculate_best_discard(self, hand_14: List[int], melds: Optional[List[Meld]] = None) -> Dict[str, Any]:
         """
         Calculate the best discard for a turn state hand.
@@ -161,6 +195,7 @@ class EfficiencyEngine:
             
         return best_candidate
 
+    @_synchronized
     def generate_lookup_table(self, hand_13: List[int], melds: Optional[List[Meld]] = None) -> Dict[str, Any]:
         """
         Generate lookup table for all possible draws for a waiting state hand.
@@ -285,6 +320,7 @@ class EfficiencyEngine:
         
         return best_shanten, best_ukeire, best_discard_idx
 
+    @_synchronized
     def analyze_opportunities(self, hand_13: List[int], melds: Optional[List[Meld]] = None) -> Dict[str, Any]:
         """
         Analyze opportunities for a waiting state hand:
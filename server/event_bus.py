@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+
+class Subscription:
+    """One subscriber's bounded queue; when it is full the oldest event is dropped."""
+
+    def __init__(self, topics: Iterable[str], loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def _deliver(self, event: Dict[str, Any]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None if nothing arrived within timeout seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    """
+    In-process pub/sub between the request handlers / DB writers and the
+    dashboard's event streams.
+
+    publish() may be called from any thread (the DB executor, background
+    tasks); events are handed to each subscriber's event loop thread-safely.
+    Subscribers are per-connection and only see topics they asked for.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._published = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Subscribe the running event loop to topics."""
+        subscription = Subscription(topics, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, topic: str, event: str, data: Dict[str, Any], event_id: Any = None):
+        message = {"event": event, "id": event_id, "data": data}
+        with self._lock:
+            self._published += 1
+            targets = [s for s in self._subscriptions if topic in s.topics]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+            except RuntimeError:
+                # Subscriber's loop is gone; the stream's cleanup will unsubscribe it
+                pass
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "published": self._published,
+                "dropped": sum(s.dropped for s in self._subscriptions),
+            }
+
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """Serialize an EventBus message as a Server-Sent Events frame."""
+    lines = [f"event: {message['event']}"]
+    if message.get("id") is not None:
+        lines.append(f"id: {message['id']}")
+    lines.append(f"data: {json.dumps(message['data'], ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
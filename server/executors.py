@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+
+class StageExecutors:
+    """
+    Named thread pools for the blocking parts of request handling, so the
+    event loop only ever awaits.
+
+    Each stage ("io", "db", "compute", "external", ...) gets its own pool,
+    sized from workers, so a slow STT/LLM call can only exhaust the
+    "external" pool and never delays detection requests queued on another
+    stage. Model inference keeps its own pool in VisionService.
+    """
+
+    def __init__(self, workers: Dict[str, int]):
+        self.workers = {stage: max(1, count) for stage, count in workers.items()}
+        self.executors = {
+            stage: ThreadPoolExecutor(max_workers=count, thread_name_prefix=stage)
+            for stage, count in self.workers.items()
+        }
+        self._stats = {stage: {"submitted": 0, "completed": 0, "failed": 0, "wait_ms": 0.0, "max_wait_ms": 0.0,
+                               "run_ms": 0.0} for stage in workers}
+        self._lock = threading.Lock()
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the stage's pool and await its result."""
+        executor = self.executors[stage]
+        submitted = time.perf_counter()
+        with self._lock:
+            self._stats[stage]["submitted"] += 1
+
+        def call():
+            started = time.perf_counter()
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    stats = self._stats[stage]
+                    stats["completed" if ok else "failed"] += 1
+                    wait_ms = (started - submitted) * 1000
+                    stats["wait_ms"] += wait_ms
+                    stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+                    stats["run_ms"] += (finished - started) * 1000
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, call)
+
+    def shutdown(self, wait: bool = True):
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {}
+            for stage, stats in self._stats.items():
+                done = stats["completed"] + stats["failed"]
+                report[stage] = {
+                    "workers": self.workers[stage],
+                    "submitted": stats["submitted"],
+                    "in_flight": stats["submitted"] - done,
+                    "failed": stats["failed"],
+                    "avg_wait_ms": round(stats["wait_ms"] / done, 3) if done else 0.0,
+                    "max_wait_ms": round(stats["max_wait_ms"], 3),
+                    "avg_run_ms": round(stats["run_ms"] / done, 3) if done else 0.0,
+                }
+            return report
+
+
+class StageTimer:
+    """
+    Start/end offsets (ms since the timer was created) of the named stages of
+    one request, so overlapping stages and the critical path show up in the
+    steps log.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = {}
+
+    def _offset_ms(self, t: float) -> float:
+        return (t - self.origin) * 1000
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = (self._offset_ms(start), self._offset_ms(time.perf_counter()))
+
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        """Await awaitable as stage name (for stages started as concurrent tasks)."""
+        with self.stage(name):
+            return await awaitable
+
+    def duration_ms(self, name: str) -> float:
+        start, end = self.stages.get(name, (0.0, 0.0))
+        return end - start
+
+    def elapsed_ms(self) -> float:
+        return self._offset_ms(time.perf_counter())
+
+    def summary(self, critical_path: Sequence[str]) -> str:
+        """'read 0.2ms @0.0 | save 1.9ms @0.2 | ...; critical path 41.3ms (read > detect > ...), elapsed 42.0ms'"""
+        stages = " | ".join(f"{name} {end - start:.1f}ms @{start:.1f}"
+                            for name, (start, end) in sorted(self.stages.items(), key=lambda item: item[1][0]))
+        critical = [name for name in critical_path if name in self.stages]
+        critical_ms = sum(self.duration_ms(name) for name in critical)
+        return (f"{stages}; critical path {critical_ms:.1f}ms ({' > '.join(critical)}), "
+                f"elapsed {self.elapsed_ms():.1f}ms")
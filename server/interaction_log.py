@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class InteractionLogWriter:
+    """
+    Background writer for the interaction history.
+
+    Request handlers only enqueue(); a single writer thread collects entries
+    and hands them to write_batch (database.log_interactions) as one
+    transaction once max_batch rows are pending or flush_interval_ms has
+    passed since the first of them arrived. Entries are timestamped when
+    enqueued, so batching does not change the recorded times.
+
+    If a batch fails (an entry that cannot be encoded, a locked database),
+    it is retried one entry at a time after retry_backoff_ms, so only the
+    entries that fail on their own are lost.
+
+    The queue is bounded: when it is full, enqueue() drops the entry and
+    counts it rather than blocking the request. stop() writes out whatever
+    is still queued.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict]], Any], max_batch: int = 100,
+                 flush_interval_ms: float = 50, max_queue: int = 10000, retry_backoff_ms: float = 100):
+        self.write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.retry_backoff = max(0.0, retry_backoff_ms) / 1000
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._written_cond = threading.Condition(self._lock)
+        self._stopped = False
+        self._enqueued = 0
+        self._processed = 0  # written or failed, for flush()
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._retried_batches = 0
+        self._flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._last_flush_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, session_id: str, image_path: Optional[str], steps: List[str], response: Dict) -> bool:
+        """Queue one interaction for writing. Returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        entry = {
+            "session_id": session_id,
+            "image_path": image_path,
+            "steps": steps,
+            "response": response,
+            "timestamp": datetime.now().isoformat(),
+        }
+        with self._lock:
+            if self._stopped:
+                accepted = False
+            else:
+                try:
+                    self._queue.put_nowait(entry)
+                    self._enqueued += 1
+                    accepted = True
+                except queue.Full:
+                    accepted = False
+            if not accepted:
+                self._dropped += 1
+        if not accepted:
+            logger.warning(f"Interaction log queue full or stopped, dropped entry for session {session_id}")
+        return accepted
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything enqueued so far has been written. False on timeout."""
+        with self._written_cond:
+            target = self._enqueued
+            return self._written_cond.wait_for(lambda: self._processed >= target, timeout)
+
+    def stop(self, timeout: float = None):
+        """Write out the queue and stop the writer thread."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Dict]):
+        start = time.perf_counter()
+        written, failed = len(batch), 0
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            logger.warning(f"Failed to write {len(batch)} interaction(s), retrying one at a time: {e}")
+            with self._lock:
+                self._retried_batches += 1
+            time.sleep(self.retry_backoff)
+            written = 0
+            for entry in batch:
+                try:
+                    self.write_batch([entry])
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Dropped interaction for session {entry.get('session_id')}: {e}")
+        flush_ms = (time.perf_counter() - start) * 1000
+        with self._written_cond:
+            self._processed += len(batch)
+            self._written += written
+            self._failed += failed
+            if written:
+                self._batches += 1
+                self._flush_ms += flush_ms
+                self._max_flush_ms = max(self._max_flush_ms, flush_ms)
+                self._last_flush_ms = flush_ms
+            self._written_cond.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+                "retried_batches": self._retried_batches,
+                "avg_batch_size": round(self._written / self._batches, 2) if self._batches else 0.0,
+                "avg_flush_ms": round(self._flush_ms / self._batches, 3) if self._batches else 0.0,
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "last_flush_ms": round(self._last_flush_ms, 3),
+            }
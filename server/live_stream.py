@@ -0,0 +1,117 @@
+import asyncio
+import struct
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from yolo_inference import DETECTION_DTYPE, Detections
+
+# Binary detection message: header (frame seq, tile count, flags, inference ms)
+# followed by count little-endian DETECTION_DTYPE rows in image pixels.
+BINARY_HEADER = struct.Struct("<IHHf")
+BINARY_FLAG_STABLE = 1
+WIRE_DETECTION_DTYPE = DETECTION_DTYPE.newbyteorder("<")
+
+
+class LatestFrameBuffer:
+    """
+    Single-slot frame buffer between a WebSocket reader and the detector.
+
+    put() replaces any frame that has not been picked up yet, so a client
+    sending faster than the model runs only ever has its newest frame
+    processed and latency stays bounded by one inference.
+    """
+
+    def __init__(self, metrics: "LiveStreamMetrics" = None):
+        self.metrics = metrics
+        self._frame = None
+        self._seq = 0
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame: bytes) -> int:
+        """Store a frame, dropping the pending one. Returns the frame's sequence number."""
+        self._seq += 1
+        self.received += 1
+        dropped = self._frame is not None
+        if dropped:
+            self.dropped += 1
+        if self.metrics:
+            self.metrics.frame_received(dropped)
+        self._frame = (self._seq, frame)
+        self._event.set()
+        return self._seq
+
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        """Wait for the newest (seq, frame); None once closed with nothing pending."""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+def encode_binary_message(seq: int, detections: Detections, inference_time_ms: float, stable: bool = False) -> bytes:
+    header = BINARY_HEADER.pack(seq, len(detections), BINARY_FLAG_STABLE if stable else 0, inference_time_ms)
+    return header + detections.data.astype(WIRE_DETECTION_DTYPE, copy=False).tobytes()
+
+
+def decode_binary_message(message: bytes) -> Tuple[int, np.ndarray, float, bool]:
+    """(seq, DETECTION_DTYPE rows, inference ms, stable) from encode_binary_message() output."""
+    seq, count, flags, inference_time_ms = BINARY_HEADER.unpack_from(message)
+    rows = np.frombuffer(message, dtype=WIRE_DETECTION_DTYPE, count=count, offset=BINARY_HEADER.size)
+    return seq, rows, inference_time_ms, bool(flags & BINARY_FLAG_STABLE)
+
+
+class LiveStreamMetrics:
+    """Counters across all /ws/detect connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = 0
+        self._total_connections = 0
+        self._received = 0
+        self._processed = 0
+        self._dropped = 0
+
+    def connected(self):
+        with self._lock:
+            self._connections += 1
+            self._total_connections += 1
+
+    def disconnected(self):
+        with self._lock:
+            self._connections -= 1
+
+    def frame_received(self, dropped_pending: bool):
+        with self._lock:
+            self._received += 1
+            self._dropped += dropped_pending
+
+    def frame_processed(self):
+        with self._lock:
+            self._processed += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_connections": self._connections,
+                "total_connections": self._total_connections,
+                "frames_received": self._received,
+                "frames_processed": self._processed,
+                "frames_dropped": self._dropped,
+                "drop_rate": round(self._dropped / self._received, 4) if self._received else 0.0,
+            }
@@ -1,13 +1,14 @@
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, File, UploadFile, Form, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from typing import List, Optional, Dict, Any
-from PIL import Image
+import cv2
+import numpy as np
 import uvicorn
 import shutil
 import os
 import datetime
+import time
 import database
 import asyncio
 import logging
@@ -17,14 +18,20 @@ from mahjong.tile import TilesConverter
 from efficiency_engine import EfficiencyEngine, format_suggestions
 from stt_service import STTService
 from llm_service import LLMService
-from vision_service import VisionService, draw_bounding_boxes
+from vision_service import VisionService, ResolutionPolicy, RoiTracker, FrameDeduplicator
+from temporal_fusion import TemporalFusion
+from annotation_renderer import AnnotationRenderer, AnnotatedStaticFiles
+from live_stream import LatestFrameBuffer, LiveStreamMetrics, encode_binary_message
+from executors import StageExecutors, StageTimer
+from event_bus import EventBus, format_sse
+from interaction_log import InteractionLogWriter
+from retention import RetentionJob
 from schemas import (
     StartSessionRequest, 
     AnalyzeResponse, 
     EndSessionRequest, 
     ProcessAudioResponse,
-    DetectTilesResponse,
-    TileDetection
+    DetectTilesResponse
 )
 
 # Configure Logging
@@ -51,12 +58,55 @@ VISION_SERVICE = VisionService(
     model_path=config.YOLO_MODEL_PATH,
     class_names_path=config.YOLO_CLASS_NAMES_PATH,
     confidence_threshold=config.YOLO_CONF_THRESHOLD,
-    iou_threshold=config.YOLO_IOU_THRESHOLD
+    iou_threshold=config.YOLO_IOU_THRESHOLD,
+    session_options=config.YOLO_SESSION_OPTIONS,
+    quantized_model_path=config.YOLO_INT8_MODEL_PATH,
+    model_variant=config.YOLO_MODEL_VARIANT,
+    pool_size=config.YOLO_POOL_SIZE,
+    pin_threads=config.YOLO_POOL_PIN_THREADS,
+    resolution_policy=(
+        ResolutionPolicy(config.YOLO_RESOLUTIONS, config.YOLO_MIN_TILE_PX) if config.YOLO_DYNAMIC_RESOLUTION else None
+    ),
+    roi_tracker=(
+        RoiTracker(config.YOLO_ROI_MARGIN, config.YOLO_ROI_REFRESH_INTERVAL) if config.YOLO_ROI_ENABLED else None
+    ),
+    slice_options=config.YOLO_SLICE_OPTIONS,
+    frame_dedup=(
+        FrameDeduplicator(config.FRAME_DEDUP_MAX_DISTANCE, config.FRAME_DEDUP_MAX_SKIPS) if config.FRAME_DEDUP_ENABLED else None
+    ),
+    backend=config.YOLO_BACKEND,
+    backend_benchmark_runs=config.YOLO_BACKEND_BENCHMARK_RUNS
+)
+TEMPORAL_FUSION = TemporalFusion(
+    match_iou=config.TEMPORAL_MATCH_IOU,
+    min_hits=config.TEMPORAL_MIN_HITS,
+    max_misses=config.TEMPORAL_MAX_MISSES,
+    stable_frames=config.TEMPORAL_STABLE_FRAMES,
+    vote_decay=config.TEMPORAL_VOTE_DECAY
+) if config.TEMPORAL_FUSION_ENABLED else None
+LIVE_STREAM_METRICS = LiveStreamMetrics()
+EXECUTORS = StageExecutors(config.EXECUTOR_WORKERS)
+EVENT_BUS = EventBus(max_queue=config.EVENT_STREAM_QUEUE_SIZE)
+INTERACTION_LOG = InteractionLogWriter(
+    database.log_interactions,
+    max_batch=config.LOG_WRITER_BATCH_SIZE,
+    flush_interval_ms=config.LOG_WRITER_FLUSH_MS,
+    max_queue=config.LOG_WRITER_QUEUE_SIZE
 )
 
 # Initialize Database
 database.init_db()
 
+def publish_db_event(event: str, payload: Dict[str, Any]):
+    """Forward committed DB changes to the dashboard event streams."""
+    if event == "interaction":
+        EVENT_BUS.publish(f"session:{payload['session_id']}", "interaction", payload, event_id=payload["id"])
+    elif event == "session":
+        # Every stream subscribes to "sessions"
+        EVENT_BUS.publish("sessions", "session", payload)
+
+database.add_listener(publish_db_event)
+
 # YOLO Class to MPSZ Notation Mapping
 YOLO_TO_MPSZ_MAPPING = {
     # --- Bamboo (s) ---
@@ -113,6 +163,43 @@ def convert_to_mpsz(yolo_classes: List[str]):
             
     return hand_tiles, bonus_tiles
 
+def format_timings(timings: Optional[Dict[str, float]]) -> str:
+    """'decode=1.2ms preprocess=3.4ms ...' for the steps log."""
+    if not timings:
+        return "n/a"
+    return " ".join(f"{stage[:-3] if stage.endswith('_ms') else stage}={ms:.1f}ms" for stage, ms in timings.items())
+
+def save_upload(upload_file, path: str):
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(upload_file, buffer)
+
+def write_file(path: str, data: bytes):
+    with open(path, "wb") as buffer:
+        buffer.write(data)
+
+def decode_image(data: bytes):
+    """Decode an uploaded photo to BGR, ignoring EXIF orientation like the annotation renderer does."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+
+def suggest_move(hidden_hand, melds) -> Optional[str]:
+    """Efficiency engine suggestion for the current hand, or None if the tile count fits neither case."""
+    # Count tiles in melds (each meld object has .tiles list)
+    total_tiles = len(hidden_hand) + sum(len(m.tiles) for m in melds)
+
+    # 14, 11, 8, 5, 2 -> My Turn (Discard)
+    if total_tiles % 3 == 2:
+        result = EFFICIENCY_ENGINE.calculate_best_discard(hidden_hand, melds)
+        return format_suggestions(result, "discard")
+
+    # 13, 10, 7, 4, 1 -> Waiting (Opponent Turn)
+    if total_tiles % 3 == 1:
+        result = EFFICIENCY_ENGINE.analyze_opportunities(hidden_hand, melds)
+        return format_suggestions(result, "opportunity")
+    return None
+
+# Stages of /api/analyze-hand that the response waits on, in order
+ANALYZE_CRITICAL_PATH = ("read", "decode", "detect", "tracker", "engine")
+
 app = FastAPI()
 
 # Add CORS to allow requests from anywhere (helpful for dev)
@@ -132,8 +219,30 @@ STATIC_DIR = os.path.join(BASE_DIR, "static")
 UPLOAD_DIR = os.path.join(STATIC_DIR, "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# Mount static files
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+def load_annotation_job(filename: str):
+    """Rebuild an annotated image job from the interaction log (e.g. after a restart)."""
+    stored = database.get_interaction_detections(f"/static/uploads/{filename}")
+    if not stored:
+        return None
+    return os.path.join(UPLOAD_DIR, os.path.basename(stored["image_path"])), stored["detections"]
+
+RETENTION_JOB = RetentionJob(
+    UPLOAD_DIR,
+    config.RETENTION_ARCHIVE_DIR,
+    config.RETENTION_DAYS,
+    vacuum_pages=config.RETENTION_VACUUM_PAGES
+)
+
+if config.ANNOTATION_RENDER_MODE not in ("lazy", "background"):
+    raise ValueError(f"Unknown ANNOTATION_RENDER_MODE: {config.ANNOTATION_RENDER_MODE}")
+ANNOTATION_RENDERER = AnnotationRenderer(
+    UPLOAD_DIR,
+    loader=load_annotation_job,
+    background=config.ANNOTATION_RENDER_MODE == "background"
+)
+
+# Mount static files (annotated images are rendered on first request)
+app.mount("/static", AnnotatedStaticFiles(directory=STATIC_DIR, renderer=ANNOTATION_RENDERER), name="static")
 
 @app.get("/")
 async def read_root():
@@ -142,7 +251,7 @@ async def read_root():
 @app.post("/api/start-session")
 async def start_session(request: StartSessionRequest):
     logger.info(f"Received Start Session request: session_id={request.session_id}")
-    database.create_or_update_session(request.session_id)
+    await EXECUTORS.run("db", database.create_or_update_session, request.session_id)
     # Initialize Tracker
     SESSION_TRACKERS[request.session_id] = MahjongStateTracker()
     return {"status": "success", "session_id": request.session_id}
@@ -153,73 +262,85 @@ async def analyze_hand(
     session_id: str = Form(...),
     incoming_tile: Optional[str] = Form(None)
 ):
+    """
+    Pipeline: read upload -> decode -> detect hand/melded halves -> tracker -> engine.
+    Persisting the upload and touching the session run concurrently with
+    detection; the interaction is queued for the background history writer.
+    """
     start_time = datetime.datetime.now()
+    timer = StageTimer()
     steps_log = []
     
     # Step 1: Initialize
     logger.info(f"Received Analyze request: session_id={session_id}, filename={image.filename}")
     steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Received request with image: {image.filename}")
     
-    # Step 2: Ensure Session Exists
-    database.create_or_update_session(session_id)
-    steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Session verified/active")
-
-    # Step 3: Save Image
     timestamp = int(start_time.timestamp() * 1000)
     file_extension = os.path.splitext(image.filename)[1] or ".jpg"
     safe_filename = f"{session_id}_{timestamp}{file_extension}"
     file_path = os.path.join(UPLOAD_DIR, safe_filename)
-    
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Image saved to {file_path}")
-    except Exception as e:
-        error_msg = f"Failed to save image: {str(e)}"
-        logger.error(error_msg)
-        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] ERROR: {error_msg}")
-        # Continue with mock logic even if save fails, but log it
+
+    with timer.stage("read"):
+        data = await image.read()
+
+    # Step 2 & 3: Ensure Session Exists and Save Image, off the critical path
+    async def touch_session():
+        try:
+            await EXECUTORS.run("db", database.create_or_update_session, session_id)
+            steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Session verified/active")
+        except Exception as e:
+            error_msg = f"Failed to update session: {str(e)}"
+            logger.error(error_msg)
+            steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] ERROR: {error_msg}")
+
+    async def save_image() -> bool:
+        try:
+            await EXECUTORS.run("io", write_file, file_path, data)
+            steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Image saved to {file_path}")
+            return True
+        except Exception as e:
+            error_msg = f"Failed to save image: {str(e)}"
+            logger.error(error_msg)
+            steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] ERROR: {error_msg}")
+            # Continue with mock logic even if save fails, but log it
+            return False
+
+    session_task = asyncio.create_task(timer.timed("session", touch_session()))
+    save_task = asyncio.create_task(timer.timed("save", save_image()))
 
     # Step 4: Perform Analysis
     steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Starting AI analysis...")
     
     user_hand = []
     melded_tiles = []
+    all_preds = []
+    annotated_filename = None
     annotated_path = None
     
     try:
-        # Split image for dual inference
+        # Split image for dual inference (views of one decoded frame, no temp files)
         steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Splitting image for dual inference (Hand/Melded)...")
-        
-        base_path = os.path.splitext(file_path)[0]
-        top_path = f"{base_path}_top.jpg"
-        bottom_path = f"{base_path}_bottom.jpg"
-        mid_y = 0
-        
-        with Image.open(file_path) as img:
-            width, height = img.size
-            mid_y = height // 2
+        with timer.stage("decode"):
+            frame = await EXECUTORS.run("compute", decode_image, data)
+        if frame is None:
+            raise ValueError("could not decode image")
+        mid_y = frame.shape[0] // 2
             
-            top_img = img.crop((0, 0, width, mid_y))
-            bottom_img = img.crop((0, mid_y, width, height))
-            
-            top_img.save(top_path)
-            bottom_img.save(bottom_path)
-            
-        # 1. Inference Hand (Top)
-        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Analyzing Hand (Top Half)...")
-        preds_top = VISION_SERVICE.detect_objects(top_path)
-        preds_top.sort(key=lambda p: p.get("x", 0))
-        user_hand, _ = convert_to_mpsz([p["class"] for p in preds_top])
-        
-        # 2. Inference Melded (Bottom)
-        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Analyzing Melded (Bottom Half)...")
-        preds_bottom = VISION_SERVICE.detect_objects(bottom_path)
+        # 1. Inference Hand (Top) and 2. Melded (Bottom), run concurrently on the session pool
+        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Analyzing Hand (Top Half) and Melded (Bottom Half)...")
+        with timer.stage("detect"):
+            dets_top, dets_bottom = await asyncio.gather(
+                VISION_SERVICE.detect_async(frame[:mid_y], session_key=f"{session_id}:hand"),
+                VISION_SERVICE.detect_async(frame[mid_y:], session_key=f"{session_id}:melded")
+            )
+        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Stage timings: "
+                         f"Hand {format_timings(dets_top.timings)}; Melded {format_timings(dets_bottom.timings)}")
         
         # Adjust coordinates for bottom predictions
-        for p in preds_bottom:
-            p['y'] = p.get('y', 0) + mid_y
-            
+        dets_bottom.translate(0, mid_y)
+        preds_top, preds_bottom = dets_top.to_predictions(), dets_bottom.to_predictions()
+        preds_top.sort(key=lambda p: p.get("x", 0))
+        user_hand, _ = convert_to_mpsz([p["class"] for p in preds_top])
         preds_bottom.sort(key=lambda p: p.get("x", 0))
         melded_tiles, _ = convert_to_mpsz([p["class"] for p in preds_bottom])
         
@@ -227,18 +348,9 @@ async def analyze_hand(
         all_preds = preds_top + preds_bottom
         
         annotated_filename = f"{session_id}_{timestamp}_annotated.jpg"
-        annotated_full_path = os.path.join(UPLOAD_DIR, annotated_filename)
-        
-        if draw_bounding_boxes(file_path, all_preds, annotated_full_path):
-            annotated_path = f"/static/uploads/{annotated_filename}"
-            steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Generated annotated image with combined results")
             
         steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Result: Hand={user_hand}, Melded={melded_tiles}")
         
-        # Cleanup temp files
-        if os.path.exists(top_path): os.remove(top_path)
-        if os.path.exists(bottom_path): os.remove(bottom_path)
-        
     except Exception as e:
         error_msg = f"Inference/Processing Error: {str(e)}"
         logger.error(error_msg)
@@ -255,13 +367,14 @@ async def analyze_hand(
 
     action_detected = "UNKNOWN"
     try:
-        incoming_id = None
-        if incoming_tile:
-            ids = TilesConverter.one_line_string_to_136_array(incoming_tile)
-            if ids:
-                incoming_id = ids[0]
-        
-        update_result = tracker.update_state(user_hand, melded_tiles, incoming_id)
+        with timer.stage("tracker"):
+            incoming_id = None
+            if incoming_tile:
+                ids = TilesConverter.one_line_string_to_136_array(incoming_tile)
+                if ids:
+                    incoming_id = ids[0]
+            
+            update_result = tracker.update_state(user_hand, melded_tiles, incoming_id)
         action_detected = update_result.get("action", "UNKNOWN")
         warning_msg = update_result.get("warning")
         
@@ -285,32 +398,29 @@ async def analyze_hand(
     else:
         try:
             if tracker.current_hidden_hand:
-                hidden_count = len(tracker.current_hidden_hand)
-                # Count tiles in melds (each meld object has .tiles list)
-                meld_count = sum(len(m.tiles) for m in tracker.meld_history)
-                total_tiles = hidden_count + meld_count
-                
-                # 14, 11, 8, 5, 2 -> My Turn (Discard)
-                if total_tiles % 3 == 2: 
-                    result = EFFICIENCY_ENGINE.calculate_best_discard(
-                        tracker.current_hidden_hand, 
-                        tracker.meld_history
+                # Snapshot the tracker state; the engine runs off the event loop
+                with timer.stage("engine"):
+                    suggestion = await EXECUTORS.run(
+                        "compute", suggest_move, list(tracker.current_hidden_hand), list(tracker.meld_history)
                     )
-                    suggested_play = format_suggestions(result, "discard")
-                
-                # 13, 10, 7, 4, 1 -> Waiting (Opponent Turn)
-                elif total_tiles % 3 == 1: 
-                    result = EFFICIENCY_ENGINE.analyze_opportunities(
-                        tracker.current_hidden_hand,
-                        tracker.meld_history
-                    )
-                    suggested_play = format_suggestions(result, "opportunity")
+                if suggestion is not None:
+                    suggested_play = suggestion
                     
         except Exception as e:
             err_msg = f"Efficiency Engine Error: {e}"
             logger.error(err_msg)
             steps_log.append(err_msg)
 
+    # The upload and session row are normally done long before the engine. The
+    # annotation reads the saved upload, so it is only scheduled once the file
+    # is completely written (and not at all if saving failed)
+    _, saved = await asyncio.gather(session_task, save_task)
+    if annotated_filename and saved:
+        # Rendered on first GET (or in the background), not on the response path
+        ANNOTATION_RENDERER.schedule(file_path, all_preds, annotated_filename)
+        annotated_path = f"/static/uploads/{annotated_filename}"
+        steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Scheduled annotated image with combined results")
+
     response_data = AnalyzeResponse(
         user_hand=user_hand,
         melded_tiles=melded_tiles,
@@ -321,16 +431,19 @@ async def analyze_hand(
         is_stable=(warning_msg is None)
     )
     
+    steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Pipeline: "
+                     f"{timer.summary(ANALYZE_CRITICAL_PATH)}")
     steps_log.append(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] Analysis complete. Generating response.")
 
-    # Step 5: Log Interaction to DB
-    # We store the relative path for frontend access
+    # Step 5: Queue the interaction for the history writer
+    # We store the relative path for frontend access, plus the detections so the
+    # annotated image can be rendered later
     relative_image_path = f"/static/uploads/{safe_filename}"
-    database.log_interaction(
+    INTERACTION_LOG.enqueue(
         session_id=session_id,
         image_path=relative_image_path,
         steps=steps_log,
-        response=response_data.dict()
+        response={**response_data.dict(), "detections": all_preds}
     )
     
     logger.info(f"Processed successfully. Response sent.")
@@ -344,7 +457,7 @@ async def process_audio(
     logger.info(f"Received Audio Processing request: session_id={session_id}")
     
     # Ensure Session Exists
-    database.create_or_update_session(session_id)
+    await EXECUTORS.run("db", database.create_or_update_session, session_id)
     if session_id not in SESSION_TRACKERS:
         SESSION_TRACKERS[session_id] = MahjongStateTracker()
         logger.info("Created new tracker for session (from audio)")
@@ -356,8 +469,7 @@ async def process_audio(
     file_path = os.path.join(UPLOAD_DIR, filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
+        await EXECUTORS.run("io", save_upload, audio.file, file_path)
         logger.info(f"Audio saved to {file_path}")
     except Exception as e:
         logger.error(f"Failed to save audio: {e}")
@@ -370,7 +482,7 @@ async def process_audio(
         
     # STT
     try:
-        transcript = STT_SERVICE.transcribe(file_path)
+        transcript = await EXECUTORS.run("external", STT_SERVICE.transcribe, file_path)
     except Exception as e:
         logger.error(f"STT failed: {e}")
         return ProcessAudioResponse(
@@ -383,7 +495,7 @@ async def process_audio(
     # LLM
     events = []
     if transcript:
-        events = LLM_SERVICE.analyze_game_events(transcript)
+        events = await EXECUTORS.run("external", LLM_SERVICE.analyze_game_events, transcript)
         
     # Update State
     tracker = SESSION_TRACKERS[session_id]
@@ -408,7 +520,7 @@ async def process_audio(
         f"Visible tiles updated: {update_result['updated_count']}"
     ]
     
-    database.log_interaction(
+    INTERACTION_LOG.enqueue(
         session_id=session_id,
         image_path=None, # No image for audio interaction
         steps=steps_log,
@@ -425,83 +537,271 @@ async def process_audio(
 @app.post("/api/end-session")
 async def end_session(request: EndSessionRequest):
     logger.info(f"Received End Session request: session_id={request.session_id}")
-    database.end_session(request.session_id)
+    await EXECUTORS.run("db", database.end_session, request.session_id)
     # Cleanup Tracker
     SESSION_TRACKERS.pop(request.session_id, None)
+    VISION_SERVICE.forget_session(request.session_id)
+    if TEMPORAL_FUSION:
+        TEMPORAL_FUSION.forget(request.session_id)
     return {"status": "success", "message": "Session ended"}
 
 # --- History APIs ---
 
 @app.get("/api/history/sessions")
 async def get_history_sessions():
-    return database.get_all_sessions()
+    return await EXECUTORS.run("db", database.get_all_sessions)
+
+@app.get("/api/history/sessions/page")
+async def get_history_sessions_page(
+    limit: int = Query(50, ge=1, le=config.HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """Sessions by most recent activity, one page at a time; pass next_cursor back to get the next page."""
+    try:
+        return await EXECUTORS.run("db", database.get_sessions_page, limit, cursor)
+    except ValueError:
+        return JSONResponse(status_code=422, content={"error": "Invalid cursor"})
+
+@app.get("/api/history/sessions/{session_id}/interactions")
+async def get_history_interactions(
+    session_id: str,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=config.HISTORY_MAX_PAGE_SIZE),
+    include_steps: bool = False
+):
+    """
+    Interactions of a session with id > after_id, oldest first, plus the session row.
+    Poll with after_id = last_id to fetch only new rows; steps_log is only
+    included with include_steps=true.
+    """
+    session = await EXECUTORS.run("db", database.get_session, session_id)
+    if not session:
+        return {"error": "Session not found"}
+    interactions = await EXECUTORS.run(
+        "db", database.get_interactions, session_id, after_id, limit + 1, include_steps
+    )
+    has_more = len(interactions) > limit
+    interactions = interactions[:limit]
+    return {
+        "session": session,
+        "interactions": interactions,
+        "last_id": interactions[-1]["id"] if interactions else after_id,
+        "has_more": has_more
+    }
 
 @app.get("/api/history/details/{session_id}")
 async def get_history_details(session_id: str):
-    details = database.get_session_details(session_id)
+    details = await EXECUTORS.run("db", database.get_session_details, session_id)
     if not details:
         return {"error": "Session not found"}
     return details
 
+@app.get("/api/history/stream")
+async def history_stream(request: Request, session_id: Optional[str] = None):
+    """
+    Server-Sent Events for the dashboard: "session" events when any session is
+    created or ends, plus "interaction" events (the new row, same shape as in
+    /api/history/details) for session_id as they are logged.
+    """
+    subscription = EVENT_BUS.subscribe(["sessions"] + ([f"session:{session_id}"] if session_id else []))
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=config.EVENT_STREAM_KEEPALIVE_SECONDS)
+                yield format_sse(message) if message else ": keepalive\n\n"
+        finally:
+            EVENT_BUS.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe for the load balancer: 200 once every subsystem is loaded and warm, 503 before."""
+    try:
+        schema_version = await EXECUTORS.run("db", database.schema_version)
+        database_ok = schema_version == len(database.MIGRATIONS)
+        database_status = {"ok": database_ok, "schema_version": schema_version}
+    except Exception as e:
+        database_ok = False
+        database_status = {"ok": False, "error": str(e)}
+    subsystems = {
+        "vision": VISION_SERVICE.readiness(),
+        "efficiency_engine": {"warmed_up": EFFICIENCY_ENGINE.warmed_up},
+        "database": database_status,
+    }
+    is_ready = VISION_SERVICE.warmed_up and EFFICIENCY_ENGINE.warmed_up and database_ok
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "subsystems": subsystems}
+    )
+
+@app.get("/api/metrics")
+async def get_metrics():
+    return {
+        "vision": VISION_SERVICE.metrics(),
+        "temporal_fusion": TEMPORAL_FUSION.metrics() if TEMPORAL_FUSION else None,
+        "annotations": ANNOTATION_RENDERER.metrics(),
+        "live_stream": LIVE_STREAM_METRICS.metrics(),
+        "executors": EXECUTORS.metrics(),
+        "event_streams": EVENT_BUS.metrics(),
+        "database": database.connection_stats(),
+        "interaction_log": INTERACTION_LOG.metrics(),
+        "retention": RETENTION_JOB.metrics()
+    }
+
+def fuse_live_detections(session_id: Optional[str], detections):
+    """Temporal smoothing of a live frame: (detections, stable, stable_frames, stable_hand)."""
+    if not session_id or not TEMPORAL_FUSION:
+        return detections, False, 0, None
+    # Cached (deduplicated) frames carry no new evidence, so they must not count as fresh votes
+    fused = TEMPORAL_FUSION.update(f"{session_id}:live", detections, fresh=not detections.reused)
+    stable_hand = None
+    if fused["stable_labels"] is not None:
+        stable_hand, _ = convert_to_mpsz(fused["stable_labels"])
+    return fused["detections"], fused["stable"], fused["stable_frames"], stable_hand
+
 @app.post("/api/detect-tiles", response_model=DetectTilesResponse)
 async def detect_tiles(
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    session_id: Optional[str] = Form(None)
 ):
     """
     轻量检测 API：仅做 YOLO 推理返回检测框，不含状态追踪和效率计算。
     用于实时检测模式的连续拍照检测。
+    session_id 可选，用于按上一帧的牌面大小选择推理分辨率；启用 YOLO_ROI_ENABLED 时还会将推理裁剪到上一帧牌面所在区域 (ROI)。
+    启用 FRAME_DEDUP_ENABLED 时，与上一帧几乎相同的画面（感知哈希）直接复用上次的检测结果。
+    启用 TEMPORAL_FUSION_ENABLED 且提供 session_id 时，检测结果会跨帧平滑（框位置平滑 + 类别投票），手牌连续稳定若干帧后返回 stable_hand。
     """
-    import time
     start_time = time.time()
     
-    # 保存临时图片
-    timestamp = int(datetime.datetime.now().timestamp() * 1000)
-    temp_filename = f"detect_{timestamp}.jpg"
-    temp_path = os.path.join(UPLOAD_DIR, temp_filename)
-    
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+        # 上传内容直接在内存中解码，不再写临时文件
+        read_start = time.perf_counter()
+        data = await image.read()
+        read_ms = (time.perf_counter() - read_start) * 1000
         
         # 仅执行 YOLO 推理
-        preds = VISION_SERVICE.detect_objects(temp_path)
-        
-        # 转换为 xyxy 格式
-        detections = []
-        for p in preds:
-            cx = p.get('x', 0)
-            cy = p.get('y', 0)
-            w = p.get('width', 0)
-            h = p.get('height', 0)
-            detections.append(TileDetection(
-                class_name=p.get('class', '?'),
-                x1=cx - w / 2,
-                y1=cy - h / 2,
-                x2=cx + w / 2,
-                y2=cy + h / 2,
-                confidence=p.get('confidence', 0.0)
-            ))
+        detections = await VISION_SERVICE.detect_async(
+            data, session_key=f"{session_id}:live" if session_id else None, track_roi=True
+        )
+        timings = {"read_ms": read_ms, **(detections.timings or {})}
+
+        detections, stable, stable_frames, stable_hand = fuse_live_detections(session_id, detections)
         
         inference_time = (time.time() - start_time) * 1000
         logger.info(f"Detect-tiles: found {len(detections)} tiles in {inference_time:.0f}ms")
         
-        return DetectTilesResponse(
-            detections=detections,
-            inference_time_ms=round(inference_time, 1)
-        )
+        # 检测结果直接按 TileDetection 字段（xyxy）序列化
+        return {
+            "detections": detections.to_records(),
+            "inference_time_ms": round(inference_time, 1),
+            "stable": stable,
+            "stable_frames": stable_frames,
+            "stable_hand": stable_hand,
+            "timings": {stage: round(ms, 2) for stage, ms in timings.items()}
+        }
     except Exception as e:
         logger.error(f"Detect-tiles error: {e}")
         return DetectTilesResponse(detections=[], inference_time_ms=0)
+
+@app.websocket("/ws/detect")
+async def ws_detect(websocket: WebSocket, session_id: Optional[str] = None, format: str = "json"):
+    """
+    实时检测的 WebSocket 版本：客户端持续发送二进制 JPEG 帧，服务端逐帧推送检测结果，
+    省去每帧一次 HTTP 请求与 multipart 解析。
+    模型忙时只保留最新一帧（旧帧直接丢弃），延迟不会随积压增长。
+    连接后先收到 {"type": "hello", "class_names": [...]}；之后每帧一条结果：
+    format=json 时为与 /api/detect-tiles 相同字段的 JSON（另含 frame 序号与 dropped_frames），
+    format=binary 时为 live_stream.encode_binary_message() 的紧凑二进制格式。
+    session_id 的含义与 /api/detect-tiles 相同。
+    """
+    if format not in ("json", "binary"):
+        await websocket.close(code=1003)
+        return
+    await websocket.accept()
+    await websocket.send_json({"type": "hello", "class_names": list(VISION_SERVICE.model.class_names), "format": format})
+
+    LIVE_STREAM_METRICS.connected()
+    frames = LatestFrameBuffer(LIVE_STREAM_METRICS)
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if not data:
+                    continue
+                if len(data) > config.WS_DETECT_MAX_FRAME_BYTES:
+                    await websocket.send_json({"type": "error", "detail": "frame too large"})
+                    continue
+                frames.put(data)
+        finally:
+            frames.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            item = await frames.get()
+            # The buffer is closed once the client has gone: don't infer a frame nobody will receive
+            if item is None or frames.closed:
+                break
+            seq, data = item
+            start_time = time.perf_counter()
+            detections = await VISION_SERVICE.detect_async(
+                data, session_key=f"{session_id}:live" if session_id else None, track_roi=True
+            )
+            if frames.closed:
+                break
+            timings = detections.timings or {}
+            detections, stable, stable_frames, stable_hand = fuse_live_detections(session_id, detections)
+            inference_time = (time.perf_counter() - start_time) * 1000
+            LIVE_STREAM_METRICS.frame_processed()
+
+            if format == "binary":
+                await websocket.send_bytes(encode_binary_message(seq, detections, inference_time, stable))
+            else:
+                await websocket.send_json({
+                    "type": "detections",
+                    "frame": seq,
+                    "detections": detections.to_records(),
+                    "inference_time_ms": round(inference_time, 1),
+                    "stable": stable,
+                    "stable_frames": stable_frames,
+                    "stable_hand": stable_hand,
+                    "dropped_frames": frames.dropped,
+                    "timings": {stage: round(ms, 2) for stage, ms in timings.items()}
+                })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        # A send racing the client's disconnect is a normal close, not an error
+        if not frames.closed:
+            logger.error(f"WS detect error: {e}")
     finally:
-        # 清理临时文件
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        receiver.cancel()
+        try:
+            await receiver
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+        except Exception as e:
+            logger.error(f"WS detect receiver error: {e}")
+        LIVE_STREAM_METRICS.disconnected()
+        logger.info(f"WS detect closed: {frames.received} frames received, {frames.dropped} dropped")
 
 @app.post("/api/debug/yolo")
 async def debug_yolo(
     image: UploadFile = File(...),
     conf_threshold: float = Form(0.54),
-    iou_threshold: float = Form(0.85)
+    iou_threshold: float = Form(0.85),
+    sliced: bool = Form(False)
 ):
     timestamp = int(datetime.datetime.now().timestamp() * 1000)
     file_extension = os.path.splitext(image.filename)[1] or ".jpg"
@@ -509,28 +809,25 @@ async def debug_yolo(
     file_path = os.path.join(UPLOAD_DIR, safe_filename)
     
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+        await EXECUTORS.run("io", save_upload, image.file, file_path)
     except Exception as e:
         return {"error": f"Failed to save image: {str(e)}"}
 
     # Run detection with custom thresholds
-    preds = VISION_SERVICE.detect_objects(
+    preds = await VISION_SERVICE.detect_objects_async(
         file_path, 
         conf_threshold=conf_threshold, 
-        iou_threshold=iou_threshold
+        iou_threshold=iou_threshold,
+        sliced=sliced
     )
     
     # Sort predictions
     preds.sort(key=lambda p: p.get("x", 0))
 
-    # Generate annotated image
+    # Annotated image is rendered when the page loads it
     annotated_filename = f"debug_{timestamp}_annotated.jpg"
-    annotated_full_path = os.path.join(UPLOAD_DIR, annotated_filename)
-    
-    annotated_url = None
-    if draw_bounding_boxes(file_path, preds, annotated_full_path):
-        annotated_url = f"/static/uploads/{annotated_filename}"
+    ANNOTATION_RENDERER.schedule(file_path, preds, annotated_filename)
+    annotated_url = f"/static/uploads/{annotated_filename}"
         
     return {
         "predictions": preds,
@@ -538,7 +835,8 @@ async def debug_yolo(
         "original_image_url": f"/static/uploads/{safe_filename}",
         "params": {
             "conf_threshold": conf_threshold,
-            "iou_threshold": iou_threshold
+            "iou_threshold": iou_threshold,
+            "sliced": sliced
         }
     }
 
@@ -551,18 +849,66 @@ async def monitor_inactive_sessions():
         try:
             await asyncio.sleep(60)
             # Check for sessions inactive for > 300 seconds
-            closed_sessions = database.close_inactive_sessions(300)
+            closed_sessions = await EXECUTORS.run("db", database.close_inactive_sessions, 300)
             if len(closed_sessions) > 0:
                 logger.info(f"Monitor: Closed {len(closed_sessions)} inactive sessions.")
                 for sid in closed_sessions:
                     SESSION_TRACKERS.pop(sid, None)
+                    VISION_SERVICE.forget_session(sid)
+                    if TEMPORAL_FUSION:
+                        TEMPORAL_FUSION.forget(sid)
         except Exception as e:
             logger.error(f"Monitor Error: {e}")
             await asyncio.sleep(60) # Wait before retrying
 
+async def retention_task():
+    """Background task archiving old sessions every RETENTION_INTERVAL_HOURS (when RETENTION_DAYS is set)."""
+    logger.info(f"Starting retention job: archive after {config.RETENTION_DAYS} days"
+                f"{' (dry run)' if config.RETENTION_DRY_RUN else ''}")
+    while True:
+        try:
+            # First pass shortly after boot, once warmup is out of the way
+            await asyncio.sleep(300)
+            report = await EXECUTORS.run("io", RETENTION_JOB.run, dry_run=config.RETENTION_DRY_RUN)
+            logger.info(f"Retention: {'would archive' if report['dry_run'] else 'archived'} {report['sessions']} "
+                        f"sessions ({report['interactions']} interactions, {report['files']} files, "
+                        f"{report['bytes'] / 1e6:.1f} MB) and {report['orphan_files']} orphaned uploads; "
+                        f"vacuumed {report['vacuumed_pages']} pages in {report['duration_ms']:.0f}ms")
+        except Exception as e:
+            logger.error(f"Retention Error: {e}")
+        await asyncio.sleep(max(0.0, config.RETENTION_INTERVAL_HOURS * 3600 - 300))
+
+async def warmup_services():
+    """Warm the model sessions and efficiency engine in the background after boot."""
+    try:
+        if config.WARMUP_ENABLED:
+            # A few seconds of CPU search; keep it off the event loop
+            await EXECUTORS.run("compute", EFFICIENCY_ENGINE.warmup)
+            await VISION_SERVICE.warmup_async(
+                passes=config.WARMUP_PASSES,
+                frame_size=(config.WARMUP_FRAME_WIDTH, config.WARMUP_FRAME_HEIGHT)
+            )
+        else:
+            EFFICIENCY_ENGINE.warmed_up = True
+            VISION_SERVICE.warmed_up = True
+        logger.info("Warmup complete, service ready.")
+    except Exception as e:
+        logger.error(f"Warmup Error: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush queued history before the DB connections go away
+    await asyncio.get_running_loop().run_in_executor(None, INTERACTION_LOG.stop)
+    EXECUTORS.shutdown(wait=True)
+    database.close_connections()
+
 @app.on_event("startup")
 async def startup_event():
+    INTERACTION_LOG.start()
     asyncio.create_task(monitor_inactive_sessions())
+    if config.RETENTION_DAYS > 0:
+        asyncio.create_task(retention_task())
+    asyncio.create_task(warmup_services())
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
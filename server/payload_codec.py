@@ -0,0 +1,78 @@
+"""
+Storage format of the interactions.steps_log / response_json columns.
+
+Rows are either plain JSON text (the original format, still written with
+DB_PAYLOAD_COMPRESSION=none) or a BLOB: a 2-byte header (b"Z", dictionary
+id) followed by a zlib stream of compact UTF-8 JSON. Dictionary id 0 means
+no preset dictionary. decode_payload() accepts both, so the columns may mix
+formats while a database is being migrated.
+"""
+import json
+import zlib
+from typing import Any, Dict
+
+MAGIC = b"Z"
+
+# Preset dictionaries for zlib (zdict): fragments that recur in nearly every
+# row, most frequent last. Payloads reference a dictionary by id, so an
+# existing entry must never change; add a new id for a new dictionary.
+_DICTIONARY_V1_FRAGMENTS = (
+    '"visible_tiles_snapshot":{', '"updated_visible_tiles_count":', '"events":[', '"details":[',
+    '"transcript":"', '"audio_path":"/static/uploads/', 'Audio processed', 'Transcript: ', 'Events found: ',
+    'Visible tiles updated: ', '吃', '碰', '杠', '胡: ', '摸: ', '(切 ', '向听数: ', '进张数: ', '完成 / 未找到切牌建议',
+    'WARNING: Initial state invalid: Found ', ' tiles (Expected 13/14). Please ensure all tiles are visible.',
+    'Created new tracker for session', 'State Update: Action=', 'Session verified/active',
+    'Received request with image: ', 'Starting AI analysis...', 'Splitting image for dual inference (Hand/Melded)...',
+    'Analyzing Hand (Top Half) and Melded (Bottom Half)...', 'Stage timings: Hand preprocess=',
+    'ms inference=', 'ms postprocess=', 'ms nms=', 'ms; Melded preprocess=', 'Scheduled annotated image with combined results',
+    'Result: Hand=[', '], Melded=[', 'Updating state tracker...', 'Analysing optimal move...',
+    'Pipeline: read ', 'ms | decode ', 'ms | session ', 'ms | save ', 'ms | detect ', 'ms | tracker ', 'ms | engine ',
+    '; critical path ', '(read > decode > detect > tracker > engine), elapsed ', 'Analysis complete. Generating response.',
+    'Image saved to ', '/static/uploads/', '_annotated.jpg"',
+    '"1m","2m","3m","4m","5m","6m","7m","8m","9m","1p","2p","3p","4p","5p","6p","7p","8p","9p",'
+    '"1s","2s","3s","4s","5s","6s","7s","8s","9s","1z","2z","3z","4z","5z","6z","7z"',
+    '"warning":null,"is_stable":true,', '"action_detected":null,', '"annotated_image_path":"/static/uploads/',
+    '"suggested_play":"切 ', '"melded_tiles":[', '{"user_hand":[',
+    '"detections":[{"class_name":"', '","x1":', ',"y1":', ',"x2":', ',"y2":', ',"confidence":0.', '},{"class_name":"',
+)
+DICTIONARIES: Dict[int, bytes] = {
+    1: "".join(_DICTIONARY_V1_FRAGMENTS).encode("utf-8"),
+}
+DEFAULT_DICTIONARY = 1
+
+COMPRESSION_MODES = ("none", "zlib")
+
+
+def encode_payload(value: Any, compression: str = "none", dictionary: int = DEFAULT_DICTIONARY, level: int = 6):
+    """JSON text (compression="none") or a compressed BLOB of value."""
+    if compression == "none":
+        return json.dumps(value)
+    if compression != "zlib":
+        raise ValueError(f"Unknown payload compression: {compression}")
+
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if dictionary:
+        compressor = zlib.compressobj(level, zdict=DICTIONARIES[dictionary])
+    else:
+        compressor = zlib.compressobj(level)
+    return MAGIC + bytes([dictionary]) + compressor.compress(data) + compressor.flush()
+
+
+def decode_payload(stored) -> Any:
+    """Inverse of encode_payload() for either format."""
+    if isinstance(stored, (bytes, memoryview)):
+        stored = bytes(stored)
+        if stored[:1] != MAGIC or len(stored) < 2:
+            raise ValueError("Not a compressed payload")
+        dictionary = stored[1]
+        if dictionary:
+            decompressor = zlib.decompressobj(zdict=DICTIONARIES[dictionary])
+        else:
+            decompressor = zlib.decompressobj()
+        data = decompressor.decompress(stored[2:]) + decompressor.flush()
+        return json.loads(data.decode("utf-8"))
+    return json.loads(stored)
+
+
+def is_compressed(stored) -> bool:
+    return isinstance(stored, (bytes, memoryview))
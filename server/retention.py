@@ -0,0 +1,232 @@
+import io
+import json
+import logging
+import os
+import re
+import tarfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Upload names are "<session_id>_<epoch ms>[_annotated].<ext>" (debug_... for /api/debug/yolo)
+UPLOAD_NAME_RE = re.compile(r"^(?P<owner>.+)_\d{10,}(?:_[a-z]+)?\.\w+$")
+UPLOADS_PREFIX = "/static/uploads/"
+
+
+def _safe_name(session_id: str) -> str:
+    return re.sub(r"[^\w.-]", "_", session_id)
+
+
+class RetentionJob:
+    """
+    Archives ended sessions whose last activity is older than retention_days.
+
+    Each session becomes one <archive_dir>/<YYYY-MM>/<session_id>.tar.gz
+    holding session.json (the session row and its decoded interactions) and
+    its uploads (photos, annotated images, audio). Only once the bundle is
+    on disk are the rows deleted and the uploads removed. Upload files that
+    no remaining session owns and that are older than the cutoff (debug
+    images, annotations of never-logged requests) go into an orphans bundle.
+    Freed database pages are then returned a few at a time with
+    incremental_vacuum, pausing between steps so request writes get in.
+
+    Everything is per session and short, so run() can run on a worker
+    thread while the server keeps serving. dry_run=True only reports.
+    """
+
+    def __init__(self, upload_dir: str, archive_dir: str, retention_days: float,
+                 vacuum_pages: int = 256, vacuum_pause: float = 0.05, batch_size: int = 50):
+        self.upload_dir = upload_dir
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.vacuum_pause = vacuum_pause
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._running = False
+        self._runs = 0
+        self._last_report = None
+
+    def _upload_path(self, url_path: Optional[str]) -> Optional[str]:
+        if not url_path or not url_path.startswith(UPLOADS_PREFIX):
+            return None
+        return os.path.join(self.upload_dir, os.path.basename(url_path))
+
+    def _index_uploads(self) -> Dict[str, List[os.DirEntry]]:
+        """Upload files grouped by the session id (or debug prefix) in their name, in one directory scan."""
+        index = {}
+        if not os.path.isdir(self.upload_dir):
+            return index
+        with os.scandir(self.upload_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                match = UPLOAD_NAME_RE.match(entry.name)
+                owner = match.group("owner") if match else ""
+                index.setdefault(owner, []).append(entry)
+        return index
+
+    def _session_files(self, details: Dict, index: Dict[str, List[os.DirEntry]]) -> List[str]:
+        paths = set()
+        for interaction in details["interactions"]:
+            response = interaction.get("response_json") or {}
+            for url_path in (interaction.get("image_path"), interaction.get("annotated_image_path"),
+                             response.get("annotated_image_path"), response.get("audio_path")):
+                path = self._upload_path(url_path)
+                if path and os.path.isfile(path):
+                    paths.add(path)
+        paths.update(entry.path for entry in index.get(details["session_id"], []))
+        return sorted(paths)
+
+    def _write_bundle(self, name: str, month: str, manifest: Dict, files: List[str]) -> str:
+        target_dir = os.path.join(self.archive_dir, month)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, f"{name}.tar.gz")
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            with tarfile.open(fileobj=f, mode="w:gz") as tar:
+                data = json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+                info = tarfile.TarInfo("session.json")
+                info.size = len(data)
+                info.mtime = int(time.time())
+                tar.addfile(info, io.BytesIO(data))
+                for path in files:
+                    tar.add(path, arcname=f"uploads/{os.path.basename(path)}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        return target
+
+    def _remove_files(self, files: List[str]):
+        for path in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def run(self, dry_run: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """Archive (or with dry_run, list) everything past the retention period. Returns a report."""
+        with self._lock:
+            if self._running:
+                raise RuntimeError("Retention job is already running")
+            self._running = True
+        try:
+            report = self._run(dry_run, now if now is not None else time.time())
+        finally:
+            with self._lock:
+                self._running = False
+        with self._lock:
+            self._runs += 1
+            self._last_report = {k: v for k, v in report.items() if k != "session_details"}
+        return report
+
+    def _run(self, dry_run: bool, now: float) -> Dict[str, Any]:
+        start = time.perf_counter()
+        cutoff_ms = int((now - self.retention_days * 86400) * 1000)
+        report = {
+            "dry_run": dry_run,
+            "cutoff": datetime.fromtimestamp(cutoff_ms / 1000).isoformat(),
+            "sessions": 0, "interactions": 0, "files": 0, "bytes": 0,
+            "orphan_files": 0, "orphan_bytes": 0,
+            "skipped": 0, "errors": 0, "vacuumed_pages": 0,
+            "session_details": [],
+        }
+        index = self._index_uploads()
+
+        last = None
+        while True:
+            batch = database.get_archivable_sessions(cutoff_ms, self.batch_size, after=last)
+            if not batch:
+                break
+            last = batch[-1]
+            for session in batch:
+                session_id = session["session_id"]
+                try:
+                    self._archive_session(session, index, cutoff_ms, dry_run, report)
+                except Exception as e:
+                    report["errors"] += 1
+                    logger.error(f"Retention: failed to archive session {session_id}: {e}")
+
+        self._archive_orphans(index, cutoff_ms, now, dry_run, report)
+
+        stats = database.vacuum_stats()
+        report["freelist_pages"] = stats["freelist_count"]
+        if not dry_run and stats["auto_vacuum"] == "incremental":
+            while True:
+                freed = database.incremental_vacuum(self.vacuum_pages)
+                report["vacuumed_pages"] += freed
+                if freed < self.vacuum_pages:
+                    break
+                time.sleep(self.vacuum_pause)
+        elif not dry_run and stats["freelist_count"]:
+            logger.info("Retention: auto_vacuum is not incremental; freed pages will be reused but not returned")
+
+        report["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return report
+
+    def _archive_session(self, session: Dict, index, cutoff_ms: int, dry_run: bool, report: Dict):
+        session_id = session["session_id"]
+        details = database.get_session_details(session_id)
+        if details is None:
+            return
+        files = self._session_files(details, index)
+        size = sum(os.path.getsize(path) for path in files)
+        summary = {
+            "session_id": session_id,
+            "last_activity_time": session["last_activity_time"],
+            "interactions": len(details["interactions"]),
+            "files": len(files),
+            "bytes": size,
+        }
+
+        if not dry_run:
+            month = datetime.fromtimestamp((session["last_activity_ms"] or 0) / 1000).strftime("%Y-%m")
+            bundle = self._write_bundle(_safe_name(session_id), month, details, files)
+            # Re-checked in the DELETE: a session reactivated meanwhile is kept
+            if database.delete_session(session_id, inactive_before_ms=cutoff_ms) is None:
+                os.remove(bundle)
+                report["skipped"] += 1
+                return
+            self._remove_files(files)
+            summary["archive"] = bundle
+        index.pop(session_id, None)
+
+        report["sessions"] += 1
+        report["interactions"] += summary["interactions"]
+        report["files"] += summary["files"]
+        report["bytes"] += size
+        report["session_details"].append(summary)
+
+    def _archive_orphans(self, index, cutoff_ms: int, now: float, dry_run: bool, report: Dict):
+        """Old uploads no remaining interaction or session refers to."""
+        referenced = {self._upload_path(p) for p in database.referenced_upload_paths()}
+        sessions = {s["session_id"] for s in database.get_all_sessions()}
+        orphans = [
+            entry.path for owner, entries in index.items() if owner not in sessions
+            for entry in entries
+            if entry.path not in referenced and entry.stat().st_mtime * 1000 < cutoff_ms
+        ]
+        if not orphans:
+            return
+        size = sum(os.path.getsize(path) for path in orphans)
+        if not dry_run:
+            manifest = {"orphans": [os.path.basename(path) for path in orphans]}
+            name = f"orphans_{datetime.fromtimestamp(now).strftime('%Y%m%d_%H%M%S')}"
+            self._write_bundle(name, datetime.fromtimestamp(now).strftime("%Y-%m"), manifest, orphans)
+            self._remove_files(orphans)
+        report["orphan_files"] = len(orphans)
+        report["orphan_bytes"] = size
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "retention_days": self.retention_days,
+                "running": self._running,
+                "runs": self._runs,
+                "last_report": self._last_report,
+            }
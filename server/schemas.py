@@ -33,3 +33,7 @@ class TileDetection(BaseModel):
 class DetectTilesResponse(BaseModel):
     detections: List[TileDetection]
     inference_time_ms: float
+    stable: bool = False
+    stable_frames: int = 0
+    stable_hand: Optional[List[str]] = None
+    timings: Optional[Dict[str, float]] = None
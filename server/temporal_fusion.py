@@ -0,0 +1,183 @@
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict
+
+import numpy as np
+
+from yolo_inference import DETECTION_DTYPE, Detections
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes, as an (N, M) matrix."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    inter_w = (np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])).clip(0)
+    inter_h = (np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])).clip(0)
+    inter = inter_w * inter_h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(iou: np.ndarray, threshold: float):
+    """Match rows to columns by descending IoU. Returns a list of (row, col) pairs."""
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+
+    matches = []
+    used_rows, used_cols = set(), set()
+    for r, c in zip(rows[order], cols[order]):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        matches.append((int(r), int(c)))
+    return matches
+
+
+class _Track:
+    __slots__ = ("box", "confidence", "votes", "hits", "misses")
+
+    def __init__(self, box: np.ndarray, label: int, confidence: float):
+        self.box = box.astype(np.float32)
+        self.confidence = confidence
+        self.votes = defaultdict(float)
+        self.votes[label] = confidence
+        self.hits = 1
+        self.misses = 0
+
+    @property
+    def label(self) -> int:
+        return max(self.votes, key=self.votes.get)
+
+
+class TemporalFusion:
+    """
+    Per-session temporal smoothing for live tile detection.
+
+    Detections are associated with the previous frames' tracks by IoU, each
+    track's label is a confidence-weighted vote over recent frames (older
+    votes decay), and boxes are smoothed with an exponential moving average.
+    Tracks are confirmed after min_hits matches and dropped after max_misses
+    frames without one; confirmed tracks keep being reported while missed.
+    The hand is reported stable once the confirmed labels (left to right)
+    have been identical for stable_frames frames with no unconfirmed
+    tracks pending. Frames that repeat an earlier result (fresh=False, e.g.
+    served from the frame deduplicator's cache) report the current state
+    without voting, so they cannot make a hand look more stable than it is.
+    """
+
+    def __init__(self, match_iou: float = 0.3, min_hits: int = 3, max_misses: int = 2, stable_frames: int = 3,
+                 vote_decay: float = 0.8, box_smoothing: float = 0.5, max_sessions: int = 256):
+        self.match_iou = match_iou
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.stable_frames = stable_frames
+        self.vote_decay = vote_decay
+        self.box_smoothing = box_smoothing
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, session_key: str, detections: Detections, fresh: bool = True) -> Dict[str, Any]:
+        """
+        Fuse one frame of detections. Returns the smoothed Detections plus
+        stability info; stable_labels are class names, left to right.
+        """
+        xyxy = detections.xyxy
+        class_ids = detections.class_id.tolist()
+        confidences = detections.confidence.tolist()
+
+        with self._lock:
+            state = self._sessions.get(session_key)
+            new_session = state is None
+            if new_session:
+                state = {"tracks": [], "last_labels": None, "consistent_frames": 0, "class_names": None}
+                self._sessions[session_key] = state
+            self._sessions.move_to_end(session_key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            if not fresh and not new_session:
+                return self._report(state)
+
+            # Empty results (e.g. an unreadable frame) may not carry the class table
+            if len(detections.class_names) or state["class_names"] is None:
+                state["class_names"] = detections.class_names
+
+            tracks = state["tracks"]
+            track_boxes = np.array([t.box for t in tracks], dtype=np.float32).reshape(-1, 4)
+            matches = greedy_match(iou_matrix(track_boxes, xyxy), self.match_iou)
+
+            matched_tracks = set()
+            matched_dets = set()
+            for t_idx, d_idx in matches:
+                track = tracks[t_idx]
+                confidence = confidences[d_idx]
+                track.box = self.box_smoothing * xyxy[d_idx] + (1 - self.box_smoothing) * track.box
+                track.confidence = self.box_smoothing * confidence + (1 - self.box_smoothing) * track.confidence
+                for label in track.votes:
+                    track.votes[label] *= self.vote_decay
+                track.votes[class_ids[d_idx]] += confidence
+                track.hits += 1
+                track.misses = 0
+                matched_tracks.add(t_idx)
+                matched_dets.add(d_idx)
+
+            survivors = []
+            for i, track in enumerate(tracks):
+                if i not in matched_tracks:
+                    track.misses += 1
+                    if track.misses > self.max_misses:
+                        continue
+                survivors.append(track)
+            for d_idx in range(len(detections)):
+                if d_idx not in matched_dets:
+                    survivors.append(_Track(xyxy[d_idx], class_ids[d_idx], confidences[d_idx]))
+            state["tracks"] = survivors
+
+            confirmed = sorted((t for t in survivors if t.hits >= self.min_hits), key=lambda t: t.box[0])
+            pending = any(t.hits < self.min_hits for t in survivors)
+            labels = [t.label for t in confirmed]
+
+            if labels and not pending and labels == state["last_labels"]:
+                state["consistent_frames"] += 1
+            else:
+                state["consistent_frames"] = 1 if labels and not pending else 0
+            state["last_labels"] = labels
+            return self._report(state)
+
+    def _report(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Smoothed detections and stability of a session's current tracks (caller holds the lock)."""
+        class_names = state["class_names"]
+        stable = state["consistent_frames"] >= self.stable_frames
+        # Confirmed tracks coast through short misses; unconfirmed ones only show while seen
+        visible = sorted((t for t in state["tracks"] if t.hits >= self.min_hits or t.misses == 0),
+                         key=lambda t: t.box[0])
+        fused = np.empty(len(visible), dtype=DETECTION_DTYPE)
+        if visible:
+            boxes = np.array([t.box for t in visible], dtype=np.float32)
+            for i, field in enumerate(('x1', 'y1', 'x2', 'y2')):
+                fused[field] = boxes[:, i]
+            fused['confidence'] = [t.confidence for t in visible]
+            fused['class_id'] = [t.label for t in visible]
+        return {
+            "detections": Detections(fused, class_names),
+            "stable": stable,
+            "stable_frames": state["consistent_frames"],
+            "stable_labels": class_names[state["last_labels"]].tolist() if stable else None,
+        }
+
+    def forget(self, session_id: str):
+        with self._lock:
+            for key in [k for k in self._sessions if k == session_id or k.startswith(f"{session_id}:")]:
+                del self._sessions[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "tracked_sessions": len(self._sessions),
+                "stable_sessions": sum(
+                    1 for s in self._sessions.values() if s["consistent_frames"] >= self.stable_frames
+                ),
+            }
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+from annotation_renderer import AnnotationRenderer
+
+PREDS = [{'x': 50.0, 'y': 50.0, 'width': 20.0, 'height': 30.0, 'class': '1B', 'confidence': 0.9}]
+
+
+class TestAnnotationRenderer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.source = os.path.join(self.dir, "s_1.jpg")
+        Image.new("RGB", (200, 100), "white").save(self.source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_schedule_is_lazy_and_ensure_renders_once(self):
+        renderer = AnnotationRenderer(self.dir)
+        renderer.schedule(self.source, PREDS, "s_1_annotated.jpg")
+        output = os.path.join(self.dir, "s_1_annotated.jpg")
+        self.assertFalse(os.path.exists(output))
+
+        self.assertTrue(renderer.ensure("s_1_annotated.jpg"))
+        self.assertTrue(os.path.exists(output))
+        self.assertTrue(renderer.ensure("s_1_annotated.jpg"))
+        self.assertEqual(renderer.metrics()["rendered_on_request"], 1)
+        self.assertEqual(renderer.metrics()["pending"], 0)
+
+    def test_loader_rebuilds_unknown_job(self):
+        renderer = AnnotationRenderer(self.dir, loader=lambda name: (self.source, PREDS) if name == "s_1_annotated.jpg" else None)
+        self.assertTrue(renderer.ensure("s_1_annotated.jpg"))
+        self.assertFalse(renderer.ensure("other_annotated.jpg"))
+        self.assertEqual(renderer.metrics()["missing"], 1)
+
+    def test_background_mode_renders_without_request(self):
+        renderer = AnnotationRenderer(self.dir, background=True)
+        renderer.schedule(self.source, PREDS, "s_1_annotated.jpg")
+        renderer.executor.shutdown(wait=True)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "s_1_annotated.jpg")))
+        self.assertEqual(renderer.metrics()["rendered_in_background"], 1)
+
+    def test_failed_render_leaves_no_temp_file(self):
+        def partial_render(source_path, predictions, output_path):
+            with open(output_path, "wb") as f:
+                f.write(b"partial")
+            raise OSError("disk full")
+
+        renderer = AnnotationRenderer(self.dir)
+        renderer.schedule(self.source, PREDS, "s_1_annotated.jpg")
+        with mock.patch("annotation_renderer.draw_bounding_boxes", partial_render):
+            self.assertFalse(renderer.ensure("s_1_annotated.jpg"))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["s_1.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import tempfile
+import threading
+import unittest
+
+import database
+
+
+class TestDatabaseConnections(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+
+    def tearDown(self):
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def test_connection_reused_within_thread(self):
+        self.assertIs(database.get_db_connection(), database.get_db_connection())
+
+    def test_connection_per_thread(self):
+        main_conn = database.get_db_connection()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(database.get_db_connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(main_conn, other[0])
+        self.assertEqual(database.connection_stats()["open_connections"], 2)
+
+    def test_pragmas(self):
+        conn = database.get_db_connection()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], database.config.DB_BUSY_TIMEOUT_MS)
+
+    def test_close_connections_reopens(self):
+        conn = database.get_db_connection()
+        database.close_connections()
+        reopened = database.get_db_connection()
+        self.assertIsNot(conn, reopened)
+        database.create_or_update_session("s1")
+        self.assertEqual(database.get_session("s1")["status"], "active")
+
+    def test_writes_visible_across_threads(self):
+        thread = threading.Thread(target=database.log_interaction, args=("s1", "img.jpg", ["step"], {"ok": True}))
+        thread.start()
+        thread.join()
+        interactions = database.get_interactions("s1")
+        self.assertEqual(len(interactions), 1)
+
+    def test_failed_write_rolls_back(self):
+        conn = database.get_db_connection()
+        with self.assertRaises(Exception):
+            with conn:
+                conn.execute("INSERT INTO sessions (session_id, status) VALUES ('s2', 'active')")
+                conn.execute("INSERT INTO no_such_table VALUES (1)")
+        self.assertFalse(conn.in_transaction)
+        self.assertIsNone(database.get_session("s2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import database
+
+
+class TestDatabaseMigrations(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+
+    def tearDown(self):
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def create_legacy_db(self, sessions, interactions):
+        """Schema and rows as written before migrations existed."""
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute('CREATE TABLE sessions (session_id TEXT PRIMARY KEY, start_time TEXT, end_time TEXT, '
+                     'status TEXT, last_activity_time TEXT)')
+        conn.execute('CREATE TABLE interactions (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, '
+                     'timestamp TEXT, image_path TEXT, steps_log TEXT, response_json TEXT)')
+        conn.executemany('INSERT INTO sessions VALUES (?, ?, NULL, ?, ?)', sessions)
+        conn.executemany('INSERT INTO interactions (session_id, timestamp, steps_log, response_json) '
+                         'VALUES (?, ?, "[]", "{}")', interactions)
+        conn.commit()
+        conn.close()
+
+    def test_legacy_db_backfilled(self):
+        old = (datetime.now() - timedelta(hours=1)).isoformat()
+        recent = datetime.now().isoformat()
+        self.create_legacy_db(
+            [("s1", old, "active", old), ("s2", recent, "active", recent)],
+            [("s1", old), ("s2", recent)]
+        )
+        database.init_db()
+
+        conn = database.get_db_connection()
+        self.assertEqual(database.schema_version(), len(database.MIGRATIONS))
+        for session_id, iso in (("s1", old), ("s2", recent)):
+            row = conn.execute('SELECT last_activity_ms FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            self.assertAlmostEqual(row[0], database._epoch_ms(iso), delta=1)
+            row = conn.execute('SELECT timestamp_ms FROM interactions WHERE session_id = ?', (session_id,)).fetchone()
+            self.assertAlmostEqual(row[0], database._epoch_ms(iso), delta=1)
+
+        self.assertEqual(database.close_inactive_sessions(timeout_seconds=300), ["s1"])
+        self.assertEqual(database.get_session("s1")["status"], "ended")
+        self.assertEqual(database.get_session("s2")["status"], "active")
+
+    def test_migrate_is_idempotent(self):
+        database.init_db()
+        database.create_or_update_session("s1")
+        database.init_db()
+        self.assertEqual(database.schema_version(), len(database.MIGRATIONS))
+        self.assertEqual(database.get_session("s1")["status"], "active")
+
+    def test_failed_migration_rolls_back_ddl(self):
+        now = datetime.now().isoformat()
+        self.create_legacy_db([("s1", now, "active", now)], [("s1", now)])
+
+        def broken_epoch_timestamps(c):
+            c.execute('ALTER TABLE sessions ADD COLUMN last_activity_ms INTEGER')
+            c.execute('ALTER TABLE interactions ADD COLUMN timestamp_ms INTEGER')
+            raise sqlite3.OperationalError("forced failure after the ALTERs")
+
+        migrations = [database.MIGRATIONS[0], broken_epoch_timestamps] + database.MIGRATIONS[2:]
+        with mock.patch.object(database, "MIGRATIONS", migrations):
+            with self.assertRaises(sqlite3.OperationalError):
+                database.init_db()
+
+        conn = database.get_db_connection()
+        self.assertEqual(database.schema_version(), 1)
+        columns = [row["name"] for row in conn.execute('PRAGMA table_info(sessions)')]
+        self.assertNotIn("last_activity_ms", columns)
+
+        database.migrate()
+        self.assertEqual(database.schema_version(), len(database.MIGRATIONS))
+        row = conn.execute('SELECT last_activity_ms FROM sessions WHERE session_id = ?', ("s1",)).fetchone()
+        self.assertAlmostEqual(row[0], database._epoch_ms(now), delta=1)
+
+    def test_close_inactive_uses_active_index(self):
+        database.init_db()
+        plan = database.get_db_connection().execute('''
+            EXPLAIN QUERY PLAN UPDATE sessions SET status = 'ended'
+            WHERE status = 'active' AND last_activity_ms < ?
+        ''', (0,)).fetchall()
+        self.assertIn("idx_sessions_active", " ".join(row[-1] for row in plan))
+
+    def test_close_inactive_only_returns_closed(self):
+        database.init_db()
+        database.create_or_update_session("fresh")
+        database.create_or_update_session("ended")
+        database.end_session("ended")
+        self.assertEqual(database.close_inactive_sessions(timeout_seconds=300), [])
+        self.assertEqual(database.close_inactive_sessions(timeout_seconds=-1), ["fresh"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -140,5 +140,25 @@ class TestEfficiencySimulation(unittest.TestCase):
                 
         print(f"[Fuzz] Passed {pass_count}/{iterations} iterations.")
 
+    def test_warmup_leaves_visible_tiles_untouched(self):
+        self.engine.update_tile_count(0, 2)
+        before = list(self.engine.visible_tiles)
+        self.assertFalse(self.engine.warmed_up)
+        self.engine.warmup()
+        self.assertTrue(self.engine.warmed_up)
+        self.assertEqual(self.engine.visible_tiles, before)
+
+    def test_concurrent_searches_match_serial(self):
+        """Searches on several threads must not see each other's temporary visible_tiles counts."""
+        from concurrent.futures import ThreadPoolExecutor
+        self.engine.update_tile_count(5, 1)
+        before = list(self.engine.visible_tiles)
+        hands = [TilesConverter.one_line_string_to_136_array(h) for h in ("123m456p789s11223z", "12345m567p3458s77z")]
+        expected = [self.engine.calculate_best_discard(hand) for hand in hands]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(self.engine.calculate_best_discard, hands * 2))
+        self.assertEqual(results, expected * 2)
+        self.assertEqual(self.engine.visible_tiles, before)
+
 if __name__ == '__main__':
     unittest.main()
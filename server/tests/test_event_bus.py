@@ -0,0 +1,82 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+import database
+from event_bus import EventBus, format_sse
+
+
+class TestEventBus(unittest.TestCase):
+    def test_topics_and_cross_thread_publish(self):
+        bus = EventBus()
+
+        async def run():
+            session = bus.subscribe(["sessions", "session:a"])
+            other = bus.subscribe(["sessions", "session:b"])
+            thread = threading.Thread(target=bus.publish, args=("session:a", "interaction", {"id": 1}, 1))
+            thread.start()
+            thread.join()
+            bus.publish("sessions", "session", {"session_id": "c"})
+            received = [await session.get(1), await session.get(1)]
+            other_received = [await other.get(1), await other.get(0.05)]
+            bus.unsubscribe(session)
+            bus.unsubscribe(other)
+            return received, other_received
+
+        received, other_received = asyncio.run(run())
+        self.assertEqual([m["event"] for m in received], ["interaction", "session"])
+        self.assertEqual(received[0]["id"], 1)
+        self.assertEqual(other_received[0]["event"], "session")
+        self.assertIsNone(other_received[1])
+        self.assertEqual(bus.metrics()["subscribers"], 0)
+
+    def test_full_queue_drops_oldest(self):
+        bus = EventBus(max_queue=2)
+
+        async def run():
+            subscription = bus.subscribe(["t"])
+            for i in range(3):
+                bus.publish("t", "e", {"i": i})
+            await asyncio.sleep(0)
+            return [(await subscription.get(1))["data"]["i"] for _ in range(2)], subscription.dropped
+
+        self.assertEqual(asyncio.run(run()), ([1, 2], 1))
+
+    def test_format_sse(self):
+        frame = format_sse({"event": "interaction", "id": 7, "data": {"hand": "一"}})
+        self.assertEqual(frame, 'event: interaction\nid: 7\ndata: {"hand":"一"}\n\n')
+
+
+class TestDatabaseEvents(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+        self.events = []
+        database.add_listener(self.record)
+
+    def tearDown(self):
+        database.remove_listener(self.record)
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def record(self, event, payload):
+        self.events.append((event, payload))
+
+    def test_changes_are_published_after_commit(self):
+        database.create_or_update_session("s1")
+        database.create_or_update_session("s1")  # already active: no event
+        database.log_interaction("s1", "/static/uploads/x.jpg", ["step"], {"user_hand": []})
+        database.end_session("s1")
+
+        self.assertEqual([e for e, _ in self.events], ["session", "interaction", "session"])
+        interaction = self.events[1][1]
+        self.assertEqual(interaction["id"], database.get_session_details("s1")["interactions"][0]["id"])
+        self.assertEqual(interaction["steps_log"], ["step"])
+        self.assertEqual(self.events[2][1]["status"], "ended")
+
+
+if __name__ == '__main__':
+    unittest.main()
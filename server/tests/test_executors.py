@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import unittest
+from executors import StageExecutors, StageTimer
+
+
+class TestStageExecutors(unittest.TestCase):
+    def setUp(self):
+        self.executors = StageExecutors({"external": 1, "io": 1})
+
+    def tearDown(self):
+        self.executors.shutdown()
+
+    def test_busy_stage_does_not_block_others(self):
+        release = threading.Event()
+
+        async def run():
+            slow = asyncio.ensure_future(self.executors.run("external", release.wait, 5))
+            result = await asyncio.wait_for(self.executors.run("io", lambda: "done"), 1)
+            self.assertFalse(slow.done())
+            release.set()
+            await slow
+            return result
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+    def test_runs_off_the_event_loop_thread(self):
+        async def run():
+            return await self.executors.run("io", threading.current_thread), threading.current_thread()
+
+        worker, loop_thread = asyncio.run(run())
+        self.assertIsNot(worker, loop_thread)
+        self.assertTrue(worker.name.startswith("io"))
+
+    def test_exceptions_propagate_and_are_counted(self):
+        async def run():
+            await self.executors.run("io", int, "3")
+            with self.assertRaises(ValueError):
+                await self.executors.run("io", int, "x")
+
+        asyncio.run(run())
+        io = self.executors.metrics()["io"]
+        self.assertEqual((io["submitted"], io["in_flight"], io["failed"]), (2, 0, 1))
+        self.assertEqual(self.executors.metrics()["external"]["submitted"], 0)
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_overlapping_stages_and_critical_path(self):
+        timer = StageTimer()
+
+        async def run():
+            background = asyncio.ensure_future(timer.timed("save", asyncio.sleep(0.02)))
+            with timer.stage("detect"):
+                await asyncio.sleep(0.01)
+            with timer.stage("engine"):
+                pass
+            await background
+
+        asyncio.run(run())
+        self.assertEqual(set(timer.stages), {"save", "detect", "engine"})
+        self.assertLess(timer.stages["save"][0], timer.stages["detect"][1])
+        self.assertGreaterEqual(timer.duration_ms("detect"), 9)
+
+        summary = timer.summary(("read", "detect", "engine"))
+        self.assertIn("critical path", summary)
+        self.assertIn("(detect > engine)", summary)
+        self.assertEqual(timer.duration_ms("read"), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
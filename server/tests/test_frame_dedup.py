@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from vision_service import FrameDeduplicator, perceptual_hash
+from yolo_inference import DETECTION_DTYPE, Detections
+
+RESULTS = Detections(np.array([(80, 70, 120, 130, 0.9, 0)], dtype=DETECTION_DTYPE), np.array(['1B']))
+PARAMS = (None, None)
+
+
+def make_frame(seed=0):
+    """A 480x640 BGR frame with a few random bright rectangles."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    for _ in range(6):
+        x, y = rng.integers(0, 560), rng.integers(0, 400)
+        frame[y:y + 80, x:x + 80] = rng.integers(120, 255)
+    return frame
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class TestPerceptualHash(unittest.TestCase):
+    def test_noise_changes_few_bits(self):
+        frame = make_frame()
+        noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(1).integers(-4, 5, frame.shape), 0, 255)
+        self.assertLessEqual(hamming(perceptual_hash(frame), perceptual_hash(noisy.astype(np.uint8))), 4)
+
+    def test_different_scenes_differ(self):
+        self.assertGreater(hamming(perceptual_hash(make_frame(0)), perceptual_hash(make_frame(2))), 10)
+
+    def test_hash_is_64_bits(self):
+        self.assertLess(perceptual_hash(make_frame()), 1 << 64)
+
+
+class TestFrameDeduplicator(unittest.TestCase):
+    def setUp(self):
+        self.dedup = FrameDeduplicator(max_distance=4, max_skips=2)
+
+    def test_first_frame_misses(self):
+        self.assertIsNone(self.dedup.lookup("s:live", 0, PARAMS))
+
+    def test_near_identical_frame_reuses_results(self):
+        self.dedup.store("s:live", 0b1011, PARAMS, RESULTS)
+        self.assertEqual(self.dedup.lookup("s:live", 0b1010, PARAMS).to_predictions(), RESULTS.to_predictions())
+        self.assertIsNone(self.dedup.lookup("s:live", 0b11111111, PARAMS))
+
+    def test_cached_results_marked_reused(self):
+        self.dedup.store("s:live", 0, PARAMS, RESULTS)
+        self.assertTrue(self.dedup.lookup("s:live", 0, PARAMS).reused)
+        self.assertFalse(RESULTS.reused)
+
+    def test_params_and_client_must_match(self):
+        self.dedup.store("s:live", 0, PARAMS, RESULTS)
+        self.assertIsNone(self.dedup.lookup("s:live", 0, (0.5, 0.5)))
+        self.assertIsNone(self.dedup.lookup("other:live", 0, PARAMS))
+
+    def test_max_skips_forces_inference(self):
+        self.dedup.store("s:live", 0, PARAMS, RESULTS)
+        self.assertIsNotNone(self.dedup.lookup("s:live", 0, PARAMS))
+        self.assertIsNotNone(self.dedup.lookup("s:live", 0, PARAMS))
+        self.assertIsNone(self.dedup.lookup("s:live", 0, PARAMS))
+
+    def test_cached_results_are_copies(self):
+        self.dedup.store("s:live", 0, PARAMS, RESULTS)
+        self.dedup.lookup("s:live", 0, PARAMS).translate(10, 0)
+        self.assertEqual(float(self.dedup.lookup("s:live", 0, PARAMS).data['x1'][0]), 80.0)
+
+    def test_metrics_and_forget(self):
+        self.dedup.store("s:live", 0, PARAMS, RESULTS)
+        self.dedup.lookup("s:live", 0, PARAMS)
+        self.dedup.lookup("s:live", 0xFF, PARAMS)
+        metrics = self.dedup.metrics()
+        self.assertEqual((metrics["frames"], metrics["skipped_frames"], metrics["skip_rate"]), (2, 1, 0.5))
+        self.dedup.forget("s")
+        self.assertEqual(self.dedup.metrics()["tracked_clients"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
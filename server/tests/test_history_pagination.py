@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+import database
+
+
+class TestHistoryPagination(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+
+    def tearDown(self):
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def test_interactions_after_cursor(self):
+        database.create_or_update_session("s1")
+        database.create_or_update_session("s2")
+        for i in range(5):
+            database.log_interaction("s1", f"/x{i}.jpg", [f"step{i}"], {"i": i})
+        database.log_interaction("s2", "/y.jpg", [], {})
+
+        first = database.get_interactions("s1", limit=2, include_steps=False)
+        self.assertEqual([r["response_json"]["i"] for r in first], [0, 1])
+        self.assertNotIn("steps_log", first[0])
+
+        rest = database.get_interactions("s1", after_id=first[-1]["id"])
+        self.assertEqual([r["response_json"]["i"] for r in rest], [2, 3, 4])
+        self.assertEqual(rest[0]["steps_log"], ["step2"])
+        self.assertEqual(database.get_interactions("s1", after_id=rest[-1]["id"]), [])
+
+    def test_sessions_pages_cover_every_session_once(self):
+        for i in range(7):
+            database.create_or_update_session(f"s{i}")
+
+        seen, cursor = [], None
+        while True:
+            page = database.get_sessions_page(limit=3, cursor=cursor)
+            seen.extend(s["session_id"] for s in page["sessions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [s["session_id"] for s in database.get_all_sessions()])
+        self.assertEqual(sorted(seen), [f"s{i}" for i in range(7)])
+
+
+if __name__ == '__main__':
+    unittest.main()
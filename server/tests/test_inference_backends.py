@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from yolo_inference import INFERENCE_BACKENDS, benchmark_backends, create_backend, onnx_input_shape
+
+try:
+    import onnx
+    from onnx import TensorProto, helper
+except ImportError:
+    onnx = None
+
+
+def write_tiny_model(path, dynamic=False):
+    """(1, 3, 32, 32) -> (1, 6, 512): a reshape, so every backend must agree exactly."""
+    dims = ["batch", 3, "height", "width"] if dynamic else [1, 3, 32, 32]
+    graph = helper.make_graph(
+        [helper.make_node("Reshape", ["images", "shape"], ["output0"])],
+        "tiny",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, dims)],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, 6, "anchors"])],
+        [helper.make_tensor("shape", TensorProto.INT64, [3], [1, 6, -1])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+
+
+class TestInputShapeWithoutOnnx(unittest.TestCase):
+    def test_assumes_fixed_input(self):
+        # A None entry makes "import onnx" raise ImportError
+        with mock.patch.dict(sys.modules, {"onnx": None}):
+            name, shape = onnx_input_shape("missing.onnx")
+        self.assertEqual(shape, [1, 3, 640, 640])
+        self.assertTrue(all(isinstance(dim, int) for dim in shape))
+
+
+@unittest.skipIf(onnx is None, "onnx not installed")
+class TestInferenceBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp.name, "tiny.onnx")
+        write_tiny_model(self.model_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_input_shape_from_graph(self):
+        self.assertEqual(onnx_input_shape(self.model_path), ("images", [1, 3, 32, 32]))
+        dynamic_path = os.path.join(self.tmp.name, "dyn.onnx")
+        write_tiny_model(dynamic_path, dynamic=True)
+        self.assertEqual(onnx_input_shape(dynamic_path)[1], ["batch", 3, "height", "width"])
+
+    def test_backends_agree(self):
+        tensor = np.random.default_rng(0).random((1, 3, 32, 32), dtype=np.float32)
+        outputs = {}
+        for name in INFERENCE_BACKENDS:
+            backend = create_backend(self.model_path, name)
+            self.assertEqual(list(backend.input_shape), [1, 3, 32, 32])
+            outputs[name] = backend.run(tensor)
+        reference = outputs.pop("opencv")
+        for output in outputs.values():
+            np.testing.assert_array_equal(output, reference)
+
+    def test_benchmark_picks_a_backend(self):
+        best, timings = benchmark_backends(self.model_path, runs=2)
+        self.assertIn(best, INFERENCE_BACKENDS)
+        self.assertEqual(best, min(timings, key=timings.get))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend(self.model_path, "tensorrt")
+
+
+if __name__ == '__main__':
+    unittest.main()
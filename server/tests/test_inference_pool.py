@@ -0,0 +1,79 @@
+import queue
+import threading
+import time
+import unittest
+from unittest import mock
+from vision_service import InferenceSessionPool, VisionService
+
+
+class TestInferenceSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = InferenceSessionPool(lambda i: f"model-{i}", size=2)
+
+    def test_checkout_returns_model(self):
+        with self.pool.checkout() as model:
+            self.assertIn(model, ["model-0", "model-1"])
+            self.assertEqual(self.pool.metrics()["in_use"], 1)
+        self.assertEqual(self.pool.metrics()["in_use"], 0)
+        self.assertEqual(self.pool.metrics()["checkouts"], 1)
+
+    def test_concurrent_checkouts_get_distinct_models(self):
+        with self.pool.checkout() as a, self.pool.checkout() as b:
+            self.assertNotEqual(a, b)
+            self.assertEqual(self.pool.metrics()["peak_in_use"], 2)
+
+    def test_exhausted_pool_times_out(self):
+        with self.pool.checkout(), self.pool.checkout():
+            with self.assertRaises(queue.Empty):
+                with self.pool.checkout(timeout=0.01):
+                    pass
+
+    def test_waiter_gets_returned_model(self):
+        results = []
+
+        def borrow():
+            with self.pool.checkout(timeout=1) as model:
+                results.append(model)
+
+        with self.pool.checkout(), self.pool.checkout():
+            t = threading.Thread(target=borrow)
+            t.start()
+            time.sleep(0.05)
+            self.assertEqual(results, [])
+        t.join(timeout=1)
+        self.assertEqual(len(results), 1)
+
+    def test_model_returned_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.checkout():
+                raise RuntimeError("boom")
+        self.assertEqual(self.pool.metrics()["in_use"], 0)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            InferenceSessionPool(lambda i: i, size=0)
+
+
+class TestPoolThreadAffinity(unittest.TestCase):
+    def options(self, index, pool_size, threads):
+        service = VisionService.__new__(VisionService)
+        service.session_options = {"intra_op_threads": threads}
+        service.pool_size = pool_size
+        service.pin_threads = True
+        return service._pool_session_options(index)
+
+    def test_sessions_pinned_to_disjoint_cpus(self):
+        with mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual(self.options(0, 2, 4)["thread_affinities"], "2;3;4")
+            self.assertEqual(self.options(1, 2, 4)["thread_affinities"], "6;7;8")
+
+    def test_no_pinning_beyond_available_cpus(self):
+        with mock.patch("os.cpu_count", return_value=4):
+            self.assertEqual(self.options(0, 2, 4)["thread_affinities"], "2;3;4")
+            options = self.options(1, 2, 4)
+        self.assertNotIn("thread_affinities", options)
+        self.assertEqual(options["intra_op_threads"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import tempfile
+import threading
+import unittest
+
+import database
+from interaction_log import InteractionLogWriter
+
+
+class TestInteractionLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+    def record(self, batch):
+        self.batches.append(list(batch))
+
+    def test_batches_up_to_max_batch(self):
+        gate = threading.Event()
+
+        def write(batch):
+            gate.wait(5)
+            self.record(batch)
+
+        writer = InteractionLogWriter(write, max_batch=3, flush_interval_ms=1000)
+        for i in range(7):
+            writer.enqueue("s1", None, [f"step{i}"], {"i": i})
+        gate.set()
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop()
+        sizes = [len(b) for b in self.batches]
+        self.assertEqual(sum(sizes), 7)
+        self.assertTrue(all(size <= 3 for size in sizes))
+        self.assertEqual([e["response"]["i"] for b in self.batches for e in b], list(range(7)))
+
+    def test_flush_interval_writes_partial_batch(self):
+        writer = InteractionLogWriter(self.record, max_batch=100, flush_interval_ms=10)
+        writer.enqueue("s1", "/a.jpg", [], {})
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(len(self.batches), 1)
+        self.assertIn("timestamp", self.batches[0][0])
+        writer.stop()
+
+    def test_stop_writes_pending_entries(self):
+        writer = InteractionLogWriter(self.record, max_batch=100, flush_interval_ms=60000)
+        for i in range(5):
+            writer.enqueue("s1", None, [], {"i": i})
+        writer.stop(timeout=5)
+        self.assertEqual(sum(len(b) for b in self.batches), 5)
+        self.assertFalse(writer.enqueue("s1", None, [], {}))
+
+    def test_full_queue_drops(self):
+        gate = threading.Event()
+        started = threading.Event()
+
+        def write(batch):
+            started.set()
+            gate.wait(5)
+
+        writer = InteractionLogWriter(write, max_batch=1, flush_interval_ms=0, max_queue=2)
+        writer.enqueue("s1", None, [], {})
+        started.wait(5)  # first entry is being written, the queue is empty again
+        results = [writer.enqueue("s1", None, [], {}) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        metrics = writer.metrics()
+        self.assertEqual(metrics["dropped"], 1)
+        self.assertEqual(metrics["queue_depth"], 2)
+        gate.set()
+        writer.stop(timeout=5)
+        self.assertEqual(writer.metrics()["written"], 3)
+
+    def test_failed_batch_retried_per_entry(self):
+        def write(batch):
+            if any(entry["response"].get("bad") for entry in batch):
+                raise TypeError("not JSON serializable")
+            self.record(batch)
+
+        writer = InteractionLogWriter(write, max_batch=5, flush_interval_ms=1000, retry_backoff_ms=0)
+        for i in range(5):
+            writer.enqueue("s1", None, [], {"i": i, "bad": i == 2})
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop()
+        self.assertEqual([e["response"]["i"] for b in self.batches for e in b], [0, 1, 3, 4])
+        metrics = writer.metrics()
+        self.assertEqual(metrics["written"], 4)
+        self.assertEqual(metrics["failed"], 1)
+        self.assertEqual(metrics["retried_batches"], 1)
+
+    def test_transient_failure_retried(self):
+        attempts = []
+
+        def write(batch):
+            attempts.append(len(batch))
+            if len(attempts) == 1:
+                raise RuntimeError("database is locked")
+            self.record(batch)
+
+        writer = InteractionLogWriter(write, flush_interval_ms=0, retry_backoff_ms=0)
+        writer.enqueue("s1", None, [], {})
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop()
+        self.assertEqual(writer.metrics()["written"], 1)
+        self.assertEqual(writer.metrics()["failed"], 0)
+
+    def test_failed_batch_counted(self):
+        def write(batch):
+            raise RuntimeError("disk full")
+
+        writer = InteractionLogWriter(write, flush_interval_ms=0, retry_backoff_ms=0)
+        writer.enqueue("s1", None, [], {})
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop()
+        metrics = writer.metrics()
+        self.assertEqual(metrics["failed"], 1)
+        self.assertEqual(metrics["written"], 0)
+
+
+class TestLogInteractions(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+        self.events = []
+        database.add_listener(self.listen)
+
+    def tearDown(self):
+        database.remove_listener(self.listen)
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def listen(self, event, payload):
+        self.events.append((event, payload))
+
+    def test_batch_through_writer(self):
+        database.create_or_update_session("s1")
+        database.create_or_update_session("s2")
+        writer = InteractionLogWriter(database.log_interactions, max_batch=10, flush_interval_ms=20)
+        for i in range(4):
+            writer.enqueue("s1" if i % 2 else "s2", f"/x{i}.jpg", [f"step{i}"], {"i": i})
+        writer.stop(timeout=5)
+
+        rows = database.get_interactions("s1") + database.get_interactions("s2")
+        self.assertEqual(sorted(r["response_json"]["i"] for r in rows), [0, 1, 2, 3])
+        last_s1 = database.get_interactions("s1")[-1]["timestamp"]
+        self.assertEqual(database.get_session("s1")["last_activity_time"], last_s1)
+
+        interactions = [p for e, p in self.events if e == "interaction"]
+        self.assertEqual([p["response_json"]["i"] for p in interactions], [0, 1, 2, 3])
+        self.assertEqual(sorted(p["id"] for p in interactions), sorted(r["id"] for r in rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+import numpy as np
+from live_stream import LatestFrameBuffer, LiveStreamMetrics, decode_binary_message, encode_binary_message
+from yolo_inference import DETECTION_DTYPE, Detections
+
+
+class TestLatestFrameBuffer(unittest.TestCase):
+    def test_only_newest_frame_is_processed(self):
+        async def run():
+            metrics = LiveStreamMetrics()
+            frames = LatestFrameBuffer(metrics)
+            for data in (b"a", b"b", b"c"):
+                frames.put(data)
+            first = await frames.get()
+            frames.put(b"d")
+            frames.close()
+            return first, await frames.get(), await frames.get(), frames, metrics.metrics()
+
+        first, second, end, frames, metrics = asyncio.run(run())
+        self.assertEqual(first, (3, b"c"))
+        self.assertEqual(second, (4, b"d"))
+        self.assertIsNone(end)
+        self.assertEqual((frames.received, frames.dropped), (4, 2))
+        self.assertEqual(metrics["frames_dropped"], 2)
+
+    def test_closed(self):
+        frames = LatestFrameBuffer()
+        self.assertFalse(frames.closed)
+        frames.close()
+        self.assertTrue(frames.closed)
+
+    def test_get_waits_for_a_frame(self):
+        async def run():
+            frames = LatestFrameBuffer()
+            waiter = asyncio.create_task(frames.get())
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            frames.put(b"x")
+            return await asyncio.wait_for(waiter, 1)
+
+        self.assertEqual(asyncio.run(run()), (1, b"x"))
+
+
+class TestBinaryMessage(unittest.TestCase):
+    def test_round_trip(self):
+        data = np.zeros(2, dtype=DETECTION_DTYPE)
+        data['x2'] = [10, 20]
+        data['confidence'] = [0.9, 0.8]
+        data['class_id'] = [3, 7]
+        message = encode_binary_message(12, Detections(data, np.array(["a"] * 8)), 5.5, stable=True)
+
+        seq, rows, inference_ms, stable = decode_binary_message(message)
+        self.assertEqual((seq, inference_ms, stable), (12, 5.5, True))
+        np.testing.assert_array_equal(rows['class_id'], [3, 7])
+        np.testing.assert_allclose(rows['x2'], [10, 20])
+        self.assertEqual(len(message), 12 + 2 * DETECTION_DTYPE.itemsize)
+
+    def test_empty(self):
+        seq, rows, _, stable = decode_binary_message(encode_binary_message(1, Detections.empty(), 0.0))
+        self.assertEqual((seq, len(rows), stable), (1, 0, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+
+import database
+from payload_codec import decode_payload, encode_payload, is_compressed
+
+RESPONSE = {
+    "user_hand": ["1m", "2m", "3m", "5p", "5p", "6s", "7s", "8s", "1z", "1z", "1z", "7z", "7z"],
+    "melded_tiles": [],
+    "suggested_play": "胡: 7z  摸: 4m (切 1m)",
+    "annotated_image_path": "/static/uploads/s1_1700000000000_annotated.jpg",
+    "action_detected": None,
+    "warning": None,
+    "is_stable": True,
+    "detections": [{"class_name": "1m", "x1": 10.5, "y1": 20.0, "x2": 40.0, "y2": 80.0, "confidence": 0.93}],
+}
+STEPS = ["[12:00:00] Received request with image: a.jpg", "[12:00:00] Starting AI analysis..."]
+
+
+class TestPayloadCodec(unittest.TestCase):
+    def test_round_trip(self):
+        for compression in ("none", "zlib"):
+            for dictionary in (0, 1):
+                stored = encode_payload(RESPONSE, compression, dictionary=dictionary)
+                self.assertEqual(is_compressed(stored), compression == "zlib")
+                self.assertEqual(decode_payload(stored), RESPONSE)
+
+    def test_dictionary_shrinks_small_payloads(self):
+        plain = encode_payload(RESPONSE)
+        no_dict = encode_payload(RESPONSE, "zlib", dictionary=0)
+        with_dict = encode_payload(RESPONSE, "zlib", dictionary=1)
+        self.assertLess(len(no_dict), len(plain.encode("utf-8")))
+        self.assertLess(len(with_dict), len(no_dict))
+
+    def test_rejects_unknown(self):
+        with self.assertRaises(ValueError):
+            encode_payload(RESPONSE, "lz4")
+        with self.assertRaises(ValueError):
+            decode_payload(b"not compressed")
+
+
+class TestCompressedStorage(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.original_compression = database.config.DB_PAYLOAD_COMPRESSION
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+
+    def tearDown(self):
+        database.config.DB_PAYLOAD_COMPRESSION = self.original_compression
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def test_mixed_formats_decode_transparently(self):
+        database.create_or_update_session("s1")
+        database.log_interaction("s1", "/static/uploads/a.jpg", STEPS, RESPONSE)
+        database.config.DB_PAYLOAD_COMPRESSION = "zlib"
+        database.log_interaction("s1", "/static/uploads/b.jpg", STEPS, RESPONSE)
+
+        stored = database.get_db_connection().execute(
+            'SELECT typeof(response_json) FROM interactions ORDER BY id').fetchall()
+        self.assertEqual([row[0] for row in stored], ["text", "blob"])
+
+        details = database.get_session_details("s1")
+        for interaction in details["interactions"]:
+            self.assertEqual(interaction["steps_log"], STEPS)
+            self.assertEqual(interaction["response_json"], RESPONSE)
+        self.assertEqual(database.get_interactions("s1", include_steps=False)[1]["response_json"], RESPONSE)
+
+    def test_annotation_lookup_with_compressed_payload(self):
+        database.config.DB_PAYLOAD_COMPRESSION = "zlib"
+        database.log_interaction("s1", "/static/uploads/a.jpg", STEPS, RESPONSE)
+        stored = database.get_interaction_detections(RESPONSE["annotated_image_path"])
+        self.assertEqual(stored, {"image_path": "/static/uploads/a.jpg", "detections": RESPONSE["detections"]})
+        self.assertIsNone(database.get_interaction_detections("/static/uploads/missing_annotated.jpg"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from vision_service import ResolutionPolicy
+
+
+class TestResolutionPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = ResolutionPolicy((320, 480, 640), min_tile_px=32)
+
+    def test_first_frame_uses_largest(self):
+        self.assertEqual(self.policy.choose(1920, 1080, "s1:hand"), 640)
+
+    def test_small_image_not_upscaled(self):
+        self.assertEqual(self.policy.choose(400, 300, "s1:hand"), 480)
+        self.assertEqual(self.policy.choose(300, 200), 320)
+
+    def test_close_up_drops_resolution(self):
+        # 200px tall tiles in a 1920px frame: 200 * 320 / 1920 = 33px >= 32
+        self.policy.observe("s1:hand", [190, 200, 210])
+        self.assertEqual(self.policy.choose(1920, 1080, "s1:hand"), 320)
+
+    def test_wide_shot_keeps_resolution(self):
+        # 60px tiles: 60 * 480 / 1920 = 15px, 60 * 640 / 1920 = 20px -> stay at max
+        self.policy.observe("s1:hand", [60, 60])
+        self.assertEqual(self.policy.choose(1920, 1080, "s1:hand"), 640)
+
+    def test_history_is_per_session(self):
+        self.policy.observe("s1:hand", [200])
+        self.assertEqual(self.policy.choose(1920, 1080, "s2:hand"), 640)
+
+    def test_empty_frame_resets_history(self):
+        self.policy.observe("s1:hand", [200])
+        self.policy.observe("s1:hand", [])
+        self.assertEqual(self.policy.choose(1920, 1080, "s1:hand"), 640)
+
+    def test_forget_session(self):
+        self.policy.observe("s1:hand", [200])
+        self.policy.observe("s1:melded", [200])
+        self.policy.forget("s1")
+        self.assertEqual(self.policy.metrics()["tracked_sessions"], 0)
+
+    def test_bounded_history(self):
+        policy = ResolutionPolicy(max_sessions=2)
+        for key in ("a", "b", "c"):
+            policy.observe(key, [100])
+        self.assertEqual(policy.metrics()["tracked_sessions"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tarfile
+import tempfile
+import time
+import unittest
+
+import database
+from retention import RetentionJob
+
+DAY = 86400
+
+
+class TestRetentionJob(unittest.TestCase):
+    def setUp(self):
+        self.original_path = database.DB_PATH
+        self.tmp = tempfile.TemporaryDirectory()
+        database.DB_PATH = f"{self.tmp.name}/test.db"
+        database.init_db()
+        self.uploads = os.path.join(self.tmp.name, "uploads")
+        self.archive = os.path.join(self.tmp.name, "archive")
+        os.makedirs(self.uploads)
+        self.job = RetentionJob(self.uploads, self.archive, retention_days=30, vacuum_pause=0)
+
+    def tearDown(self):
+        database.close_connections()
+        database.DB_PATH = self.original_path
+        self.tmp.cleanup()
+
+    def upload(self, name, size=100):
+        with open(os.path.join(self.uploads, name), "wb") as f:
+            f.write(b"x" * size)
+        return f"/static/uploads/{name}"
+
+    def add_session(self, session_id, ended=True):
+        database.create_or_update_session(session_id)
+        photo = self.upload(f"{session_id}_1700000000000.jpg")
+        annotated = self.upload(f"{session_id}_1700000000000_annotated.jpg")
+        audio = self.upload(f"{session_id}_1700000000001.wav")
+        database.log_interaction(session_id, photo, ["step"], {"user_hand": ["1m"], "annotated_image_path": annotated})
+        database.log_interaction(session_id, None, ["audio"], {"transcript": "碰", "audio_path": audio})
+        if ended:
+            database.end_session(session_id)
+
+    def listing(self):
+        return sorted(os.listdir(self.uploads))
+
+    def test_dry_run_changes_nothing(self):
+        self.add_session("old")
+        report = self.job.run(dry_run=True, now=time.time() + 60 * DAY)
+        self.assertEqual(report["sessions"], 1)
+        self.assertEqual(report["interactions"], 2)
+        self.assertEqual(report["files"], 3)
+        self.assertEqual(report["bytes"], 300)
+        self.assertEqual(report["session_details"][0]["session_id"], "old")
+        self.assertEqual(len(self.listing()), 3)
+        self.assertIsNotNone(database.get_session("old"))
+        self.assertFalse(os.path.exists(self.archive))
+
+    def test_archives_old_ended_sessions(self):
+        self.add_session("old")
+        self.add_session("live", ended=False)
+        report = self.job.run(now=time.time() + 60 * DAY)
+
+        self.assertEqual(report["sessions"], 1)
+        self.assertIsNone(database.get_session("old"))
+        self.assertEqual(database.get_interactions("old"), [])
+        self.assertIsNotNone(database.get_session("live"))
+        self.assertTrue(all(name.startswith("live_") for name in self.listing()))
+
+        bundle = report["session_details"][0]["archive"]
+        with tarfile.open(bundle) as tar:
+            names = sorted(tar.getnames())
+            manifest = json.load(tar.extractfile("session.json"))
+        self.assertEqual(names, ["session.json", "uploads/old_1700000000000.jpg",
+                                 "uploads/old_1700000000000_annotated.jpg", "uploads/old_1700000000001.wav"])
+        self.assertEqual(manifest["session_id"], "old")
+        self.assertEqual(manifest["interactions"][1]["response_json"]["transcript"], "碰")
+
+    def test_recent_sessions_kept(self):
+        self.add_session("recent")
+        report = self.job.run()
+        self.assertEqual(report["sessions"], 0)
+        self.assertIsNotNone(database.get_session("recent"))
+        self.assertEqual(len(self.listing()), 3)
+
+    def test_reactivated_session_skipped(self):
+        self.add_session("old")
+        original = database.get_session_details
+
+        def reactivate(session_id):
+            details = original(session_id)
+            database.create_or_update_session(session_id)
+            return details
+
+        database.get_session_details = reactivate
+        try:
+            report = self.job.run(now=time.time() + 60 * DAY)
+        finally:
+            database.get_session_details = original
+        self.assertEqual(report["skipped"], 1)
+        self.assertEqual(len(database.get_interactions("old")), 2)
+        self.assertEqual(len(self.listing()), 3)
+        self.assertEqual(os.listdir(os.path.join(self.archive, os.listdir(self.archive)[0])), [])
+
+    def test_orphaned_uploads(self):
+        self.add_session("live", ended=False)
+        self.upload("debug_1700000000000.jpg")
+        self.upload("debug_1700000000000_annotated.jpg")
+        old = time.time() - 60 * DAY
+        for name in self.listing():
+            os.utime(os.path.join(self.uploads, name), (old, old))
+
+        report = self.job.run()
+        self.assertEqual(report["orphan_files"], 2)
+        self.assertTrue(all(name.startswith("live_") for name in self.listing()))
+
+    def test_incremental_vacuum(self):
+        for i in range(5):
+            self.add_session(f"s{i}")
+            for _ in range(50):
+                database.log_interaction(f"s{i}", None, ["x" * 2000], {})
+        self.assertEqual(database.vacuum_stats()["auto_vacuum"], "incremental")
+        pages = database.vacuum_stats()["page_count"]
+        report = self.job.run(now=time.time() + 60 * DAY)
+        self.assertEqual(report["sessions"], 5)
+        self.assertGreater(report["vacuumed_pages"], 0)
+        self.assertLess(database.vacuum_stats()["page_count"], pages)
+        self.assertEqual(database.vacuum_stats()["freelist_count"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+from vision_service import RoiTracker, VisionService
+from yolo_inference import DETECTION_DTYPE, Detections
+
+# Two 40x60 tiles side by side in a 1000x800 frame
+TILES = np.array([[400, 300, 440, 360], [440, 300, 480, 360]], dtype=np.float32)
+
+
+class TestRoiTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = RoiTracker(margin=0.1, refresh_interval=3)
+
+    def test_first_frame_is_full(self):
+        self.assertIsNone(self.tracker.plan("c1", 1000, 800))
+
+    def test_roi_covers_tiles_with_margin(self):
+        self.tracker.update("c1", 1000, 800, TILES, used_roi=False)
+        x1, y1, x2, y2 = self.tracker.plan("c1", 1000, 800)
+        # Margin is at least one tile height (60px)
+        self.assertEqual((x1, y1, x2, y2), (340, 240, 540, 420))
+
+    def test_roi_clipped_to_frame(self):
+        self.tracker.update("c1", 1000, 800, np.array([[0, 0, 40, 60]], dtype=np.float32), used_roi=False)
+        x1, y1, _, _ = self.tracker.plan("c1", 1000, 800)
+        self.assertEqual((x1, y1), (0, 0))
+
+    def test_periodic_full_frame(self):
+        self.tracker.update("c1", 1000, 800, TILES, used_roi=False)
+        plans = []
+        for _ in range(4):
+            roi = self.tracker.plan("c1", 1000, 800)
+            plans.append(roi is not None)
+            self.tracker.update("c1", 1000, 800, TILES, used_roi=roi is not None)
+        self.assertEqual(plans, [True, True, True, False])
+
+    def test_count_change_rejected(self):
+        self.tracker.update("c1", 1000, 800, TILES, used_roi=False)
+        self.assertTrue(self.tracker.accepts("c1", 2))
+        self.assertFalse(self.tracker.accepts("c1", 3))
+        self.assertEqual(self.tracker.metrics()["count_change_fallbacks"], 1)
+
+    def test_empty_result_resets(self):
+        self.tracker.update("c1", 1000, 800, TILES, used_roi=False)
+        self.tracker.update("c1", 1000, 800, np.zeros((0, 4), dtype=np.float32), used_roi=False)
+        self.assertIsNone(self.tracker.plan("c1", 1000, 800))
+
+    def test_frame_size_change_forces_full(self):
+        self.tracker.update("c1", 1000, 800, TILES, used_roi=False)
+        self.assertIsNone(self.tracker.plan("c1", 1280, 720))
+
+    def test_forget(self):
+        self.tracker.update("s1:live", 1000, 800, TILES, used_roi=False)
+        self.tracker.forget("s1")
+        self.assertIsNone(self.tracker.plan("s1:live", 1000, 800))
+
+
+class TestRoiFallbackTimings(unittest.TestCase):
+    def setUp(self):
+        # Only the ROI path of VisionService; _infer_frame stands in for the model
+        self.service = VisionService.__new__(VisionService)
+        self.service.roi_tracker = RoiTracker(margin=0.1, refresh_interval=10)
+        self.boxes = TILES
+
+        def infer_frame(frame, conf_threshold, iou_threshold, session_key, timings):
+            timings["inference_ms"] = timings.get("inference_ms", 0.0) + 5.0
+            data = np.zeros(len(self.boxes), dtype=DETECTION_DTYPE)
+            for i, field in enumerate(('x1', 'y1', 'x2', 'y2')):
+                data[field] = self.boxes[:, i]
+            return Detections(data, np.array(["1B"]))
+
+        self.service._infer_frame = infer_frame
+        self.frame = np.zeros((800, 1000, 3), dtype=np.uint8)
+
+    def test_fallback_run_reported_separately(self):
+        self.service._infer_with_roi(self.frame, session_key="c1", timings={})
+        self.boxes = np.concatenate([TILES, TILES + 40])
+
+        timings = {}
+        self.service._infer_with_roi(self.frame, session_key="c1", timings=timings)
+        self.assertEqual(timings, {"inference_ms": 5.0, "roi_fallback_inference_ms": 5.0})
+
+    def test_accepted_roi_has_no_fallback(self):
+        self.service._infer_with_roi(self.frame, session_key="c1", timings={})
+        timings = {}
+        self.service._infer_with_roi(self.frame, session_key="c1", timings=timings)
+        self.assertEqual(timings, {"inference_ms": 5.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
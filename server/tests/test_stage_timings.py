@@ -0,0 +1,34 @@
+import unittest
+from vision_service import StageTimings
+
+
+class TestStageTimings(unittest.TestCase):
+    def test_aggregates_per_stage(self):
+        stages = StageTimings(window=4)
+        for ms in (1.0, 2.0, 3.0, 10.0):
+            stages.record({"inference_ms": ms, "decode_ms": 0.5})
+        stages.record({"decode_ms": 0.5, "dedup_ms": 0.1})
+
+        metrics = stages.metrics()
+        self.assertEqual(set(metrics), {"decode_ms", "dedup_ms", "inference_ms"})
+        inference = metrics["inference_ms"]
+        self.assertEqual(inference["count"], 4)
+        self.assertEqual(inference["mean_ms"], 4.0)
+        self.assertEqual(inference["max_ms"], 10.0)
+        self.assertEqual(inference["p50_ms"], 2.5)
+        self.assertEqual(metrics["decode_ms"]["count"], 5)
+
+    def test_percentiles_use_recent_window(self):
+        stages = StageTimings(window=2)
+        for ms in (100.0, 1.0, 1.0):
+            stages.record({"inference_ms": ms})
+        inference = stages.metrics()["inference_ms"]
+        self.assertEqual(inference["p95_ms"], 1.0)
+        self.assertEqual(inference["max_ms"], 100.0)
+
+    def test_empty(self):
+        self.assertEqual(StageTimings().metrics(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+from temporal_fusion import TemporalFusion, iou_matrix, greedy_match
+from yolo_inference import DETECTION_DTYPE, Detections
+
+CLASS_NAMES = np.array(['1B', '2B', '7B'])
+
+
+def frame(*tiles):
+    """Detections from (center_x, class_name[, confidence]) tuples; tiles are 40x60 at y=100."""
+    data = np.zeros(len(tiles), dtype=DETECTION_DTYPE)
+    for i, (x, cls, *conf) in enumerate(tiles):
+        data[i] = (x - 20, 70, x + 20, 130, conf[0] if conf else 0.9, list(CLASS_NAMES).index(cls))
+    return Detections(data, CLASS_NAMES)
+
+
+def centers(detections):
+    return [p['x'] for p in detections.to_predictions()]
+
+
+class TestMatching(unittest.TestCase):
+    def test_iou_matrix(self):
+        a = np.array([[0, 0, 10, 10], [100, 100, 110, 110]], dtype=np.float32)
+        b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float32)
+        iou = iou_matrix(a, b)
+        self.assertEqual(iou.shape, (2, 2))
+        self.assertAlmostEqual(float(iou[0, 0]), 1.0, places=5)
+        self.assertAlmostEqual(float(iou[0, 1]), 50 / 150, places=5)
+        self.assertEqual(float(iou[1].max()), 0.0)
+        self.assertEqual(iou_matrix(a, np.zeros((0, 4))).shape, (2, 0))
+
+    def test_greedy_match_prefers_highest_iou(self):
+        iou = np.array([[0.6, 0.9], [0.5, 0.0]])
+        self.assertEqual(greedy_match(iou, 0.3), [(0, 1), (1, 0)])
+        self.assertEqual(greedy_match(iou, 0.7), [(0, 1)])
+
+
+class TestTemporalFusion(unittest.TestCase):
+    def setUp(self):
+        self.fusion = TemporalFusion(min_hits=3, max_misses=2, stable_frames=3)
+
+    def test_stable_after_consecutive_frames(self):
+        results = [self.fusion.update("s:live", frame((200, '2B'), (100, '1B'))) for _ in range(5)]
+
+        self.assertEqual([r["stable"] for r in results], [False, False, False, False, True])
+        self.assertEqual(results[-1]["stable_labels"], ['1B', '2B'])
+        self.assertEqual(results[-1]["detections"].class_name.tolist(), ['1B', '2B'])
+
+    def test_reused_frames_do_not_vote(self):
+        tiles = ((200, '2B'), (100, '1B'))
+        for _ in range(3):
+            self.fusion.update("s:live", frame(*tiles))
+        results = [self.fusion.update("s:live", frame(*tiles), fresh=False) for _ in range(5)]
+
+        self.assertEqual([r["stable_frames"] for r in results], [1] * 5)
+        self.assertFalse(results[-1]["stable"])
+        self.assertEqual(results[-1]["detections"].class_name.tolist(), ['1B', '2B'])
+        self.assertFalse(self.fusion.update("s:live", frame(*tiles))["stable"])
+        self.assertTrue(self.fusion.update("s:live", frame(*tiles))["stable"])
+
+    def test_label_vote_resists_single_flicker(self):
+        for _ in range(4):
+            self.fusion.update("s:live", frame((100, '1B')))
+        result = self.fusion.update("s:live", frame((101, '7B', 0.6)))
+        self.assertEqual(result["detections"].class_name.tolist(), ['1B'])
+
+    def test_confirmed_track_coasts_then_drops(self):
+        for _ in range(3):
+            self.fusion.update("s:live", frame((100, '1B')))
+        self.assertEqual(len(self.fusion.update("s:live", frame())["detections"]), 1)
+        self.assertEqual(len(self.fusion.update("s:live", Detections.empty())["detections"]), 1)
+        self.assertEqual(len(self.fusion.update("s:live", frame())["detections"]), 0)
+
+    def test_boxes_are_smoothed(self):
+        self.fusion.update("s:live", frame((100, '1B')))
+        result = self.fusion.update("s:live", frame((110, '1B')))
+        self.assertAlmostEqual(centers(result["detections"])[0], 105.0, places=3)
+
+    def test_forget_clears_session(self):
+        self.fusion.update("s:live", frame((100, '1B')))
+        self.fusion.update("other:live", frame((100, '1B')))
+        self.fusion.forget("s")
+        self.assertEqual(self.fusion.metrics()["tracked_sessions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
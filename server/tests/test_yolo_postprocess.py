@@ -0,0 +1,124 @@
+import unittest
+import numpy as np
+from yolo_inference import postprocess, non_max_suppression, slice_plan, DETECTION_DTYPE, Detections
+
+
+def make_outputs(boxes, num_classes=4, num_anchors=100):
+    """Build a fake (1, 4 + C, N) YOLOv8 output from (cx, cy, w, h, class_id, score) tuples."""
+    outputs = np.zeros((1, 4 + num_classes, num_anchors), dtype=np.float32)
+    for i, (cx, cy, w, h, cls, score) in enumerate(boxes):
+        outputs[0, :4, i] = (cx, cy, w, h)
+        outputs[0, 4 + cls, i] = score
+    return outputs
+
+
+class TestYoloPostprocess(unittest.TestCase):
+    def test_empty(self):
+        dets = postprocess(make_outputs([]), 0.5, 0.5)
+        self.assertEqual(len(dets), 0)
+        self.assertEqual(dets.dtype, DETECTION_DTYPE)
+
+    def test_threshold_and_xyxy(self):
+        outputs = make_outputs([
+            (100, 100, 20, 40, 1, 0.9),
+            (300, 300, 20, 40, 2, 0.3),  # below threshold
+        ])
+        dets = postprocess(outputs, 0.5, 0.5)
+        self.assertEqual(len(dets), 1)
+        self.assertEqual(dets[0]['class_id'], 1)
+        self.assertAlmostEqual(float(dets[0]['confidence']), 0.9, places=5)
+        self.assertEqual(
+            (dets[0]['x1'], dets[0]['y1'], dets[0]['x2'], dets[0]['y2']),
+            (90, 80, 110, 120)
+        )
+
+    def test_nms_same_class_suppressed(self):
+        outputs = make_outputs([
+            (100, 100, 20, 40, 1, 0.9),
+            (101, 100, 20, 40, 1, 0.8),
+            (200, 100, 20, 40, 1, 0.7),
+        ])
+        dets = postprocess(outputs, 0.5, 0.5)
+        self.assertEqual(len(dets), 2)
+        self.assertEqual(list(np.round(dets['confidence'], 2)), [0.9, 0.7])
+
+    def test_nms_is_class_agnostic_by_default(self):
+        # One tile predicted as two classes: only the more confident box survives
+        outputs = make_outputs([
+            (100, 100, 20, 40, 1, 0.9),
+            (101, 100, 20, 40, 2, 0.8),
+            (200, 100, 20, 40, 2, 0.7),
+        ])
+        dets = postprocess(outputs, 0.5, 0.5)
+        self.assertEqual(dets['class_id'].tolist(), [1, 2])
+        self.assertEqual(list(np.round(dets['confidence'], 2)), [0.9, 0.7])
+        self.assertEqual(len(postprocess(outputs, 0.5, 0.5, agnostic=False)), 3)
+
+    def test_nms_indices_sorted_by_score(self):
+        boxes = np.array([[0, 0, 10, 10], [50, 50, 60, 60], [0, 0, 10, 11]], dtype=np.float32)
+        scores = np.array([0.6, 0.9, 0.8], dtype=np.float32)
+        class_ids = np.zeros(3, dtype=int)
+        keep = non_max_suppression(boxes, scores, class_ids, 0.5)
+        self.assertEqual(keep.tolist(), [1, 2])
+
+    def test_nms_ios_merges_cut_tile(self):
+        # Left half of a tile (cut at a slice seam) inside the whole tile: IoU 0.5, IoS 1.0
+        boxes = np.array([[0, 0, 40, 60], [0, 0, 20, 60]], dtype=np.float32)
+        scores = np.array([0.9, 0.8], dtype=np.float32)
+        class_ids = np.zeros(2, dtype=int)
+        self.assertEqual(len(non_max_suppression(boxes, scores, class_ids, 0.6)), 2)
+        self.assertEqual(len(non_max_suppression(boxes, scores, class_ids, 0.6, metric="ios")), 1)
+
+    def test_stage_timings(self):
+        timings = {"postprocess_ms": 1.0}
+        postprocess(make_outputs([(50, 50, 20, 30, 1, 0.9)]), 0.5, 0.5, timings=timings)
+        self.assertEqual(set(timings), {"postprocess_ms", "nms_ms"})
+        self.assertGreater(timings["postprocess_ms"], 1.0)
+
+
+class TestDetections(unittest.TestCase):
+    def setUp(self):
+        data = np.array([(90, 80, 110, 120, 0.9, 1), (200, 80, 240, 140, 0.6, 0)], dtype=DETECTION_DTYPE)
+        self.dets = Detections(data, np.array(['1B', '2B']))
+
+    def test_columns(self):
+        self.assertEqual(self.dets.xyxy.tolist(), [[90, 80, 110, 120], [200, 80, 240, 140]])
+        self.assertEqual(self.dets.class_name.tolist(), ['2B', '1B'])
+        self.assertEqual(len(self.dets[self.dets.confidence > 0.7]), 1)
+
+    def test_to_predictions_uses_box_centers(self):
+        pred = self.dets.to_predictions()[0]
+        self.assertEqual((pred['x'], pred['y'], pred['width'], pred['height'], pred['class']), (100, 100, 20, 40, '2B'))
+        self.assertAlmostEqual(pred['confidence'], 0.9, places=5)
+        self.assertIsInstance(pred['x'], float)
+
+    def test_to_records_and_translate(self):
+        self.dets.translate(10, 5)
+        record = self.dets.to_records()[1]
+        self.assertEqual((record['class_name'], record['x1'], record['y1'], record['x2'], record['y2']),
+                         ('1B', 210, 85, 250, 145))
+
+    def test_empty(self):
+        empty = Detections.empty()
+        self.assertEqual((len(empty), empty.to_predictions(), empty.to_records()), (0, [], []))
+        self.assertEqual(empty.xyxy.shape, (0, 4))
+
+
+class TestSlicePlan(unittest.TestCase):
+    def test_small_image_single_slice(self):
+        self.assertEqual(slice_plan(800, 600, 1280, 0.2), ((0, 0, 800, 600),))
+
+    def test_slices_cover_image_with_overlap(self):
+        plan = slice_plan(4000, 3000, 1280, 0.2)
+        xs = sorted({s[0] for s in plan})
+        ys = sorted({s[1] for s in plan})
+        self.assertEqual(xs, [0, 1024, 2048, 2720])
+        self.assertEqual(ys, [0, 1024, 1720])
+        self.assertEqual(len(plan), 12)
+        self.assertTrue(all(x2 - x1 == 1280 and y2 - y1 == 1280 for x1, y1, x2, y2 in plan))
+        self.assertEqual(max(s[2] for s in plan), 4000)
+        self.assertEqual(max(s[3] for s in plan), 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,95 +1,702 @@
 import cv2
-import logging
 import numpy as np
-from typing import List, Dict, Any
+import asyncio
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import List, Dict, Any, Callable, Optional, Sequence, Union
 from PIL import Image, ImageDraw
-from yolo_inference import YOLOv8Inference
+from yolo_inference import Detections, YOLOv8Inference, add_stage_time, benchmark_backends, default_intra_op_threads
 
 logger = logging.getLogger(__name__)
 
+class InferenceSessionPool:
+    """
+    Bounded pool of YOLOv8Inference instances with checkout/return semantics.
+    Each instance owns its own ONNX Runtime session, so concurrent callers
+    never share one session.
+    """
+
+    def __init__(self, factory: Callable[[int], YOLOv8Inference], size: int = 1):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.size = size
+        self.models = [factory(i) for i in range(size)]
+        self._idle = queue.Queue()
+        for model in self.models:
+            self._idle.put(model)
+
+        self._lock = threading.Lock()
+        self._created_at = time.perf_counter()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._busy_ms_total = 0.0
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        """Borrow a model, blocking until one is free. Raises queue.Empty on timeout."""
+        start = time.perf_counter()
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            model = self._idle.get(timeout=timeout)
+            waited = True
+        else:
+            waited = False
+
+        acquired = time.perf_counter()
+        wait_ms = (acquired - start) * 1000
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+            if waited:
+                self._waits += 1
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+
+        try:
+            yield model
+        finally:
+            busy_ms = (time.perf_counter() - acquired) * 1000
+            with self._lock:
+                self._in_use -= 1
+                self._busy_ms_total += busy_ms
+            self._idle.put(model)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed_ms = (time.perf_counter() - self._created_at) * 1000
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "checkouts": self._checkouts,
+                "waited_checkouts": self._waits,
+                "avg_wait_ms": round(self._wait_ms_total / self._checkouts, 2) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._wait_ms_max, 2),
+                # Fraction of total session-time spent running inference since startup
+                "utilization": round(self._busy_ms_total / (elapsed_ms * self.size), 4) if elapsed_ms else 0.0,
+            }
+
+
+class ResolutionPolicy:
+    """
+    Picks the inference resolution for dynamic-axes models: the smallest
+    square size at which tiles seen in the previous frame of the same session
+    stay at least min_tile_px tall. Without history (or when nothing was
+    detected last time) the largest resolution is used. Images are never
+    upscaled beyond the first resolution that covers their long side.
+    """
+
+    def __init__(self, resolutions: Sequence[int] = (320, 480, 640), min_tile_px: float = 32, max_sessions: int = 256):
+        self.resolutions = sorted(resolutions)
+        self.min_tile_px = min_tile_px
+        self.max_sessions = max_sessions
+        self._tile_heights = OrderedDict()
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def choose(self, image_width: int, image_height: int, session_key: Optional[str] = None) -> int:
+        long_side = max(image_width, image_height)
+        limit = next((r for r in self.resolutions if r >= long_side), self.resolutions[-1])
+
+        with self._lock:
+            tile_height = self._tile_heights.get(session_key) if session_key else None
+
+        resolution = limit
+        if tile_height is not None:
+            for r in self.resolutions:
+                if r > limit:
+                    break
+                # Square letterbox: scale = r / long_side
+                if tile_height * r / long_side >= self.min_tile_px:
+                    resolution = r
+                    break
+
+        with self._lock:
+            self._counts[resolution] += 1
+        return resolution
+
+    def observe(self, session_key: Optional[str], tile_heights: Sequence[float]):
+        """Remember the median tile height (original pixels) for the next frame."""
+        if not session_key:
+            return
+        with self._lock:
+            if len(tile_heights) == 0:
+                self._tile_heights.pop(session_key, None)
+                return
+            self._tile_heights[session_key] = float(np.median(tile_heights))
+            self._tile_heights.move_to_end(session_key)
+            while len(self._tile_heights) > self.max_sessions:
+                self._tile_heights.popitem(last=False)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            for key in [k for k in self._tile_heights if k == session_id or k.startswith(f"{session_id}:")]:
+                del self._tile_heights[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resolutions": self.resolutions,
+                "frames_per_resolution": {str(r): self._counts[r] for r in self.resolutions},
+                "tracked_sessions": len(self._tile_heights),
+            }
+
+
+class RoiTracker:
+    """
+    Per-client region of interest for continuous (live) detection.
+
+    After a frame with detections, the next frame is cropped to the bounding
+    region of those tiles plus a margin, so the model sees the tile band at a
+    higher effective resolution. The full frame is used again every
+    refresh_interval frames, after an empty result, and whenever a cropped
+    frame finds a different number of tiles than the previous frame
+    (the caller re-runs that frame uncropped).
+    """
+
+    def __init__(self, margin: float = 0.15, refresh_interval: int = 10, max_clients: int = 256):
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+        self.max_clients = max_clients
+        self._state = OrderedDict()
+        self._lock = threading.Lock()
+        self._roi_frames = 0
+        self._full_frames = 0
+        self._fallbacks = 0
+        self._area_fraction_total = 0.0
+
+    def plan(self, client_key: str, frame_width: int, frame_height: int) -> Optional[tuple]:
+        """ROI (x1, y1, x2, y2) in pixels for the next frame, or None for the full frame."""
+        with self._lock:
+            state = self._state.get(client_key)
+            if state is None or state["frames_since_full"] >= self.refresh_interval or state["frame_size"] != (frame_width, frame_height):
+                self._full_frames += 1
+                return None
+            roi = state["roi"]
+            self._roi_frames += 1
+            self._area_fraction_total += (roi[2] - roi[0]) * (roi[3] - roi[1]) / (frame_width * frame_height)
+            return roi
+
+    def accepts(self, client_key: str, tile_count: int) -> bool:
+        """Whether a cropped result is consistent with the previous frame (same tile count)."""
+        with self._lock:
+            state = self._state.get(client_key)
+            consistent = state is not None and state["tile_count"] == tile_count
+            if not consistent:
+                self._fallbacks += 1
+            return consistent
+
+    def update(self, client_key: str, frame_width: int, frame_height: int, xyxy: np.ndarray, used_roi: bool):
+        """Record this frame's detections (full-frame xyxy) to plan the next ROI."""
+        with self._lock:
+            if len(xyxy) == 0:
+                self._state.pop(client_key, None)
+                return
+
+            x1, y1 = xyxy[:, 0].min(), xyxy[:, 1].min()
+            x2, y2 = xyxy[:, 2].max(), xyxy[:, 3].max()
+            # Margin scales with the tile band, but is at least one tile tall
+            tile_height = float(np.median(xyxy[:, 3] - xyxy[:, 1]))
+            pad_x = max((x2 - x1) * self.margin, tile_height)
+            pad_y = max((y2 - y1) * self.margin, tile_height)
+            roi = (
+                int(max(0, x1 - pad_x)),
+                int(max(0, y1 - pad_y)),
+                int(min(frame_width, x2 + pad_x)),
+                int(min(frame_height, y2 + pad_y)),
+            )
+
+            previous = self._state.get(client_key)
+            frames_since_full = previous["frames_since_full"] + 1 if (used_roi and previous) else 0
+            self._state[client_key] = {
+                "roi": roi,
+                "tile_count": len(xyxy),
+                "frame_size": (frame_width, frame_height),
+                "frames_since_full": frames_since_full,
+            }
+            self._state.move_to_end(client_key)
+            while len(self._state) > self.max_clients:
+                self._state.popitem(last=False)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            for key in [k for k in self._state if k == session_id or k.startswith(f"{session_id}:")]:
+                del self._state[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "roi_frames": self._roi_frames,
+                "full_frames": self._full_frames,
+                "count_change_fallbacks": self._fallbacks,
+                "avg_roi_area_fraction": round(self._area_fraction_total / self._roi_frames, 3) if self._roi_frames else None,
+                "tracked_clients": len(self._state),
+            }
+
+
+@functools.lru_cache(maxsize=4)
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so that dct(x) = M @ x @ M.T for an (n, n) block."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+def perceptual_hash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    64-bit DCT perceptual hash (pHash) of a BGR frame: low-frequency DCT
+    coefficients of a 4x-downsampled grayscale thumbnail, thresholded at
+    their median. Near-identical frames differ in only a few bits.
+    """
+    size = hash_size * 4
+    # Point-sample down to 4x the thumbnail first; area-averaging a full frame costs ~100x more
+    sampled = cv2.resize(frame, (size * 4, size * 4), interpolation=cv2.INTER_NEAREST)
+    gray = cv2.cvtColor(sampled, cv2.COLOR_BGR2GRAY) if sampled.ndim == 3 else sampled
+    thumb = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    m = _dct_matrix(size)
+    low = (m @ thumb @ m.T)[:hash_size, :hash_size].ravel()
+    # The DC term only tracks overall brightness
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class FrameDeduplicator:
+    """
+    Per-client cache of the last inferred frame's perceptual hash and results.
+
+    Live clients resend near-identical frames while the table is idle; a frame
+    within max_distance bits (Hamming) of the last inferred frame reuses its
+    detections instead of running the model. Matching is always against the
+    last *inferred* frame so slow drift eventually forces a new inference, and
+    at most max_skips frames in a row are served from the cache.
+    """
+
+    def __init__(self, max_distance: int = 4, max_skips: int = 30, max_clients: int = 256):
+        self.max_distance = max_distance
+        self.max_skips = max_skips
+        self.max_clients = max_clients
+        self._state = OrderedDict()
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._skipped = 0
+
+    def lookup(self, client_key: str, frame_hash: int, params: tuple) -> Optional[Detections]:
+        """Cached results for a matching frame (same inference params), or None to run the model."""
+        with self._lock:
+            self._frames += 1
+            state = self._state.get(client_key)
+            if (state is None or state["params"] != params or state["skips"] >= self.max_skips
+                    or bin(state["hash"] ^ frame_hash).count("1") > self.max_distance):
+                return None
+            state["skips"] += 1
+            self._skipped += 1
+            self._state.move_to_end(client_key)
+            results = state["results"].copy()
+            results.reused = True
+            return results
+
+    def store(self, client_key: str, frame_hash: int, params: tuple, results: Detections):
+        with self._lock:
+            self._state[client_key] = {
+                "hash": frame_hash,
+                "params": params,
+                "results": results.copy(),
+                "skips": 0,
+            }
+            self._state.move_to_end(client_key)
+            while len(self._state) > self.max_clients:
+                self._state.popitem(last=False)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            for key in [k for k in self._state if k == session_id or k.startswith(f"{session_id}:")]:
+                del self._state[key]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "frames": self._frames,
+                "skipped_frames": self._skipped,
+                "skip_rate": round(self._skipped / self._frames, 4) if self._frames else 0.0,
+                "tracked_clients": len(self._state),
+            }
+
+
+class StageTimings:
+    """
+    Process-wide aggregate of per-stage detection latency.
+
+    record() takes the timings dict of one detect() call; metrics() reports
+    count, mean and max since startup plus p50/p95 over the last window calls.
+    """
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Dict[str, float]):
+        with self._lock:
+            for stage, ms in timings.items():
+                stats = self._stages.get(stage)
+                if stats is None:
+                    stats = self._stages[stage] = {"count": 0, "total": 0.0, "max": 0.0,
+                                                   "recent": deque(maxlen=self.window)}
+                stats["count"] += 1
+                stats["total"] += ms
+                stats["max"] = max(stats["max"], ms)
+                stats["recent"].append(ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            report = {}
+            for stage, stats in sorted(self._stages.items()):
+                p50, p95 = np.percentile(stats["recent"], [50, 95])
+                report[stage] = {
+                    "count": stats["count"],
+                    "mean_ms": round(stats["total"] / stats["count"], 3),
+                    "p50_ms": round(float(p50), 3),
+                    "p95_ms": round(float(p95), 3),
+                    "max_ms": round(stats["max"], 3),
+                }
+            return report
+
+
 class VisionService:
-    def __init__(self, model_path: str, class_names_path: str, confidence_threshold: float = 0.7, iou_threshold: float = 0.8):
+    def __init__(self, model_path: str, class_names_path: str, confidence_threshold: float = 0.7, iou_threshold: float = 0.8,
+                 session_options: Dict[str, Any] = None, quantized_model_path: str = None, model_variant: str = "fp32",
+                 pool_size: int = 1, pin_threads: bool = False, resolution_policy: Optional[ResolutionPolicy] = None,
+                 roi_tracker: Optional[RoiTracker] = None, slice_options: Dict[str, Any] = None,
+                 frame_dedup: Optional[FrameDeduplicator] = None, backend: str = "onnxruntime",
+                 backend_benchmark_runs: int = 5):
         """
         Initialize the Vision Service with a local YOLO model.
+        model_variant="int8" serves quantized_model_path instead, falling back to FP32 if it is missing.
+        pool_size sessions are created; detect_objects_async runs them on a thread pool of the same size.
+        resolution_policy is only applied when the model has dynamic spatial axes.
+        roi_tracker crops live frames to the previous detections (detect_objects(track_roi=True)).
+        slice_options are YOLOv8Inference.infer_sliced() keyword arguments for detect_objects(sliced=True).
+        frame_dedup reuses the previous results for near-identical live frames (track_roi=True).
+        backend is "onnxruntime", "opencv" or "auto" (micro-benchmark both at startup, keep the faster).
         """
+        if model_variant not in ("fp32", "int8"):
+            raise ValueError(f"Unknown YOLO model variant: {model_variant}")
+
+        self.model_variant = model_variant
+        if model_variant == "int8":
+            if quantized_model_path and os.path.exists(quantized_model_path):
+                model_path = quantized_model_path
+                session_options = self._variant_session_options(session_options, "int8")
+            else:
+                logger.warning(f"INT8 model not found at {quantized_model_path}, falling back to FP32.")
+                self.model_variant = "fp32"
+
         self.model_path = model_path
         self.class_names_path = class_names_path
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
+        self.session_options = session_options
+        self.pool_size = pool_size
+        self.pin_threads = pin_threads
+        self.resolution_policy = resolution_policy
+        self.roi_tracker = roi_tracker
+        self.slice_options = slice_options or {}
+        self.frame_dedup = frame_dedup
+        self.backend = backend
+        self.backend_benchmark_runs = backend_benchmark_runs
+        self.backend_timings = None
+        self.pool = None
         self.model = None
+        self.warmed_up = False
+        self.stage_timings = StageTimings()
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="vision")
         
         self._initialize_model()
 
+    @staticmethod
+    def _variant_session_options(session_options: Dict[str, Any], variant: str) -> Dict[str, Any]:
+        """Keep a separate optimized-graph cache per model variant."""
+        options = dict(session_options or {})
+        cache_path = options.get("optimized_model_path")
+        if cache_path:
+            root, ext = os.path.splitext(cache_path)
+            options["optimized_model_path"] = f"{root}.{variant}{ext}"
+        return options
+
+    def _pool_session_options(self, index: int) -> Dict[str, Any]:
+        """Give each pooled session its own share of the cores (and optionally pin it there)."""
+        options = dict(self.session_options or {})
+        threads = options.get("intra_op_threads") or default_intra_op_threads(self.pool_size)
+        options["intra_op_threads"] = threads
+
+        if self.pin_threads and threads > 1:
+            # ORT pins the (threads - 1) worker threads; the calling thread stays unpinned.
+            # Logical processor ids are 1-based, and ORT refuses ids beyond the machine's.
+            first = index * threads + 1
+            last = first + threads - 1
+            cpus = os.cpu_count() or 1
+            if last <= cpus:
+                options["thread_affinities"] = ";".join(str(cpu) for cpu in range(first + 1, last + 1))
+            else:
+                logger.warning(f"Not pinning session {index}: {threads} threads from CPU {first} "
+                               f"exceed the {cpus} available")
+        return options
+
+    def _create_model(self, index: int) -> YOLOv8Inference:
+        return YOLOv8Inference(
+            model_path=self.model_path,
+            class_names_path=self.class_names_path,
+            confidence_threshold=self.confidence_threshold,
+            iou_threshold=self.iou_threshold,
+            session_options=self._pool_session_options(index),
+            backend=self.backend
+        )
+
     def _initialize_model(self):
         try:
-            logger.info(f"Initializing VisionService with model: {self.model_path}")
-            self.model = YOLOv8Inference(
-                model_path=self.model_path,
-                class_names_path=self.class_names_path,
-                confidence_threshold=self.confidence_threshold,
-                iou_threshold=self.iou_threshold
-            )
+            if self.backend == "auto":
+                self.backend, self.backend_timings = benchmark_backends(
+                    self.model_path, self._pool_session_options(0), runs=self.backend_benchmark_runs
+                )
+            logger.info(f"Initializing VisionService with model: {self.model_path} ({self.model_variant}, {self.backend}), pool size {self.pool_size}")
+            self.pool = InferenceSessionPool(self._create_model, self.pool_size)
+            self.model = self.pool.models[0]
+            if self.resolution_policy and not self.model.dynamic_input:
+                logger.info("Model has a fixed input size; dynamic resolution policy disabled.")
+                self.resolution_policy = None
             logger.info("VisionService initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize VisionService: {e}")
             raise e
 
-    def detect_objects(self, image_path: str, conf_threshold: float = None, iou_threshold: float = None) -> List[Dict[str, Any]]:
+    def _infer_frame(self, frame: np.ndarray, conf_threshold: float = None, iou_threshold: float = None,
+                     session_key: str = None, timings: Dict[str, float] = None):
+        """Run one frame through a pooled session, applying the resolution policy."""
+        input_size = None
+        if self.resolution_policy:
+            resolution = self.resolution_policy.choose(frame.shape[1], frame.shape[0], session_key)
+            input_size = (resolution, resolution)
+
+        with self.pool.checkout() as model:
+            detections = model.infer(frame, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
+                                     input_size=input_size, timings=timings)
+
+        if self.resolution_policy:
+            self.resolution_policy.observe(session_key, detections.data['y2'] - detections.data['y1'])
+        return detections
+
+    def _infer_with_roi(self, frame: np.ndarray, conf_threshold: float = None, iou_threshold: float = None,
+                        session_key: str = None, timings: Dict[str, float] = None):
         """
-        Detect objects in an image file.
-        Returns a list of dictionaries in the format:
-        [
-            {'x': center_x, 'y': center_y, 'width': w, 'height': h, 'class': class_name, 'confidence': conf},
-            ...
-        ]
+        Crop to the client's ROI when available, falling back to the full frame on a tile count change.
+        The stages of that second, full-frame run are reported as "roi_fallback_<stage>".
+        """
+        height, width = frame.shape[:2]
+        roi = self.roi_tracker.plan(session_key, width, height)
+
+        full_frame_timings = timings
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            detections = self._infer_frame(frame[y1:y2, x1:x2], conf_threshold, iou_threshold, session_key, timings)
+            detections.translate(x1, y1)
+            if self.roi_tracker.accepts(session_key, len(detections)):
+                self.roi_tracker.update(session_key, width, height, detections.xyxy, used_roi=True)
+                return detections
+            full_frame_timings = {} if timings is not None else None
+
+        detections = self._infer_frame(frame, conf_threshold, iou_threshold, session_key, full_frame_timings)
+        if full_frame_timings is not timings:
+            for stage, ms in full_frame_timings.items():
+                timings[f"roi_fallback_{stage}"] = ms
+        self.roi_tracker.update(session_key, width, height, detections.xyxy, used_roi=False)
+        return detections
+
+    def _infer_sliced(self, frame: np.ndarray, conf_threshold: float = None, iou_threshold: float = None,
+                      timings: Dict[str, float] = None):
+        with self.pool.checkout() as model:
+            return model.infer_sliced(frame, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
+                                      timings=timings, **self.slice_options)
+
+    def detect(self, image: Union[str, bytes, np.ndarray], conf_threshold: float = None, iou_threshold: float = None,
+               session_key: str = None, track_roi: bool = False, sliced: bool = False,
+               timings: Dict[str, float] = None) -> Detections:
+        """
+        Detect tiles in an image file, encoded image bytes or an already decoded
+        BGR frame, returning a Detections array.
+        session_key identifies a stream of related frames (e.g. "<session_id>:hand")
+        for the dynamic resolution policy; with track_roi=True (live mode) it also
+        keys the ROI tracker and the frame deduplicator. sliced=True runs
+        overlapping-slice inference for high-resolution photos instead.
+        Per-stage milliseconds ("decode_ms", "dedup_ms", the
+        YOLOv8Inference.infer() stages and "roi_fallback_*" for a rejected ROI
+        crop's full-frame rerun) are added to timings (a new dict if
+        omitted), attached to the result as .timings and aggregated into
+        metrics()["stages"].
+        Errors are logged and yield an empty result.
         """
         if not self.model:
             logger.error("Model not initialized.")
-            return []
+            return Detections.empty()
 
+        timings = {} if timings is None else timings
         try:
-            # Read image using OpenCV
-            frame = cv2.imread(image_path)
-            if frame is None:
-                logger.error(f"Failed to read image at {image_path}")
-                return []
-
-            # Run inference
-            detections = self.model.infer(frame, conf_threshold=conf_threshold, iou_threshold=iou_threshold)
-
-            # Convert to standard format
-            results = []
-            
-            # detections.xyxy is a numpy array of [x1, y1, x2, y2]
-            # detections.confidence is a numpy array
-            # detections['class_name'] is a numpy array of strings
-            
-            if len(detections.xyxy) > 0:
-                for i in range(len(detections.xyxy)):
-                    x1, y1, x2, y2 = detections.xyxy[i]
-                    conf = float(detections.confidence[i])
-                    cls_name = detections['class_name'][i]
-                    
-                    # Convert to center x, y, width, height
-                    width = x2 - x1
-                    height = y2 - y1
-                    center_x = x1 + width / 2
-                    center_y = y1 + height / 2
-                    
-                    results.append({
-                        'x': float(center_x),
-                        'y': float(center_y),
-                        'width': float(width),
-                        'height': float(height),
-                        'class': cls_name,
-                        'confidence': conf
-                    })
-            
-            return results
-
+            detections = self._detect(image, conf_threshold, iou_threshold, session_key, track_roi, sliced, timings)
         except Exception as e:
             logger.error(f"Error during object detection: {e}")
-            return []
+            detections = Detections.empty()
+        detections.timings = timings
+        self.stage_timings.record(timings)
+        return detections
+
+    def _detect(self, image: Union[str, bytes, np.ndarray], conf_threshold: float, iou_threshold: float, session_key: Optional[str],
+                track_roi: bool, sliced: bool, timings: Dict[str, float]) -> Detections:
+
+        # Read image using OpenCV
+        if isinstance(image, np.ndarray):
+            frame = image
+        else:
+            start = time.perf_counter()
+            if isinstance(image, (bytes, bytearray, memoryview)):
+                frame = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+            else:
+                frame = cv2.imread(image)
+            add_stage_time(timings, "decode_ms", start)
+        if frame is None:
+            logger.error(f"Failed to read image at {image}" if isinstance(image, str) else "Failed to decode image bytes")
+            return Detections.empty()
+
+        dedup_key = frame_hash = None
+        if track_roi and session_key and self.frame_dedup and not sliced:
+            start = time.perf_counter()
+            dedup_key = session_key
+            dedup_params = (conf_threshold, iou_threshold)
+            frame_hash = perceptual_hash(frame)
+            cached = self.frame_dedup.lookup(dedup_key, frame_hash, dedup_params)
+            add_stage_time(timings, "dedup_ms", start)
+            if cached is not None:
+                return cached
+
+        # Run inference on a pooled session
+        if sliced:
+            detections = self._infer_sliced(frame, conf_threshold, iou_threshold, timings)
+        elif track_roi and session_key and self.roi_tracker:
+            detections = self._infer_with_roi(frame, conf_threshold, iou_threshold, session_key, timings)
+        else:
+            detections = self._infer_frame(frame, conf_threshold, iou_threshold, session_key, timings)
+
+        if dedup_key:
+            self.frame_dedup.store(dedup_key, frame_hash, dedup_params, detections)
+        return detections
+
+    def detect_objects(self, image_path: str, conf_threshold: float = None, iou_threshold: float = None,
+                       session_key: str = None, track_roi: bool = False, sliced: bool = False) -> List[Dict[str, Any]]:
+        """
+        detect() with the results as a list of dictionaries in the format:
+        [
+            {'x': center_x, 'y': center_y, 'width': w, 'height': h, 'class': class_name, 'confidence': conf},
+            ...
+        ]
+        """
+        return self.detect(image_path, conf_threshold, iou_threshold, session_key=session_key,
+                           track_roi=track_roi, sliced=sliced).to_predictions()
+
+    def warmup(self, passes: int = 2, frame_size: tuple = (1280, 720)):
+        """
+        Run inference on synthetic frames through every pooled session, so
+        graph initialization, arena growth and kernel selection happen before
+        the first real request. frame_size is (width, height).
+        """
+        width, height = frame_size
+        rng = np.random.default_rng(0)
+        # Full frame plus the top/bottom halves analyze-hand feeds the model
+        frames = [
+            rng.integers(0, 256, (height, width, 3), dtype=np.uint8),
+            rng.integers(0, 256, (height // 2, width, 3), dtype=np.uint8),
+        ]
+
+        # Dynamic models select kernels per input shape, so warm every resolution
+        input_sizes = [None]
+        if self.resolution_policy:
+            input_sizes = [(r, r) for r in self.resolution_policy.resolutions]
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            # Hold every session so live requests can't share one (or its input buffers) meanwhile
+            models = [stack.enter_context(self.pool.checkout()) for _ in range(self.pool.size)]
+            for model in models:
+                for _ in range(passes):
+                    for frame in frames:
+                        for input_size in input_sizes:
+                            model.infer(frame, input_size=input_size)
+        self.warmed_up = True
+        logger.info(f"VisionService warmed up {len(self.pool.models)} session(s) in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def warmup_async(self, passes: int = 2, frame_size: tuple = (1280, 720)):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, functools.partial(self.warmup, passes, frame_size))
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "model_loaded": self.pool is not None,
+            "model_variant": self.model_variant,
+            "backend": self.backend,
+            "backend_benchmark_ms": self.backend_timings,
+            "warmed_up": self.warmed_up,
+        }
+
+    async def detect_async(self, image: Union[str, bytes, np.ndarray], conf_threshold: float = None, iou_threshold: float = None,
+                           session_key: str = None, track_roi: bool = False, sliced: bool = False) -> Detections:
+        """detect() on the vision thread pool, keeping the event loop free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self.detect, image, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
+                              session_key=session_key, track_roi=track_roi, sliced=sliced)
+        )
+
+    async def detect_objects_async(self, image_path: str, conf_threshold: float = None, iou_threshold: float = None,
+                                   session_key: str = None, track_roi: bool = False, sliced: bool = False) -> List[Dict[str, Any]]:
+        """detect_objects() on the vision thread pool, keeping the event loop free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self.detect_objects, image_path, conf_threshold=conf_threshold, iou_threshold=iou_threshold,
+                              session_key=session_key, track_roi=track_roi, sliced=sliced)
+        )
+
+    def forget_session(self, session_id: str):
+        """Drop per-session state (resolution history, ROI, dedup cache) when a game session ends."""
+        if self.resolution_policy:
+            self.resolution_policy.forget(session_id)
+        if self.roi_tracker:
+            self.roi_tracker.forget(session_id)
+        if self.frame_dedup:
+            self.frame_dedup.forget(session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool.metrics() if self.pool else None,
+            "resolution_policy": self.resolution_policy.metrics() if self.resolution_policy else None,
+            "roi_tracker": self.roi_tracker.metrics() if self.roi_tracker else None,
+            "frame_dedup": self.frame_dedup.metrics() if self.frame_dedup else None,
+            "stages": self.stage_timings.metrics(),
+        }
 
 def draw_bounding_boxes(image_path: str, predictions: List[dict], output_path: str):
     """
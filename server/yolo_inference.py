@@ -1,32 +1,440 @@
 import cv2
 import numpy as np
-import onnxruntime as ort
-import supervision as sv
+import functools
 import logging
+import os
+import time
+from numpy.lib.recfunctions import structured_to_unstructured
+
+try:
+    import onnxruntime as ort
+except ImportError:  # OpenCV DNN backend only
+    ort = None
 
 logger = logging.getLogger(__name__)
 
+# Compact detection record produced by postprocess(): one row per kept box,
+# coordinates are xyxy in model input space (before letterbox removal).
+DETECTION_DTYPE = np.dtype([
+    ('x1', np.float32),
+    ('y1', np.float32),
+    ('x2', np.float32),
+    ('y2', np.float32),
+    ('confidence', np.float32),
+    ('class_id', np.int16),
+])
+
+
+def add_stage_time(timings, stage, start):
+    """Add the milliseconds since start to timings[stage] (if timings is a dict) and return a new start."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - start) * 1000
+    return now
+
+
+def non_max_suppression(boxes, scores, class_ids, iou_threshold, agnostic=True, metric="iou"):
+    """
+    Greedy NMS over xyxy boxes.
+
+    Class-agnostic by default, like cv2.dnn.NMSBoxes: one physical tile
+    predicted as two classes must yield a single detection. With
+    agnostic=False boxes of different classes are shifted apart by a
+    per-class offset so a single pass never suppresses across classes.
+    metric="ios" (intersection over the smaller box) also catches a tile cut
+    in half at a slice seam, whose IoU with the whole tile is low.
+    Returns the indices of kept boxes, highest score first.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if agnostic:
+        shifted = boxes
+    else:
+        offset = class_ids.astype(boxes.dtype) * (boxes.max() + 1)
+        shifted = boxes + offset[:, None]
+
+    x1, y1, x2, y2 = shifted[:, 0], shifted[:, 1], shifted[:, 2], shifted[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = np.argsort(-scores, kind='stable')
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        if metric == "ios":
+            overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        else:
+            overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+        order = rest[overlap <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.intp)
+
+
+def postprocess(outputs, conf_threshold, iou_threshold, agnostic=True, timings=None):
+    """
+    Decode raw YOLOv8 output of shape (1, 4 + num_classes, num_anchors).
+
+    The max class score is thresholded on the untransposed array, so only
+    the surviving anchors are ever copied. Returns a DETECTION_DTYPE array.
+    With a timings dict, NMS time is added to "nms_ms" and the rest to
+    "postprocess_ms".
+    """
+    start = time.perf_counter()
+    predictions = outputs[0]
+    scores = predictions[4:]
+
+    max_scores = scores.max(axis=0)
+    keep = np.flatnonzero(max_scores > conf_threshold)
+    if keep.size == 0:
+        add_stage_time(timings, "postprocess_ms", start)
+        return np.empty(0, dtype=DETECTION_DTYPE)
+
+    candidates = predictions[:, keep]
+    class_ids = candidates[4:].argmax(axis=0)
+    confidences = max_scores[keep]
+
+    # cx, cy, w, h -> x1, y1, x2, y2
+    cx, cy, w, h = candidates[:4]
+    xyxy = np.empty((keep.size, 4), dtype=np.float32)
+    xyxy[:, 0] = cx - w / 2
+    xyxy[:, 1] = cy - h / 2
+    xyxy[:, 2] = cx + w / 2
+    xyxy[:, 3] = cy + h / 2
+
+    start = add_stage_time(timings, "postprocess_ms", start)
+    indices = non_max_suppression(xyxy, confidences, class_ids, iou_threshold, agnostic=agnostic)
+    start = add_stage_time(timings, "nms_ms", start)
+
+    dets = np.empty(indices.size, dtype=DETECTION_DTYPE)
+    dets['x1'] = xyxy[indices, 0]
+    dets['y1'] = xyxy[indices, 1]
+    dets['x2'] = xyxy[indices, 2]
+    dets['y2'] = xyxy[indices, 3]
+    dets['confidence'] = confidences[indices]
+    dets['class_id'] = class_ids[indices]
+    add_stage_time(timings, "postprocess_ms", start)
+    return dets
+
+class Detections:
+    """
+    Detections for one image: a DETECTION_DTYPE array in image pixels plus
+    the model's class-name table. Column access and the conversions to
+    response rows are vectorized; per-box Python objects are only built by
+    to_predictions() / to_records() at serialization time.
+
+    timings holds the per-stage milliseconds of the call that produced it
+    (decode_ms, preprocess_ms, inference_ms, postprocess_ms, nms_ms), if any.
+    reused is True when the results were served from the frame deduplicator's
+    cache rather than inferred from this frame.
+    """
+    __slots__ = ("data", "class_names", "timings", "reused")
+
+    def __init__(self, data, class_names, timings=None, reused=False):
+        self.data = data
+        self.class_names = class_names
+        self.timings = timings
+        self.reused = reused
+
+    @classmethod
+    def empty(cls, class_names=()):
+        return cls(np.empty(0, dtype=DETECTION_DTYPE), np.asarray(class_names, dtype=str))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        """Select rows by index array or boolean mask."""
+        return Detections(np.atleast_1d(self.data[index]), self.class_names, self.timings, self.reused)
+
+    def copy(self):
+        return Detections(self.data.copy(), self.class_names, dict(self.timings) if self.timings else None,
+                          self.reused)
+
+    @property
+    def xyxy(self):
+        """(N, 4) float32 copy of the boxes."""
+        return structured_to_unstructured(self.data[['x1', 'y1', 'x2', 'y2']], copy=True)
+
+    @property
+    def confidence(self):
+        return self.data['confidence']
+
+    @property
+    def class_id(self):
+        return self.data['class_id']
+
+    @property
+    def class_name(self):
+        return self.class_names[self.data['class_id']]
+
+    def translate(self, dx, dy):
+        """Shift all boxes by (dx, dy) pixels, in place."""
+        for x, y in (('x1', 'y1'), ('x2', 'y2')):
+            self.data[x] += dx
+            self.data[y] += dy
+
+    def to_predictions(self):
+        """Rows as {'x', 'y', 'width', 'height', 'class', 'confidence'} dicts (box centers)."""
+        d = self.data
+        width = d['x2'] - d['x1']
+        height = d['y2'] - d['y1']
+        columns = (
+            (d['x1'] + width / 2).tolist(), (d['y1'] + height / 2).tolist(),
+            width.tolist(), height.tolist(), self.class_name.tolist(), d['confidence'].tolist(),
+        )
+        keys = ('x', 'y', 'width', 'height', 'class', 'confidence')
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def to_records(self):
+        """Rows as {'class_name', 'x1', 'y1', 'x2', 'y2', 'confidence'} dicts (TileDetection fields)."""
+        d = self.data
+        columns = (
+            self.class_name.tolist(), d['x1'].tolist(), d['y1'].tolist(), d['x2'].tolist(), d['y2'].tolist(),
+            d['confidence'].tolist(),
+        )
+        keys = ('class_name', 'x1', 'y1', 'x2', 'y2', 'confidence')
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+@functools.lru_cache(maxsize=64)
+def slice_plan(width, height, slice_size, overlap):
+    """
+    Overlapping square slices covering a width x height image, as a tuple of
+    (x1, y1, x2, y2). The last slice on each axis is aligned to the image edge.
+    Cached per image size, since a camera produces the same size every time.
+    """
+    def starts(length):
+        if length <= slice_size:
+            return [0]
+        step = max(1, int(slice_size * (1 - overlap)))
+        positions = list(range(0, length - slice_size, step))
+        positions.append(length - slice_size)
+        return positions
+
+    return tuple(
+        (x, y, min(x + slice_size, width), min(y + slice_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    )
+
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+} if ort else {}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+} if ort else {}
+
+
+def default_intra_op_threads(sessions_per_worker=1):
+    """
+    Split the machine's cores between uvicorn workers (WEB_CONCURRENCY) and
+    the sessions each of them holds, so they don't each spin up one ORT
+    thread per core. Returns 0 (ORT default) for a single session overall.
+    """
+    workers = int(os.getenv("WEB_CONCURRENCY", "1") or 1)
+    if workers * sessions_per_worker <= 1:
+        return 0
+    return max(1, (os.cpu_count() or 1) // (workers * sessions_per_worker))
+
+
+def create_session(model_path, intra_op_threads=0, inter_op_threads=0, graph_optimization="all",
+                   execution_mode="sequential", enable_mem_arena=True, enable_mem_pattern=True,
+                   optimized_model_path=None, thread_affinities=None):
+    """
+    Create an onnxruntime InferenceSession with explicit SessionOptions.
+
+    If optimized_model_path is set, the optimized graph is saved there in ORT
+    format on first load and reused on later startups (as long as it is newer
+    than model_path), which skips graph optimization at boot.
+
+    thread_affinities pins the intra-op worker threads to logical processors,
+    in ORT's "session.intra_op.thread_affinities" format (e.g. "2;3;4").
+    """
+    if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level: {graph_optimization}")
+    if execution_mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {execution_mode}")
+
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = intra_op_threads if intra_op_threads else default_intra_op_threads()
+    so.inter_op_num_threads = inter_op_threads
+    so.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+    so.execution_mode = EXECUTION_MODES[execution_mode]
+    so.enable_cpu_mem_arena = enable_mem_arena
+    so.enable_mem_pattern = enable_mem_pattern
+    if thread_affinities:
+        so.add_session_config_entry("session.intra_op.thread_affinities", thread_affinities)
+
+    load_path = model_path
+    if optimized_model_path:
+        cache_fresh = (
+            os.path.exists(optimized_model_path)
+            and os.path.getmtime(optimized_model_path) >= os.path.getmtime(model_path)
+        )
+        if cache_fresh:
+            load_path = optimized_model_path
+        else:
+            so.optimized_model_filepath = optimized_model_path
+            so.add_session_config_entry("session.save_model_format", "ORT")
+
+    session = ort.InferenceSession(load_path, sess_options=so, providers=["CPUExecutionProvider"])
+
+    logger.info(
+        "ONNX Runtime session: model=%s intra_op_threads=%s inter_op_threads=%s graph_optimization=%s "
+        "execution_mode=%s mem_arena=%s mem_pattern=%s optimized_cache=%s thread_affinities=%s",
+        load_path, so.intra_op_num_threads or "auto", so.inter_op_num_threads or "auto", graph_optimization,
+        execution_mode, enable_mem_arena, enable_mem_pattern,
+        ("loaded" if load_path != model_path else "saved") if optimized_model_path else "off",
+        thread_affinities or "off",
+    )
+    return session
+
+
+def onnx_input_shape(model_path):
+    """
+    (name, shape) of the model's first input, read from the ONNX graph. Dynamic
+    dims are returned as their names, the way onnxruntime reports them.
+    Without the onnx package the graph can't be read; the shipped fixed
+    (1, 3, 640, 640) input is assumed, since treating a fixed model as dynamic
+    would feed it inputs of the wrong size.
+    """
+    try:
+        import onnx
+    except ImportError:
+        logger.warning("onnx is not installed; assuming a fixed (1, 3, 640, 640) input "
+                       "(dynamic resolution is disabled for this backend).")
+        return "images", [1, 3, 640, 640]
+
+    graph = onnx.load(model_path, load_external_data=False).graph
+    initializers = {init.name for init in graph.initializer}
+    model_input = next(i for i in graph.input if i.name not in initializers)
+    shape = [
+        d.dim_value if d.HasField("dim_value") else (d.dim_param or None)
+        for d in model_input.type.tensor_type.shape.dim
+    ]
+    return model_input.name, shape
+
+
+class OnnxRuntimeBackend:
+    """Inference through an onnxruntime InferenceSession (session_options: create_session() kwargs)."""
+    name = "onnxruntime"
+
+    def __init__(self, model_path, session_options=None):
+        if ort is None:
+            raise ImportError("onnxruntime is not installed")
+        self.session = create_session(model_path, **(session_options or {}))
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = model_input.shape
+        self.output_name = self.session.get_outputs()[0].name
+
+    def run(self, input_tensor):
+        return self.session.run([self.output_name], {self.input_name: input_tensor})[0]
+
+
+class OpenCVDnnBackend:
+    """
+    Inference through cv2.dnn (OpenCV's own CPU backend). Needs no
+    onnxruntime; session_options don't apply and are ignored.
+    """
+    name = "opencv"
+
+    def __init__(self, model_path, session_options=None):
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.input_name, self.input_shape = onnx_input_shape(model_path)
+        self.output_name = self.net.getUnconnectedOutLayersNames()[0]
+        logger.info("OpenCV DNN net: model=%s threads=%s", model_path, cv2.getNumThreads())
+
+    def run(self, input_tensor):
+        self.net.setInput(input_tensor)
+        return self.net.forward(self.output_name)
+
+
+INFERENCE_BACKENDS = {
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenCVDnnBackend.name: OpenCVDnnBackend,
+}
+
+
+def create_backend(model_path, backend="onnxruntime", session_options=None):
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return INFERENCE_BACKENDS[backend](model_path, session_options)
+
+
+def benchmark_backends(model_path, session_options=None, runs=5, input_size=(640, 640)):
+    """
+    Time one inference per backend on a random input (after a warmup run) and
+    return (fastest backend name, {name: median ms}). Backends that aren't
+    installed or can't load the model are skipped.
+    """
+    timings = {}
+    for name in INFERENCE_BACKENDS:
+        try:
+            backend = create_backend(model_path, name, session_options)
+            _, _, h, w = backend.input_shape
+            width = w if isinstance(w, int) else input_size[0]
+            height = h if isinstance(h, int) else input_size[1]
+            tensor = np.random.default_rng(0).random((1, 3, height, width), dtype=np.float32)
+
+            backend.run(tensor)
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                backend.run(tensor)
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = float(np.median(samples))
+        except Exception as e:
+            logger.warning(f"Backend {name} unavailable for {model_path}: {e}")
+
+    if not timings:
+        raise RuntimeError(f"No inference backend could load {model_path}")
+    best = min(timings, key=timings.get)
+    logger.info("Inference backend benchmark (median ms over %d runs): %s -> %s", runs,
+                ", ".join(f"{k}={v:.1f}" for k, v in timings.items()), best)
+    return best, timings
+
+
 class YOLOv8Inference:
-    def __init__(self, model_path, class_names_path, confidence_threshold=0.7, iou_threshold=0.8, input_size=None):
+    def __init__(self, model_path, class_names_path, confidence_threshold=0.7, iou_threshold=0.8, input_size=None,
+                 session_options=None, backend="onnxruntime"):
         """
         Initialize YOLOv8 ONNX Inference
         
         Args:
             input_size: Optional tuple (width, height) to force specific inference size. 
                         Useful for dynamic models or overriding model metadata.
+            session_options: Optional dict of create_session() keyword arguments
+                        (threads, graph optimization, execution mode, arena, cache path).
+            backend: "onnxruntime" or "opencv" (cv2.dnn), see INFERENCE_BACKENDS.
         """
-        logger.info(f"Loading model from {model_path}...")
+        logger.info(f"Loading model from {model_path} ({backend})...")
         try:
-            self.session = ort.InferenceSession(model_path)
-            self.input_name = self.session.get_inputs()[0].name
-            self.output_name = self.session.get_outputs()[0].name
+            self.backend = create_backend(model_path, backend, session_options)
+            self.input_name = self.backend.input_name
+            self.output_name = self.backend.output_name
             
             # Get input shape from model
-            model_inputs = self.session.get_inputs()[0]
-            self.input_shape = model_inputs.shape 
+            self.input_shape = self.backend.input_shape
             
             # Determine input dimensions
             # Priority: 1. Manual override 2. Model metadata 3. Default 640x640
+            self.dynamic_input = False
             if input_size:
                 self.input_width, self.input_height = input_size
                 logger.info(f"Model input size forced to: {self.input_width}x{self.input_height}")
@@ -40,9 +448,10 @@ class YOLOv8Inference:
                     self.input_width = w
                     logger.info(f"Model input size detected: {self.input_width}x{self.input_height}")
                 else:
-                    logger.warning(f"Model has dynamic input shape {self.input_shape}. Defaulting to 640x640. Please specify input_size if needed.")
+                    logger.warning(f"Model has dynamic input shape {self.input_shape}. Defaulting to 640x640; infer() accepts a per-call input_size.")
                     self.input_height = 640
                     self.input_width = 640
+                    self.dynamic_input = True
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise e
@@ -50,18 +459,28 @@ class YOLOv8Inference:
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
         
+        # Reusable (1, 3, H, W) float32 input tensors, keyed by (width, height)
+        self._input_buffers = {}
+        
         print(f"Loading class names from {class_names_path}...")
         with open(class_names_path, 'r') as f:
             self.class_names = [line.strip() for line in f.readlines()]
+        self._class_name_table = np.array(self.class_names)
             
-    def preprocess(self, image):
-        """
-        Preprocess image: Letterbox resize, normalize, CHW
-        """
+    def _input_buffer(self, input_width, input_height, batch=1):
+        key = (input_width, input_height, batch)
+        buffer = self._input_buffers.get(key)
+        if buffer is None:
+            buffer = np.empty((batch, 3, input_height, input_width), dtype=np.float32)
+            self._input_buffers[key] = buffer
+        return buffer
+
+    def _letterbox_into(self, image, out, input_width, input_height):
+        """Letterbox image into out (3, H, W) float32, RGB, [0, 1]. Returns scale, (dw, dh)."""
         img_h, img_w = image.shape[:2]
         
         # Calculate scaling ratio
-        scale = min(self.input_width / img_w, self.input_height / img_h)
+        scale = min(input_width / img_w, input_height / img_h)
         new_w = int(round(img_w * scale))
         new_h = int(round(img_h * scale))
         
@@ -72,8 +491,8 @@ class YOLOv8Inference:
             image_resized = image
 
         # Calculate padding
-        dw = (self.input_width - new_w) / 2
-        dh = (self.input_height - new_h) / 2
+        dw = (input_width - new_w) / 2
+        dh = (input_height - new_h) / 2
         
         top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
         left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
@@ -81,86 +500,132 @@ class YOLOv8Inference:
         # Add border
         image_padded = cv2.copyMakeBorder(image_resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
         
-        # BGR to RGB, HWC to CHW, Normalize
-        image_input = cv2.cvtColor(image_padded, cv2.COLOR_BGR2RGB)
-        image_input = image_input.transpose((2, 0, 1))
-        image_input = np.expand_dims(image_input, axis=0)
-        image_input = np.ascontiguousarray(image_input, dtype=np.float32)
-        image_input /= 255.0
+        # BGR to RGB, HWC to CHW, Normalize (single pass into the output tensor)
+        np.multiply(image_padded[..., ::-1].transpose((2, 0, 1)), 1 / 255.0, out=out, casting='unsafe')
+        
+        return scale, (dw, dh)
+
+    def preprocess(self, image, input_size=None, reuse_buffer=False):
+        """
+        Preprocess image: Letterbox resize, normalize, CHW
+
+        Args:
+            input_size: Optional (width, height) to letterbox to instead of the
+                        model's default; only meaningful for dynamic-axes models.
+            reuse_buffer: Write into a cached per-resolution tensor instead of
+                        allocating one. The result is overwritten by the next call.
+        """
+        input_width, input_height = input_size or (self.input_width, self.input_height)
+        if reuse_buffer:
+            image_input = self._input_buffer(input_width, input_height)
+        else:
+            image_input = np.empty((1, 3, input_height, input_width), dtype=np.float32)
+        
+        scale, (dw, dh) = self._letterbox_into(image, image_input[0], input_width, input_height)
         
         return image_input, scale, (dw, dh)
 
-    def infer(self, frame, conf_threshold=None, iou_threshold=None):
+    def infer(self, frame, conf_threshold=None, iou_threshold=None, input_size=None, timings=None):
         """
         Run inference on a frame
+
+        Args:
+            input_size: Optional (width, height) inference resolution, for models
+                        exported with dynamic spatial axes.
+            timings: Optional dict to add the stage milliseconds to
+                        ("preprocess_ms", "inference_ms", "postprocess_ms", "nms_ms").
+                        The result's .timings is this dict (a new one if omitted).
         """
+        if timings is None:
+            timings = {}
         # Use provided thresholds or fall back to instance defaults
         conf_thres = conf_threshold if conf_threshold is not None else self.confidence_threshold
         iou_thres = iou_threshold if iou_threshold is not None else self.iou_threshold
 
-        input_tensor, scale, (dw, dh) = self.preprocess(frame)
-        
-        outputs = self.session.run([self.output_name], {self.input_name: input_tensor})[0]
-        
-        # Postprocess
-        # outputs shape: (1, 4 + num_classes, 8400)
-        # Transpose to (1, 8400, 4 + num_classes)
-        predictions = np.transpose(outputs, (0, 2, 1))
-        predictions = predictions[0]
-        
-        # Split boxes and scores
-        boxes = predictions[:, :4] # cx, cy, w, h
-        scores = predictions[:, 4:]
-        
-        # Get class with max score
-        class_ids = np.argmax(scores, axis=1)
-        max_scores = np.max(scores, axis=1)
-        
-        # Filter by confidence
-        mask = max_scores > conf_thres
-        boxes = boxes[mask]
-        class_ids = class_ids[mask]
-        scores = max_scores[mask]
+        if input_size and not self.dynamic_input:
+            input_size = None
+
+        start = time.perf_counter()
+        input_tensor, scale, (dw, dh) = self.preprocess(frame, input_size=input_size, reuse_buffer=True)
+        start = add_stage_time(timings, "preprocess_ms", start)
         
-        if len(boxes) == 0:
-            empty_det = sv.Detections.empty()
-            empty_det['class_name'] = np.array([])
-            return empty_det
-            
-        # Convert cx, cy, w, h to x1, y1, x2, y2
-        xyxy = np.zeros_like(boxes)
-        xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
-        xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
-        xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
-        xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
-        
-        # NMS
-        indices = cv2.dnn.NMSBoxes(xyxy.tolist(), scores.tolist(), conf_thres, iou_thres)
-        
-        if len(indices) == 0:
-            empty_det = sv.Detections.empty()
-            empty_det['class_name'] = np.array([])
-            return empty_det
-            
-        indices = np.array(indices).flatten()
+        outputs = self.backend.run(input_tensor)
+        start = add_stage_time(timings, "inference_ms", start)
         
-        final_boxes = xyxy[indices]
-        final_scores = scores[indices]
-        final_class_ids = class_ids[indices]
+        # Postprocess (score prefilter + class-agnostic NMS, in model input space)
+        dets = postprocess(outputs, conf_thres, iou_thres, timings=timings)
         
         # Rescale boxes to original image
-        final_boxes[:, [0, 2]] -= dw
-        final_boxes[:, [1, 3]] -= dh
-        final_boxes[:, :] /= scale
-        
-        # Create supervision Detections object
-        detections = sv.Detections(
-            xyxy=final_boxes,
-            confidence=final_scores,
-            class_id=final_class_ids
-        )
-        
-        # Add class names to data dict for convenience
-        detections['class_name'] = np.array([self.class_names[class_id] for class_id in final_class_ids])
+        start = time.perf_counter()
+        self._unletterbox(dets, scale, dw, dh)
+        detections = self._to_detections(dets)
+        add_stage_time(timings, "postprocess_ms", start)
         
+        detections.timings = timings
+        return detections
+
+    @staticmethod
+    def _unletterbox(dets, scale, dw, dh, offset_x=0, offset_y=0):
+        """Map DETECTION_DTYPE boxes from model input space back to (offset) image pixels, in place."""
+        for x, y in (('x1', 'y1'), ('x2', 'y2')):
+            dets[x] = (dets[x] - dw) / scale + offset_x
+            dets[y] = (dets[y] - dh) / scale + offset_y
+
+    def _to_detections(self, dets):
+        return Detections(dets, self._class_name_table)
+
+    def infer_sliced(self, frame, conf_threshold=None, iou_threshold=None, slice_size=1280, overlap=0.2,
+                     merge_threshold=0.6, timings=None):
+        """
+        Sliced inference for high-resolution photos.
+
+        The image is split into overlapping slice_size x slice_size tiles (see
+        slice_plan), each letterboxed to the model input and run as one batch
+        (or one by one if the model has a fixed batch size of 1). Boxes are
+        mapped back to image coordinates and duplicates across seams are
+        merged with intersection-over-smaller NMS at merge_threshold.
+        timings works as in infer(); the seam merge counts as NMS.
+        """
+        if timings is None:
+            timings = {}
+        conf_thres = conf_threshold if conf_threshold is not None else self.confidence_threshold
+        iou_thres = iou_threshold if iou_threshold is not None else self.iou_threshold
+
+        img_h, img_w = frame.shape[:2]
+        plan = slice_plan(img_w, img_h, slice_size, overlap)
+        if len(plan) == 1:
+            return self.infer(frame, conf_threshold=conf_thres, iou_threshold=iou_thres, timings=timings)
+
+        start = time.perf_counter()
+        batch = self._input_buffer(self.input_width, self.input_height, batch=len(plan))
+        transforms = []
+        for i, (x1, y1, x2, y2) in enumerate(plan):
+            scale, (dw, dh) = self._letterbox_into(frame[y1:y2, x1:x2], batch[i], self.input_width, self.input_height)
+            transforms.append((scale, dw, dh, x1, y1))
+        start = add_stage_time(timings, "preprocess_ms", start)
+
+        if isinstance(self.input_shape[0], int):
+            outputs = [self.backend.run(batch[i:i + 1]) for i in range(len(plan))]
+        else:
+            batch_output = self.backend.run(batch)
+            outputs = [batch_output[i:i + 1] for i in range(len(plan))]
+        start = add_stage_time(timings, "inference_ms", start)
+
+        slice_dets = []
+        for output, (scale, dw, dh, x1, y1) in zip(outputs, transforms):
+            dets = postprocess(output, conf_thres, iou_thres, timings=timings)
+            start = time.perf_counter()
+            self._unletterbox(dets, scale, dw, dh, offset_x=x1, offset_y=y1)
+            slice_dets.append(dets)
+            add_stage_time(timings, "postprocess_ms", start)
+
+        start = time.perf_counter()
+        dets = np.concatenate(slice_dets)
+        boxes = structured_to_unstructured(dets[['x1', 'y1', 'x2', 'y2']])
+        keep = non_max_suppression(boxes, dets['confidence'], dets['class_id'], merge_threshold, metric="ios")
+        start = add_stage_time(timings, "nms_ms", start)
+        detections = self._to_detections(dets[keep])
+        add_stage_time(timings, "postprocess_ms", start)
+
+        detections.timings = timings
         return detections
@@ -0,0 +1,84 @@
+"""
+Archive ended sessions older than --days into per-session .tar.gz bundles
+(rows + uploads), delete the originals and return the freed database pages
+(see server/retention.py). The server runs the same job on a schedule when
+RETENTION_DAYS is set; this runs it once, by hand.
+
+    python tools/archive_history.py --days 90 --dry-run       # report only
+    python tools/archive_history.py --days 90                 # archive
+    python tools/archive_history.py --enable-incremental-vacuum
+
+--enable-incremental-vacuum switches a database created before retention
+existed to auto_vacuum=INCREMENTAL. That needs one full VACUUM, which locks
+the database while it runs, so stop the server first.
+"""
+import argparse
+import json
+import os
+import sys
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+import database
+from config import config
+from retention import RetentionJob
+
+
+def enable_incremental_vacuum():
+    conn = database.get_db_connection()
+    before = os.path.getsize(database.DB_PATH)
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    print(f"auto_vacuum is now {database.vacuum_stats()['auto_vacuum']}: "
+          f"{before / 1024:.1f} KiB -> {os.path.getsize(database.DB_PATH) / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=database.DB_PATH, help="History database (default: server/history.db)")
+    parser.add_argument("--days", type=float, default=config.RETENTION_DAYS,
+                        help="Archive ended sessions inactive for longer than this (default: RETENTION_DAYS)")
+    parser.add_argument("--uploads", default=config.UPLOAD_DIR)
+    parser.add_argument("--archive-dir", default=config.RETENTION_ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No database at {args.db}")
+        sys.exit(1)
+    database.DB_PATH = args.db
+    database.init_db()
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum()
+        return
+    if args.days <= 0:
+        print("Set --days (or RETENTION_DAYS) to a positive number of days")
+        sys.exit(1)
+
+    job = RetentionJob(args.uploads, args.archive_dir, args.days, vacuum_pages=config.RETENTION_VACUUM_PAGES)
+    report = job.run(dry_run=args.dry_run)
+
+    for session in report["session_details"]:
+        print(f"{session['session_id']:<40} {session['last_activity_time']:<28} "
+              f"{session['interactions']:>6} rows {session['files']:>5} files {session['bytes'] / 1e6:>8.2f} MB")
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"\n{verb} {report['sessions']} sessions older than {report['cutoff']}: {report['interactions']} interactions, "
+          f"{report['files']} files ({report['bytes'] / 1e6:.1f} MB), plus {report['orphan_files']} orphaned uploads "
+          f"({report['orphan_bytes'] / 1e6:.1f} MB)")
+    print(f"{report['skipped']} skipped, {report['errors']} errors, {report['freelist_pages']} free pages, "
+          f"{report['vacuumed_pages']} vacuumed, {report['duration_ms']:.0f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {args.output}")
+    database.close_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+Accuracy/latency regression benchmark for the tile detector over a labeled
+image set (YOLO txt labels: one "class cx cy w h" line per tile, normalized).
+
+Runs every image through VisionService with the current config (plus any
+overrides below) and reports per-class precision/recall/AP at --match-iou,
+tile-count and left-to-right sequence accuracy per image, and latency
+percentiles per stage (decode / preprocess / inference / postprocess / NMS).
+
+    python tools/benchmark_yolo.py --images data/val/images --output bench.json
+    python tools/benchmark_yolo.py --images data/val/images --conf 0.5 --iou 0.7
+    python tools/benchmark_yolo.py --images data/val/images --variant int8 --backend opencv
+
+Labels are looked up in --labels, then in a sibling labels/ directory
+(images/x.jpg -> labels/x.txt), then next to the image.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+from config import config
+from vision_service import VisionService, ResolutionPolicy
+from evaluate_quantized_yolo import box_iou
+from quantize_yolo import IMAGE_EXTENSIONS
+
+STAGES = ("decode_ms", "preprocess_ms", "inference_ms", "postprocess_ms", "nms_ms", "total_ms")
+
+
+def find_label_path(image_path, labels_dir=None):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    image_dir = os.path.dirname(image_path)
+    candidates = []
+    if labels_dir:
+        candidates.append(os.path.join(labels_dir, f"{stem}.txt"))
+    if os.path.basename(image_dir) == "images":
+        candidates.append(os.path.join(os.path.dirname(image_dir), "labels", f"{stem}.txt"))
+    candidates.append(os.path.join(image_dir, f"{stem}.txt"))
+    return next((p for p in candidates if os.path.exists(p)), None)
+
+
+def image_size(image_path):
+    """(height, width) without decoding the pixels."""
+    with Image.open(image_path) as im:
+        return im.height, im.width
+
+
+def load_yolo_labels(label_path, width, height):
+    """(class_ids, xyxy pixel boxes) from a YOLO txt label file."""
+    rows = []
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5:
+                rows.append([float(v) for v in parts[:5]])
+    if not rows:
+        return np.zeros(0, dtype=int), np.zeros((0, 4), dtype=np.float32)
+
+    labels = np.array(rows, dtype=np.float32)
+    cx, cy, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+    xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return labels[:, 0].astype(int), xyxy
+
+
+def match_image(gt_classes, gt_boxes, det_classes, det_boxes, det_scores, match_iou):
+    """
+    Greedy same-class matching, highest confidence first.
+    Returns a list of (class_id, confidence, is_true_positive) per detection.
+    """
+    matched = np.zeros(len(gt_classes), dtype=bool)
+    results = []
+    for i in np.argsort(-det_scores, kind="stable"):
+        cls = int(det_classes[i])
+        candidates = np.flatnonzero((gt_classes == cls) & ~matched)
+        tp = False
+        if candidates.size:
+            ious = box_iou(det_boxes[i], gt_boxes[candidates])
+            best = int(np.argmax(ious))
+            if ious[best] >= match_iou:
+                matched[candidates[best]] = True
+                tp = True
+        results.append((cls, float(det_scores[i]), tp))
+    return results
+
+
+def average_precision(scores, tp_flags, num_gt):
+    """All-point interpolated AP of one class (area under the monotone precision/recall curve)."""
+    if num_gt == 0:
+        return None
+    if not scores:
+        return 0.0
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    tp = np.asarray(tp_flags, dtype=float)[order]
+    tp_cum = np.cumsum(tp)
+    recall = tp_cum / num_gt
+    precision = tp_cum / np.arange(1, len(tp) + 1)
+
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    return float(np.sum((recall[1:] - recall[:-1]) * precision[1:]))
+
+
+def latency_summary(samples):
+    if not samples:
+        return None
+    return {
+        "mean": round(statistics.mean(samples), 3),
+        "p50": round(float(np.percentile(samples, 50)), 3),
+        "p90": round(float(np.percentile(samples, 90)), 3),
+        "p99": round(float(np.percentile(samples, 99)), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def format_metric(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def find_images(images_dir, limit=None):
+    paths = sorted(
+        os.path.join(images_dir, f) for f in os.listdir(images_dir)
+        if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+    )
+    return paths[:limit] if limit else paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory of labeled images")
+    parser.add_argument("--labels", help="Directory of YOLO txt labels (default: see above)")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--conf", type=float, default=config.YOLO_CONF_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=config.YOLO_IOU_THRESHOLD)
+    parser.add_argument("--variant", choices=["fp32", "int8"], default=config.YOLO_MODEL_VARIANT)
+    parser.add_argument("--backend", choices=["onnxruntime", "opencv", "auto"], default=config.YOLO_BACKEND)
+    parser.add_argument("--resolutions", type=lambda v: [int(r) for r in v.split(",")],
+                        help="Enable the dynamic resolution policy with these sizes, e.g. 320,480,640")
+    parser.add_argument("--session-key", help="Treat the images as one stream (resolution policy history)")
+    parser.add_argument("--sliced", action="store_true", help="Use sliced inference")
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--warmup", type=int, default=2, help="Warmup passes before timing")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per image (accuracy uses the first)")
+    parser.add_argument("--output", default="benchmark_yolo.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    images = find_images(args.images, args.limit)
+    labeled = [(path, find_label_path(path, args.labels)) for path in images]
+    labeled = [(path, label) for path, label in labeled if label]
+    if not labeled:
+        print(f"No labeled images found in {args.images}")
+        sys.exit(1)
+
+    service = VisionService(
+        model_path=config.YOLO_MODEL_PATH,
+        class_names_path=config.YOLO_CLASS_NAMES_PATH,
+        confidence_threshold=args.conf,
+        iou_threshold=args.iou,
+        session_options={k: v for k, v in config.YOLO_SESSION_OPTIONS.items() if k != "optimized_model_path"},
+        quantized_model_path=config.YOLO_INT8_MODEL_PATH,
+        model_variant=args.variant,
+        resolution_policy=ResolutionPolicy(args.resolutions, config.YOLO_MIN_TILE_PX) if args.resolutions else None,
+        slice_options=config.YOLO_SLICE_OPTIONS,
+        backend=args.backend,
+    )
+    class_names = service.model.class_names
+    if args.warmup:
+        service.warmup(passes=args.warmup)
+
+    per_class = defaultdict(lambda: {"scores": [], "tp": [], "num_gt": 0})
+    latencies = defaultdict(list)
+    per_image = []
+    for image_path, label_path in labeled:
+        runs = []
+        for _ in range(args.repeat):
+            timings = {}
+            start = time.perf_counter()
+            detections = service.detect(image_path, session_key=args.session_key, sliced=args.sliced, timings=timings)
+            timings["total_ms"] = (time.perf_counter() - start) * 1000
+            runs.append((detections, timings))
+        for _, timings in runs:
+            for stage in STAGES:
+                if stage in timings:
+                    latencies[stage].append(timings[stage])
+
+        detections = runs[0][0]
+        height, width = image_size(image_path)
+        gt_classes, gt_boxes = load_yolo_labels(label_path, width, height)
+        for cls in gt_classes:
+            per_class[int(cls)]["num_gt"] += 1
+        for cls, score, tp in match_image(gt_classes, gt_boxes, detections.class_id, detections.xyxy,
+                                          detections.confidence, args.match_iou):
+            per_class[cls]["scores"].append(score)
+            per_class[cls]["tp"].append(tp)
+
+        gt_sequence = [class_names[c] for c in gt_classes[np.argsort(gt_boxes[:, 0], kind="stable")]]
+        det_sequence = detections.class_name[np.argsort(detections.data['x1'], kind="stable")].tolist()
+        per_image.append({
+            "image": os.path.basename(image_path),
+            "gt_count": int(len(gt_classes)),
+            "det_count": len(detections),
+            "count_correct": len(detections) == len(gt_classes),
+            "sequence_correct": det_sequence == gt_sequence,
+            "total_ms": round(runs[0][1]["total_ms"], 3),
+        })
+
+    classes = {}
+    for cls in sorted(per_class):
+        stats = per_class[cls]
+        tp = sum(stats["tp"])
+        classes[class_names[cls] if cls < len(class_names) else str(cls)] = {
+            "precision": round(tp / len(stats["tp"]), 4) if stats["tp"] else None,
+            "recall": round(tp / stats["num_gt"], 4) if stats["num_gt"] else None,
+            "ap": average_precision(stats["scores"], stats["tp"], stats["num_gt"]),
+            "detections": len(stats["tp"]),
+            "ground_truth": stats["num_gt"],
+        }
+
+    total_tp = sum(sum(s["tp"]) for s in per_class.values())
+    total_det = sum(len(s["tp"]) for s in per_class.values())
+    total_gt = sum(s["num_gt"] for s in per_class.values())
+    aps = [c["ap"] for c in classes.values() if c["ap"] is not None]
+    count_errors = [abs(r["det_count"] - r["gt_count"]) for r in per_image]
+    report = {
+        "config": {
+            "model_variant": service.model_variant,
+            "backend": service.backend,
+            "conf_threshold": args.conf,
+            "iou_threshold": args.iou,
+            "resolutions": args.resolutions,
+            "sliced": args.sliced,
+            "match_iou": args.match_iou,
+            "images": len(per_image),
+            "repeat": args.repeat,
+        },
+        "overall": {
+            "precision": round(total_tp / total_det, 4) if total_det else None,
+            "recall": round(total_tp / total_gt, 4) if total_gt else None,
+            f"map{int(args.match_iou * 100)}": round(statistics.mean(aps), 4) if aps else None,
+            "count_accuracy": round(sum(r["count_correct"] for r in per_image) / len(per_image), 4),
+            "count_mae": round(statistics.mean(count_errors), 3),
+            "sequence_accuracy": round(sum(r["sequence_correct"] for r in per_image) / len(per_image), 4),
+        },
+        "latency_ms": {stage: latency_summary(latencies[stage]) for stage in STAGES},
+        "per_class": classes,
+        "per_image": per_image,
+    }
+
+    print(f"\n{len(per_image)} images, match IoU >= {args.match_iou}")
+    print(f"{'class':<8} {'precision':>10} {'recall':>8} {'AP':>7} {'det':>5} {'gt':>5}")
+    for name, c in classes.items():
+        print(f"{name:<8} {format_metric(c['precision']):>10} {format_metric(c['recall']):>8} "
+              f"{format_metric(c['ap']):>7} {c['detections']:>5} {c['ground_truth']:>5}")
+    print("\n" + "  ".join(f"{k}={v}" for k, v in report["overall"].items()))
+    print(f"\n{'stage':<15} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for stage, summary in report["latency_ms"].items():
+        if summary:
+            print(f"{stage:<15} {summary['mean']:>8.2f} {summary['p50']:>8.2f} {summary['p90']:>8.2f} {summary['p99']:>8.2f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Convert the steps_log / response_json payloads of an existing history.db
+between plain JSON text and zlib-compressed blobs (see server/payload_codec.py).
+
+The server reads both formats, so this can run against a live database:
+rows are converted in small transactions and the schema is migrated first.
+Set DB_PAYLOAD_COMPRESSION to match so new rows are written the same way.
+
+    python tools/compress_history.py --dry-run            # report the expected savings
+    python tools/compress_history.py                      # compress with the preset dictionary
+    python tools/compress_history.py --vacuum             # ... and give the space back to the OS
+    python tools/compress_history.py --to none            # back to JSON text
+"""
+import argparse
+import os
+import sys
+import time
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+import database
+from payload_codec import COMPRESSION_MODES, DEFAULT_DICTIONARY, DICTIONARIES, decode_payload, encode_payload, \
+    is_compressed
+
+
+def payload_size(value):
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, (bytes, memoryview)) else len(value.encode("utf-8"))
+
+
+def needs_conversion(value, target, dictionary):
+    if value is None:
+        return False
+    if target == "none":
+        return is_compressed(value)
+    return not is_compressed(value) or bytes(value[1:2]) != bytes([dictionary])
+
+
+def convert(value, target, dictionary, level):
+    return encode_payload(decode_payload(value), target, dictionary=dictionary, level=level)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=database.DB_PATH, help="History database (default: server/history.db)")
+    parser.add_argument("--to", choices=COMPRESSION_MODES, default="zlib", help="Target storage format")
+    parser.add_argument("--dictionary", type=int, choices=[0] + sorted(DICTIONARIES), default=DEFAULT_DICTIONARY,
+                        help="Preset zlib dictionary id (0 = none)")
+    parser.add_argument("--level", type=int, default=9, help="zlib compression level")
+    parser.add_argument("--batch", type=int, default=500, help="Rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No database at {args.db}")
+        sys.exit(1)
+    database.DB_PATH = args.db
+    database.init_db()
+    conn = database.get_db_connection()
+
+    start = time.perf_counter()
+    file_before = os.path.getsize(args.db)
+    rows = converted = failed = 0
+    bytes_before = bytes_after = 0
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            'SELECT id, steps_log, response_json FROM interactions WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, args.batch)
+        ).fetchall()
+        if not batch:
+            break
+        last_id = batch[-1]['id']
+
+        updates = []
+        for row in batch:
+            rows += 1
+            steps, response = row['steps_log'], row['response_json']
+            if not (needs_conversion(steps, args.to, args.dictionary)
+                    or needs_conversion(response, args.to, args.dictionary)):
+                continue
+            try:
+                new_steps = convert(steps, args.to, args.dictionary, args.level) if steps is not None else None
+                new_response = convert(response, args.to, args.dictionary, args.level) if response is not None else None
+            except Exception as e:
+                print(f"Skipping interaction {row['id']}: {e}")
+                failed += 1
+                continue
+            bytes_before += payload_size(steps) + payload_size(response)
+            bytes_after += payload_size(new_steps) + payload_size(new_response)
+            updates.append((new_steps, new_response, row['id']))
+
+        converted += len(updates)
+        if updates and not args.dry_run:
+            with conn:
+                conn.executemany('UPDATE interactions SET steps_log = ?, response_json = ? WHERE id = ?', updates)
+        print(f"\r{rows} rows scanned, {converted} converted", end="", flush=True)
+    print()
+
+    ratio = bytes_after / bytes_before if bytes_before else 1.0
+    print(f"{'Would convert' if args.dry_run else 'Converted'} {converted} of {rows} interactions to '{args.to}'"
+          f" ({failed} skipped): payloads {bytes_before / 1024:.1f} KiB -> {bytes_after / 1024:.1f} KiB"
+          f" ({ratio:.1%}) in {time.perf_counter() - start:.1f}s")
+
+    if args.vacuum and not args.dry_run:
+        conn.execute('VACUUM')
+        # In WAL mode the rewritten pages only reach the main file at a checkpoint
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"Vacuumed: {file_before / 1024:.1f} KiB -> {os.path.getsize(args.db) / 1024:.1f} KiB")
+    database.close_connections()
+
+
+if __name__ == '__main__':
+    main()
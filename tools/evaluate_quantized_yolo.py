@@ -0,0 +1,171 @@
+"""
+Compare an INT8 candidate against the FP32 YOLO model and promote it if it is
+accurate enough.
+
+FP32 detections are used as the reference: per class, an INT8 box is a true
+positive when it overlaps an unmatched FP32 box of the same class with
+IoU >= --match-iou. The candidate is copied to models/yolo/weights.int8.onnx
+only if precision and recall stay above 1 - --max-drop overall and for
+every class with at least --min-class-support FP32 boxes.
+
+    python tools/evaluate_quantized_yolo.py                  # evaluate + promote if it passes
+    python tools/evaluate_quantized_yolo.py --no-promote     # report only
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+from config import config
+from yolo_inference import YOLOv8Inference
+from quantize_yolo import CANDIDATE_PATH, find_calibration_images
+
+
+def box_iou(box, boxes):
+    """IoU of one xyxy box against an (N, 4) array of xyxy boxes."""
+    inter_w = (np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])).clip(0)
+    inter_h = (np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])).clip(0)
+    inter = inter_w * inter_h
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / (area + areas - inter + 1e-9)
+
+
+def match_detections(reference, candidate, match_iou):
+    """
+    Greedy same-class matching, highest candidate confidence first.
+    Returns {class_id: [true_positives, candidate_count, reference_count]}.
+    """
+    stats = defaultdict(lambda: [0, 0, 0])
+    for cls in reference.class_id:
+        stats[int(cls)][2] += 1
+
+    matched = np.zeros(len(reference), dtype=bool)
+    for i in np.argsort(-candidate.confidence):
+        cls = int(candidate.class_id[i])
+        stats[cls][1] += 1
+
+        same_class = (reference.class_id == cls) & ~matched
+        if not same_class.any():
+            continue
+        idx = np.flatnonzero(same_class)
+        ious = box_iou(candidate.xyxy[i], reference.xyxy[idx])
+        best = int(np.argmax(ious))
+        if ious[best] >= match_iou:
+            matched[idx[best]] = True
+            stats[cls][0] += 1
+    return stats
+
+
+def timed_infer(model, frame):
+    start = time.perf_counter()
+    detections = model.infer(frame)
+    return detections, (time.perf_counter() - start) * 1000
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fp32", default=config.YOLO_MODEL_PATH)
+    parser.add_argument("--int8", default=CANDIDATE_PATH)
+    parser.add_argument("--promote-to", default=config.YOLO_INT8_MODEL_PATH)
+    parser.add_argument("--images", default=config.UPLOAD_DIR, help="Directory of evaluation photos")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--max-drop", type=float, default=0.02,
+                        help="Max allowed drop in precision or recall vs FP32, overall and per class (0.02 = 2%%)")
+    parser.add_argument("--min-class-support", type=int, default=20,
+                        help="FP32 boxes a class needs before its own precision/recall is enforced")
+    parser.add_argument("--no-promote", action="store_true")
+    args = parser.parse_args()
+
+    images = find_calibration_images(args.images, limit=args.limit, seed=1)
+    if not images:
+        print(f"No evaluation images found in {args.images}")
+        sys.exit(1)
+
+    model_kwargs = dict(
+        class_names_path=config.YOLO_CLASS_NAMES_PATH,
+        confidence_threshold=config.YOLO_CONF_THRESHOLD,
+        iou_threshold=config.YOLO_IOU_THRESHOLD,
+        session_options={k: v for k, v in config.YOLO_SESSION_OPTIONS.items() if k != "optimized_model_path"},
+    )
+    fp32 = YOLOv8Inference(args.fp32, **model_kwargs)
+    int8 = YOLOv8Inference(args.int8, **model_kwargs)
+    class_names = fp32.class_names
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    fp32_ms, int8_ms = [], []
+    for path in images:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        ref, ref_ms = timed_infer(fp32, frame)
+        cand, cand_ms = timed_infer(int8, frame)
+        fp32_ms.append(ref_ms)
+        int8_ms.append(cand_ms)
+
+        for cls, (tp, n_cand, n_ref) in match_detections(ref, cand, args.match_iou).items():
+            totals[cls][0] += tp
+            totals[cls][1] += n_cand
+            totals[cls][2] += n_ref
+
+    print(f"\nEvaluated {len(fp32_ms)} images (reference = FP32, match IoU >= {args.match_iou})")
+    floor = 1.0 - args.max_drop
+    failing_classes = []
+    print(f"{'class':<8} {'precision':>10} {'recall':>8} {'int8':>6} {'fp32':>6}")
+    for cls in sorted(totals):
+        tp, n_cand, n_ref = totals[cls]
+        precision = tp / n_cand if n_cand else 1.0
+        recall = tp / n_ref if n_ref else 1.0
+        # Rare classes are averaged away in the overall numbers, so gate each one with enough support
+        enforced = n_ref >= args.min_class_support
+        failed = enforced and (precision < floor or recall < floor)
+        if failed:
+            failing_classes.append(class_names[cls])
+        flag = "  FAIL" if failed else ("" if enforced else "  (low support)")
+        print(f"{class_names[cls]:<8} {precision:>10.3f} {recall:>8.3f} {n_cand:>6} {n_ref:>6}{flag}")
+
+    tp = sum(t[0] for t in totals.values())
+    n_cand = sum(t[1] for t in totals.values())
+    n_ref = sum(t[2] for t in totals.values())
+    precision = tp / n_cand if n_cand else 1.0
+    recall = tp / n_ref if n_ref else 1.0
+    print(f"{'overall':<8} {precision:>10.3f} {recall:>8.3f} {n_cand:>6} {n_ref:>6}")
+
+    print(f"\nLatency (ms)  {'mean':>8} {'p50':>8} {'p95':>8}")
+    for name, samples in (("fp32", fp32_ms), ("int8", int8_ms)):
+        print(f"{name:<13} {statistics.mean(samples):>8.1f} {percentile(samples, 50):>8.1f} {percentile(samples, 95):>8.1f}")
+    print(f"Speedup: {statistics.mean(fp32_ms) / statistics.mean(int8_ms):.2f}x")
+
+    if precision < floor or recall < floor:
+        print(f"\nREJECTED: precision/recall below {floor:.3f}. Not promoting {args.int8}.")
+        sys.exit(2)
+    if failing_classes:
+        print(f"\nREJECTED: precision/recall below {floor:.3f} for {', '.join(failing_classes)}. "
+              f"Not promoting {args.int8}.")
+        sys.exit(2)
+
+    if args.no_promote:
+        print("\nPASSED (not promoted, --no-promote)")
+        return
+
+    shutil.copyfile(args.int8, args.promote_to)
+    print(f"\nPASSED: promoted {args.int8} -> {args.promote_to}")
+    print("Set YOLO_MODEL_VARIANT=int8 to serve it.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Produce an INT8 version of the YOLO tile detector for CPU inference.
+
+    python tools/quantize_yolo.py --mode static     # calibrated on static/uploads photos
+    python tools/quantize_yolo.py --mode dynamic    # weights only, no calibration set
+
+The result is written as a *candidate* model. Run tools/evaluate_quantized_yolo.py
+to compare it against FP32 and promote it to models/yolo/weights.int8.onnx.
+"""
+import argparse
+import os
+import random
+import sys
+
+import cv2
+
+SERVER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'server'))
+sys.path.insert(0, SERVER_DIR)
+
+from config import config
+from yolo_inference import YOLOv8Inference
+
+CANDIDATE_PATH = os.path.join(SERVER_DIR, "models/yolo/weights.int8.candidate.onnx")
+
+# Files main.py writes next to the original uploads that aren't camera photos
+DERIVED_SUFFIXES = ("_annotated", "_top", "_bottom")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def find_calibration_images(upload_dir, limit=None, seed=0):
+    """Original photos from static/uploads (skips annotated/cropped/debug derivatives)."""
+    paths = []
+    for filename in sorted(os.listdir(upload_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        if stem.endswith(DERIVED_SUFFIXES) or stem.startswith(("debug_", "detect_")):
+            continue
+        paths.append(os.path.join(upload_dir, filename))
+
+    if limit and len(paths) > limit:
+        paths = sorted(random.Random(seed).sample(paths, limit))
+    return paths
+
+
+class UploadsCalibrationReader:
+    """onnxruntime CalibrationDataReader feeding letterboxed upload photos."""
+
+    def __init__(self, model, image_paths):
+        self.model = model
+        self.image_paths = iter(image_paths)
+
+    def get_next(self):
+        for path in self.image_paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f"Skipping unreadable image: {path}")
+                continue
+            input_tensor, _, _ = self.model.preprocess(frame)
+            return {self.model.input_name: input_tensor}
+        return None
+
+    def rewind(self):
+        pass
+
+
+def main():
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--model", default=config.YOLO_MODEL_PATH, help="FP32 ONNX model")
+    parser.add_argument("--output", default=CANDIDATE_PATH)
+    parser.add_argument("--calib-dir", default=config.UPLOAD_DIR, help="Directory of calibration photos")
+    parser.add_argument("--calib-size", type=int, default=200, help="Max number of calibration images")
+    parser.add_argument("--calib-method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--exclude-nodes", nargs="*", default=[],
+                        help="Node names to keep in FP32 (e.g. the detection head)")
+    args = parser.parse_args()
+
+    prepared_path = os.path.splitext(args.output)[0] + ".prep.onnx"
+    print(f"Pre-processing {args.model} (shape inference + graph cleanup)...")
+    quant_pre_process(args.model, prepared_path, skip_symbolic_shape=True)
+
+    try:
+        if args.mode == "dynamic":
+            quantize_dynamic(
+                prepared_path,
+                args.output,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+                nodes_to_exclude=args.exclude_nodes,
+            )
+        else:
+            images = find_calibration_images(args.calib_dir, limit=args.calib_size)
+            if not images:
+                print(f"No calibration images found in {args.calib_dir}")
+                sys.exit(1)
+            print(f"Calibrating on {len(images)} images from {args.calib_dir}...")
+
+            model = YOLOv8Inference(args.model, config.YOLO_CLASS_NAMES_PATH)
+            method = {
+                "minmax": CalibrationMethod.MinMax,
+                "entropy": CalibrationMethod.Entropy,
+                "percentile": CalibrationMethod.Percentile,
+            }[args.calib_method]
+
+            quantize_static(
+                prepared_path,
+                args.output,
+                UploadsCalibrationReader(model, images),
+                quant_format=QuantFormat.QDQ,
+                per_channel=True,
+                weight_type=QuantType.QInt8,
+                activation_type=QuantType.QUInt8,
+                calibrate_method=method,
+                nodes_to_exclude=args.exclude_nodes,
+            )
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+    fp32_mb = os.path.getsize(args.model) / (1024 * 1024)
+    int8_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"Wrote {args.mode} INT8 candidate: {args.output} ({fp32_mb:.1f}MB -> {int8_mb:.1f}MB)")
+    print("Next: python tools/evaluate_quantized_yolo.py")
+
+
+if __name__ == '__main__':
+    main()